@@ -0,0 +1,35 @@
+from django_filters import rest_framework as filters
+
+from ..models import Issue
+
+
+class IssueFilterSet(filters.FilterSet):
+	"""
+	Filters of issues list, every one of them is backed by index of Issue
+	or by index of sprint / backlog relation table.
+	?project=1&state=2&type=3&assignee=4&estimation=5&sprint=6&backlog=true&updated_since=2021-01-01T00:00:00
+	"""
+	project = filters.NumberFilter(field_name='project')
+	state = filters.NumberFilter(field_name='state_category')
+	type = filters.NumberFilter(field_name='type_category')
+	assignee = filters.NumberFilter(field_name='assignee')
+	estimation = filters.NumberFilter(field_name='estimation_category')
+	sprint = filters.NumberFilter(field_name='sprint')
+	backlog = filters.BooleanFilter(field_name='projectbacklog',
+									lookup_expr='isnull',
+									exclude=True)
+	updated_since = filters.IsoDateTimeFilter(field_name='updated_at',
+											  lookup_expr='gte')
+
+	class Meta:
+		model = Issue
+		fields = (
+			'project',
+			'state',
+			'type',
+			'assignee',
+			'estimation',
+			'sprint',
+			'backlog',
+			'updated_since'
+		)
@@ -14,7 +14,9 @@ from apps.core.api.tasks import send_forgot_password_email
 from apps.core.models import PersonRegistrationRequest, Workspace, PersonInvitationRequest, PersonForgotRequest, Person, \
 	Project, IssueTypeCategoryIcon, IssueTypeCategory, IssueStateCategory, IssueEstimationCategory, Issue, IssueHistory, \
 	IssueMessage, IssueAttachment, ProjectNonWorkingDay, ProjectBacklog, ProjectWorkingDays, SprintDuration, Sprint, \
-	SprintEffortsHistory
+	SprintEffortsHistory, Mention, IssueImport, WorkspaceExport
+from apps.core.exports import EXPORT_SECTION_NAMES
+from apps.core.imports import get_format_by_filename
 
 UserModel = get_user_model()
 
@@ -669,6 +671,7 @@ class IssueTypeIconSerializer(serializers.ModelSerializer):
 		model = IssueTypeCategoryIcon
 		fields = (
 			'id',
+			'version',
 			'workspace',
 			'project',
 			'prefix',
@@ -686,6 +689,7 @@ class IssueTypeSerializer(WorkspaceModelSerializer):
 		model = IssueTypeCategory
 		fields = (
 			'id',
+			'version',
 			'workspace',
 			'project',
 			'title',
@@ -706,6 +710,7 @@ class IssueStateSerializer(WorkspaceModelSerializer):
 		model = IssueStateCategory
 		fields = (
 			'id',
+			'version',
 			'workspace',
 			'project',
 			'title',
@@ -725,6 +730,7 @@ class IssueEstimationSerializer(WorkspaceModelSerializer):
 		model = IssueEstimationCategory
 		fields = (
 			'id',
+			'version',
 			'workspace',
 			'project',
 			'title',
@@ -761,6 +767,7 @@ class IssueSerializer(WorkspaceModelSerializer):
 		model = Issue
 		fields = (
 			'id',
+			'version',
 			'number',
 			'project_number',
 			'workspace',
@@ -807,6 +814,142 @@ class IssueSerializer(WorkspaceModelSerializer):
 		return instance
 
 
+class IssueImportSerializer(WorkspaceModelSerializer):
+	"""
+	Import of issues from uploaded CSV or NDJSON file.
+	If format is not given we choose it by extension of file.
+	Progress is sent to workspace subscribers as issue_import model.
+	"""
+	class Meta:
+		model = IssueImport
+		fields = (
+			'id',
+			'version',
+			'workspace',
+			'project',
+			'source',
+			'format',
+			'status',
+			'processed',
+			'imported',
+			'errors',
+			'created_by',
+			'created_at',
+			'finished_at'
+		)
+		read_only_fields = (
+			'status',
+			'processed',
+			'imported',
+			'errors',
+			'created_by',
+			'finished_at'
+		)
+		extra_kwargs = {
+			'source': {
+				'write_only': True,
+				'required': True,
+				'allow_null': False
+			},
+			'format': {
+				'required': False
+			}
+		}
+
+	def validate(self, attrs):
+		data = super().validate(attrs)
+
+		if data['project'].workspace_id != data['workspace'].pk:
+			raise ValidationError({'project': _('Project should belong to the given workspace')})
+
+		if 'format' not in data:
+			data['format'] = get_format_by_filename(data['source'].name)
+
+		data['created_by'] = self.context['person']
+		return data
+
+
+class WorkspaceExportSerializer(WorkspaceModelSerializer):
+	"""
+	Export of workspace as NDJSON or CSV.
+	CSV is a table, so section has to be chosen for it.
+	"""
+	section = serializers.ChoiceField(choices=EXPORT_SECTION_NAMES,
+									  required=False,
+									  allow_blank=True)
+
+	class Meta:
+		model = WorkspaceExport
+		fields = (
+			'id',
+			'workspace',
+			'format',
+			'section',
+			'status',
+			'rows',
+			'file',
+			'error',
+			'created_by',
+			'created_at',
+			'finished_at'
+		)
+		read_only_fields = (
+			'status',
+			'rows',
+			'file',
+			'error',
+			'created_by',
+			'finished_at'
+		)
+
+	def validate(self, attrs):
+		data = super().validate(attrs)
+
+		if data.get('format') == WorkspaceExport.FORMAT_CSV and not data.get('section'):
+			raise ValidationError({'section': _('Section should be chosen for CSV export')})
+
+		data['created_by'] = self.context['person']
+		return data
+
+
+class IssueSearchSerializer(serializers.ModelSerializer):
+	"""
+	Found issue, rank is relevance of issue to search query.
+	"""
+	rank = serializers.FloatField(read_only=True)
+
+	class Meta:
+		model = Issue
+		fields = (
+			'id',
+			'workspace',
+			'project',
+			'number',
+			'project_number',
+			'title',
+			'type_category',
+			'state_category',
+			'rank'
+		)
+
+
+class MentionSerializer(serializers.ModelSerializer):
+	"""
+	Where person was mentioned, message is null for mentions in issue description.
+	"""
+	class Meta:
+		model = Mention
+		fields = (
+			'id',
+			'workspace',
+			'project',
+			'issue',
+			'message',
+			'mentioned_by',
+			'created_at'
+		)
+
+
 class IssueHistorySerializer(serializers.ModelSerializer):
 	"""
 	Issue History allow us to track changes and reflect it
@@ -834,6 +977,7 @@ class IssueMessageSerializer(WorkspaceModelSerializer):
 		model = IssueMessage
 		fields = (
 			'id',
+			'version',
 			'issue',
 			'description',
 			'created_by',
@@ -872,6 +1016,7 @@ class IssueAttachmentSerializer(WorkspaceModelSerializer):
 			'attachment',
 			'attachment_size',
 			'show_preview',
+			'thumbnail',
 			'icon',
 			'created_by',
 			'created_at',
@@ -880,6 +1025,9 @@ class IssueAttachmentSerializer(WorkspaceModelSerializer):
 		extra_kwargs = {
 			'attachment': {
 				'read_only': True
+			},
+			'thumbnail': {
+				'read_only': True
 			}
 		}
 
@@ -989,7 +1137,8 @@ class SprintEffortsHistorySerializer(serializers.ModelSerializer):
 			'point_at',
 			'total_value',
 			'done_value',
-			'estimated_value'
+			'estimated_value',
+			'version'
 		)
 
 
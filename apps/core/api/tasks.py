@@ -1,17 +1,25 @@
 from __future__ import absolute_import, unicode_literals
 
+from collections import defaultdict
+from datetime import timedelta
 from smtplib import SMTPException
 
 from celery import shared_task
 from django.contrib.auth import get_user_model
 from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
 
 from libs.email.compose import EmailComposer
+from libs.helpers.images import make_thumbnail
+from ..exports import export_to_storage
+from ..imports import IssueImporter, open_text
 from ..models import PersonRegistrationRequest, \
 	PersonInvitationRequest, \
-	IssueMessage, \
-	Issue, \
-	get_mentioned_user_ids, \
+	IssueAttachment, \
+	IssueImport, \
+	WorkspaceExport, \
+	MentionNotification, \
 	Person, PersonForgotRequest
 
 User = get_user_model()
@@ -133,58 +141,147 @@ def send_invitation_email(request_pk=None):
 		request.save()
 
 
+def claim_mention_notifications(person_id: int, claimed_at) -> list:
+	"""
+	Pending notifications of person are marked as sent in a short transaction,
+	so concurrent runs skip them, and no lock is held while email is sent.
+	"""
+	with transaction.atomic():
+		notifications = list(
+			MentionNotification.objects
+			.filter(person_id=person_id, sent_at__isnull=True)
+			.select_related('issue', 'message', 'mentioned_by__user')
+			.select_for_update(skip_locked=True, of=('self',))
+			.order_by('created_at')
+		)
+
+		MentionNotification.objects \
+			.filter(pk__in=[notification.pk for notification in notifications]) \
+			.update(sent_at=claimed_at)
+
+	return notifications
+
+
 @shared_task
-def send_mentioned_in_message_email(message_pk=None):
+def send_mention_digest_emails():
 	"""
-	Send email to user if he was mentioned in
-	message for issue.
+	Scheduled task, look at CELERY_BEAT_SCHEDULE.
+	Person gets one email with all pending mentions
+	when the oldest of them is older than PMDRAGON_MENTION_DIGEST_WINDOW seconds.
+	Notifications of every person are claimed before email is sent, look at claim_mention_notifications,
+	if email wasn't sent - they are pending again, so the next run retries them.
 	"""
-	message = IssueMessage.objects.get(pk=message_pk)
-	mentioned_persons = get_mentioned_user_ids(message.description)
+	now = timezone.now()
+
+	person_ids = MentionNotification.objects \
+		.filter(sent_at__isnull=True,
+				created_at__lte=now - timedelta(seconds=settings.PMDRAGON_MENTION_DIGEST_WINDOW)) \
+		.order_by('person_id') \
+		.values_list('person_id', flat=True) \
+		.distinct()
+
+	persons = Person.objects \
+		.select_related('user') \
+		.in_bulk(list(person_ids))
+
+	sent = 0
+	error = None
+
+	for person_id, person in persons.items():
+		notifications = claim_mention_notifications(person_id, now)
+
+		if not notifications:
+			continue
+
+		try:
+			mentions = [
+				{
+					'issue_title': notification.issue.title,
+					'mentioned_by': notification.mentioned_by,
+					'issue_message': notification.message.description if notification.message else None
+				}
+				for notification
+				in notifications
+			]
+
+			sent += EmailComposer().process_many(
+				subject='PmDragon mentions digest',
+				template='email/messaging/mentioning_digest.html',
+				recipients=[(person.email, {'person': person, 'mentions': mentions})]
+			)
+		except Exception as e:
+			# Refused connection, rendering errors and others - not only SMTP ones
+			MentionNotification.objects \
+				.filter(pk__in=[notification.pk for notification in notifications]) \
+				.update(sent_at=None)
+
+			error = e
+
+	if error is not None:
+		raise error
 
+	return sent
+
+
+@shared_task
+def generate_attachment_thumbnail(attachment_pk=None):
+	"""
+	Generate small preview for just uploaded image attachment.
+	So that issue page don't have to download full size images.
+	"""
 	try:
-		for person_id in mentioned_persons:
-			person = Person.objects.get(pk=int(person_id))
-			context = {
-				'issue_title': message.issue.title,
-				'mentioned_by': message.created_by,
-				'issue_message': message.description
-			}
+		attachment = IssueAttachment.objects.get(pk=attachment_pk)
+	except IssueAttachment.DoesNotExist:
+		return False
 
-			EmailComposer().process(
-				subject='PmDragon mentioned in issue message',
-				email=person.email,
-				template='email/messaging/mentioning.html',
-				context=context
-			)
+	if not attachment.show_preview or attachment.thumbnail:
+		return False
 
-	except SMTPException as e:
-		print(e)
-		raise e
+	with attachment.attachment.open('rb') as source:
+		thumbnail = make_thumbnail(source, settings.PMDRAGON_ATTACHMENT_THUMBNAIL_SIZE)
+
+	"""
+	Pillow can't read some previewable formats, such as svg.
+	Frontend will show original file for them """
+	if thumbnail is None:
+		return False
+
+	attachment.thumbnail.save(thumbnail.name, thumbnail, save=False)
+	attachment.save(update_fields=['thumbnail', 'updated_at'])
+
+	return True
 
 
 @shared_task
-def send_mentioned_in_description_email(issue_pk=None):
+def import_issues(issue_import_pk=None):
 	"""
-	Send email if user was mentioned in issue description.
+	Import issues from uploaded file, file is read as a stream.
+	Look at apps/core/imports.py for detailed information.
 	"""
-	issue = Issue.objects.get(pk=issue_pk)
-	mentioned_persons = get_mentioned_user_ids(issue.description)
+	try:
+		issue_import = IssueImport.objects.get(pk=issue_import_pk, status=IssueImport.STATUS_PENDING)
+	except IssueImport.DoesNotExist:
+		return False
+
+	with issue_import.source.open('rb') as source:
+		IssueImporter(issue_import).run(open_text(source))
+
+	return True
 
+
+@shared_task
+def export_workspace(workspace_export_pk=None):
+	"""
+	Export workspace that is too large to be returned in response.
+	Look at apps/core/exports.py for detailed information.
+	"""
 	try:
-		for person_id in mentioned_persons:
-			person = Person.objects.get(pk=int(person_id))
-			context = {
-				'issue_title': issue.title,
-				'issue_description': issue.description
-			}
+		workspace_export = WorkspaceExport.objects \
+			.select_related('workspace') \
+			.get(pk=workspace_export_pk, status=WorkspaceExport.STATUS_PENDING)
+	except WorkspaceExport.DoesNotExist:
+		return False
 
-			EmailComposer().process(
-				subject='PmDragon mentioned in issue description',
-				email=person.email,
-				template='email/issue/mentioning.html',
-				context=context
-			)
-	except SMTPException as e:
-		print(e)
-		raise e
+	export_to_storage(workspace_export)
+
+	return True
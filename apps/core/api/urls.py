@@ -11,6 +11,7 @@ router.register('workspaces', views.WorkspaceViewSet, basename='workspaces')
 router.register('projects', views.ProjectViewSet, basename='projects')
 router.register('persons', views.PersonsViewSet, basename='collaborators')
 router.register('issues', views.IssueViewSet, basename='issues')
+router.register('issues-search', views.IssueSearchViewSet, basename='issues-search')
 router.register('issues-history', views.IssueHistoryViewSet, basename='issue-history')
 router.register('issue-types', views.IssueTypeCategoryViewSet, basename='issue-types')
 router.register('issue-type-icons', views.IssueTypeIconViewSet, basename='issue-type-icons')
@@ -18,6 +19,9 @@ router.register('issue-states', views.IssueStateCategoryViewSet, basename='issue
 router.register('issue-estimations', views.IssueEstimationCategoryViewSet, basename='issue-estimations')
 router.register('issue-messages', views.IssueMessagesViewSet, basename='issue-messages')
 router.register('issue-attachments', views.IssueAttachmentViewSet, basename='issue-attachments')
+router.register('issue-imports', views.IssueImportViewSet, basename='issue-imports')
+router.register('workspace-exports', views.WorkspaceExportViewSet, basename='workspace-exports')
+router.register('mentions', views.MentionViewSet, basename='mentions')
 router.register('backlogs', views.ProjectBacklogViewSet, basename='backlogs')
 router.register('sprints', views.SprintViewSet, basename='sprints')
 router.register('sprint-efforts-history', views.SprintEffortsHistoryViewSet, basename='sprint-estimations')
@@ -26,7 +30,10 @@ router.register('working-days', views.ProjectWorkingDaysViewSet, basename='worki
 router.register('non-working-days', views.ProjectNonWorkingDayViewSet, basename='non-working-days')
 
 urlpatterns = router.urls
-urlpatterns += [path('issue/ordering/',
+urlpatterns += [path('issues-typeahead/',
+                     views.IssueTypeaheadView.as_view(),
+                     name='issues-typeahead'),
+                path('issue/ordering/',
                      views.IssueListUpdateApiView.as_view(),
                      name='issue-ordering'),
                 path('person-invitation-requests/',
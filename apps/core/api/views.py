@@ -1,20 +1,32 @@
+import hashlib
 import json
+from collections import Counter
 
 from django.conf import settings
 from django.contrib.auth.models import User
+from django.contrib.postgres.search import TrigramSimilarity
+from django.core.cache import caches
+from django.db import transaction, connection, OperationalError
+from django.db.models import FloatField, Value, Q, Case, When, BooleanField, Count
+from django.http import FileResponse
+from django.utils.http import parse_etags
 from django.utils.translation import ugettext_lazy as _
+from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework import filters
 from rest_framework import viewsets, generics, mixins, status, views
 from rest_framework.exceptions import ValidationError
 from rest_framework.generics import GenericAPIView, UpdateAPIView
-from rest_framework.parsers import MultiPartParser
-from rest_framework.permissions import AllowAny, IsAuthenticated
+from rest_framework.pagination import CursorPagination
+from rest_framework.parsers import MultiPartParser, FormParser
+from rest_framework.permissions import AllowAny, IsAuthenticated, IsAdminUser
 from rest_framework.response import Response
 from rest_framework.throttling import AnonRateThrottle
 from rest_framework_simplejwt.views import TokenObtainPairView
 
 from libs.check.health import Health
+from libs.check.websocket import outbound_metrics
 from libs.sprint.analyser import SprintAnalyser
+from .filters import IssueFilterSet
 from .permissions import IsParticipateInWorkspace, IsOwnerOrReadOnly, IsCreatorOrReadOnly, WorkspaceOwnerOrReadOnly
 from .schemas import IssueListUpdateSchema
 from .serializers import TokenObtainPairExtendedSerializer, PersonRegistrationRequestSerializer, \
@@ -25,12 +37,14 @@ from .serializers import TokenObtainPairExtendedSerializer, PersonRegistrationRe
 	IssueTypeIconSerializer, IssueStateSerializer, IssueEstimationSerializer, IssueSerializer, IssueHistorySerializer, \
 	IssueMessageSerializer, IssueAttachmentSerializer, BacklogWritableSerializer, ProjectWorkingDaysSerializer, \
 	NonWorkingDaysSerializer, SprintDurationSerializer, SprintWritableSerializer, SprintEffortsHistorySerializer, \
-	UserSetPasswordSerializer, UserUpdateSerializer, IssueChildOrderingSerializer
-from .tasks import send_registration_email, send_invitation_email
+	UserSetPasswordSerializer, UserUpdateSerializer, IssueChildOrderingSerializer, MentionSerializer, \
+	IssueSearchSerializer, IssueImportSerializer, WorkspaceExportSerializer
+from .tasks import send_registration_email, send_invitation_email, import_issues, export_workspace
+from ..exports import WorkspaceExporter, is_exported_in_response, export_to_response_file
 from ..models import PersonRegistrationRequest, PersonInvitationRequest, PersonForgotRequest, Workspace, Person, \
 	Project, IssueTypeCategory, IssueTypeCategoryIcon, IssueStateCategory, IssueEstimationCategory, Issue, IssueHistory, \
 	IssueMessage, IssueAttachment, ProjectBacklog, ProjectWorkingDays, ProjectNonWorkingDay, SprintDuration, Sprint, \
-	SprintEffortsHistory
+	SprintEffortsHistory, Mention, IssueSearchDocument, WorkspaceCounter, IssueImport, WorkspaceExport
 
 
 class CheckConnection(views.APIView):
@@ -55,6 +69,58 @@ class CheckConnection(views.APIView):
 		return Response(health_overall, status=http_code)
 
 
+class CheckLiveness(views.APIView):
+	"""
+	Liveness probe, answers if process is able to serve requests at all.
+	It doesn't touch any external service.
+	"""
+	permission_classes = (
+		AllowAny,
+	)
+	authentication_classes = ()
+	throttle_classes = ()
+
+	def get(self, request, format=None):
+		return Response({'ok': True}, status=status.HTTP_200_OK)
+
+
+class CheckReadiness(views.APIView):
+	"""
+	Readiness probe for load balancers.
+	Returns last result of background health monitor, so it never waits for hung services.
+	Look at libs/check/health.py for detailed information.
+	"""
+	permission_classes = (
+		AllowAny,
+	)
+	authentication_classes = ()
+	throttle_classes = ()
+
+	def get(self, request, format=None):
+		health_overall = Health.get_overall_status()
+
+		http_code = status.HTTP_200_OK \
+			if health_overall['ok'] \
+			else status.HTTP_503_SERVICE_UNAVAILABLE
+
+		return Response(health_overall, status=http_code)
+
+
+class CheckWebsocket(views.APIView):
+	"""
+	Outbound websocket queues of the worker that served this request.
+	Metrics tell about connections of persons, so only staff can read them.
+	Look at apps/core/multiplexer.py for detailed information.
+	"""
+	permission_classes = (
+		IsAdminUser,
+	)
+	throttle_classes = ()
+
+	def get(self, request, format=None):
+		return Response(outbound_metrics.get(), status=status.HTTP_200_OK)
+
+
 class TokenObtainPairExtendedView(TokenObtainPairView):
 	"""
 	Takes a set of user credentials and returns an access and refreshes JSON web
@@ -385,6 +451,75 @@ class WorkspacesReadOnlyModelViewSet(viewsets.ReadOnlyModelViewSet):
 		SpacedFilter,
 	)
 
+	"""
+	Models that list is built from, look at get_list_etag.
+	If it's empty - only model of queryset is used. """
+	list_version_models = ()
+
+	def get_list_version_models(self) -> tuple:
+		return self.list_version_models or (self.queryset.model,)
+
+	def get_workspace_list_versions(self, person: Person) -> tuple:
+		"""
+		Workspaces of person and list versions of them, they are read once per request """
+		if getattr(self, '_workspace_list_versions', None) is None:
+			workspace_ids = list(
+				Workspace.participants.through.objects
+				.filter(person=person)
+				.order_by('workspace_id')
+				.values_list('workspace_id', flat=True)
+			)
+
+			versions = WorkspaceCounter.get_list_versions(workspace_ids, self.get_list_version_models())
+			self._workspace_list_versions = workspace_ids, versions
+
+		return self._workspace_list_versions
+
+	def get_list_etag(self):
+		"""
+		Strong ETag of list built from list versions of models
+		in workspaces of current person, look at WorkspaceCounter.
+		So we know that list wasn't changed without touching tables of listed models.
+		Filters and pages give different lists, so query string is a part of it.
+		"""
+		try:
+			person = self.request.user.person
+		except Person.DoesNotExist:
+			return None
+
+		workspace_ids, versions = self.get_workspace_list_versions(person)
+		serializer_class = self.get_serializer_class()
+
+		key = repr((
+			person.pk,
+			workspace_ids,
+			versions,
+			self.request.get_full_path(),
+			self.request.accepted_renderer.format,
+			f'{serializer_class.__module__}.{serializer_class.__qualname__}'
+		))
+
+		return f'"{hashlib.blake2b(key.encode("utf-8"), digest_size=16).hexdigest()}"'
+
+	def list(self, request, *args, **kwargs):
+		etag = self.get_list_etag()
+
+		if etag is not None:
+			etags = parse_etags(request.headers.get('If-None-Match', ''))
+
+			if etag in etags or '*' in etags:
+				return Response(status=status.HTTP_304_NOT_MODIFIED, headers={'ETag': etag})
+
+		response = self.get_list_response(request, *args, **kwargs)
+
+		if etag is not None and response.status_code == status.HTTP_200_OK:
+			response['ETag'] = etag
+
+		return response
+
+	def get_list_response(self, request, *args, **kwargs):
+		return super().list(request, *args, **kwargs)
+
 	def get_serializer_context(self):
 		"""
 		Put to serializer context information about current person
@@ -402,6 +537,80 @@ class WorkspacesReadOnlyModelViewSet(viewsets.ReadOnlyModelViewSet):
 		return context
 
 
+class CatalogCacheMixin:
+	"""
+	Catalogs of project are read on every page load and almost never change,
+	so serialized lists are cached per project in PMDRAGON_CATALOG_CACHE.
+	Key contains list versions of workspace of project, look at WorkspaceCounter,
+	they are incremented by the same signals that drive observers,
+	so changed catalog is never read from cache and we don't have to delete anything.
+	List is ordered by project, then as queryset is ordered.
+	Has to be used with WorkspacesReadOnlyModelViewSet.
+	"""
+	CACHE_KEY_TEMPLATE = 'catalog:{model}:{project_id}:{versions}'
+
+	def get_catalog_cache_key(self, project_id: int, versions: list) -> str:
+		serializer_class = self.get_serializer_class()
+
+		versions_key = repr((
+			versions,
+			f'{serializer_class.__module__}.{serializer_class.__qualname__}'
+		))
+
+		return self.CACHE_KEY_TEMPLATE.format(
+			model=self.queryset.model._meta.label_lower,
+			project_id=project_id,
+			versions=hashlib.blake2b(versions_key.encode('utf-8'), digest_size=16).hexdigest()
+		)
+
+	def get_list_response(self, request, *args, **kwargs):
+		try:
+			person = request.user.person
+		except Person.DoesNotExist:
+			return super().get_list_response(request, *args, **kwargs)
+
+		workspace_ids, versions = self.get_workspace_list_versions(person)
+
+		projects = list(
+			Project.objects
+			.filter(workspace_id__in=workspace_ids)
+			.order_by('pk')
+			.values_list('pk', 'workspace_id')
+		)
+
+		workspace_versions = {}
+		for workspace_id, label, value in versions:
+			workspace_versions.setdefault(workspace_id, []).append((label, value))
+
+		keys = {
+			project_id: self.get_catalog_cache_key(project_id, workspace_versions.get(workspace_id, []))
+			for project_id, workspace_id
+			in projects
+		}
+
+		cache = caches[settings.PMDRAGON_CATALOG_CACHE]
+		catalogs = cache.get_many(keys.values())
+
+		missing_ids = [project_id for project_id, key in keys.items() if key not in catalogs]
+
+		if missing_ids:
+			instances = list(self.filter_queryset(self.get_queryset()).filter(project_id__in=missing_ids))
+			serialized = self.get_serializer(instances, many=True).data
+
+			missing_catalogs = {keys[project_id]: [] for project_id in missing_ids}
+			for instance, data in zip(instances, serialized):
+				missing_catalogs[keys[instance.project_id]].append(data)
+
+			cache.set_many(missing_catalogs, timeout=settings.PMDRAGON_CATALOG_CACHE_TTL)
+			catalogs.update(missing_catalogs)
+
+		return Response([
+			data
+			for key in keys.values()
+			for data in catalogs[key]
+		])
+
+
 class WorkspacesModelViewSet(WorkspacesReadOnlyModelViewSet,
 							 mixins.CreateModelMixin,
 							 mixins.UpdateModelMixin,
@@ -432,19 +641,23 @@ class ProjectViewSet(WorkspacesModelViewSet):
 	)
 
 
-class IssueTypeCategoryViewSet(WorkspacesModelViewSet):
+class IssueTypeCategoryViewSet(CatalogCacheMixin, WorkspacesModelViewSet):
 	"""
 	View for getting, editing, deleting instance.
 	"""
 	queryset = IssueTypeCategory.objects.all()
 	serializer_class = IssueTypeSerializer
+	list_version_models = (
+		IssueTypeCategory,
+		IssueTypeCategoryIcon,
+	)
 	permission_classes = (
 		IsAuthenticated,
 		IsParticipateInWorkspace
 	)
 
 
-class IssueTypeIconViewSet(WorkspacesModelViewSet):
+class IssueTypeIconViewSet(CatalogCacheMixin, WorkspacesModelViewSet):
 	"""
 	Just CRUD with Issue Type Icons
 	"""
@@ -457,7 +670,7 @@ class IssueTypeIconViewSet(WorkspacesModelViewSet):
 	)
 
 
-class IssueStateCategoryViewSet(WorkspacesModelViewSet):
+class IssueStateCategoryViewSet(CatalogCacheMixin, WorkspacesModelViewSet):
 	"""
 	View for getting, editing, deleting instance.
 	"""
@@ -470,7 +683,7 @@ class IssueStateCategoryViewSet(WorkspacesModelViewSet):
 	)
 
 
-class IssueEstimationCategoryViewSet(WorkspacesModelViewSet):
+class IssueEstimationCategoryViewSet(CatalogCacheMixin, WorkspacesModelViewSet):
 	"""
 	Just CRUD with Issue Estimations.
 	"""
@@ -486,6 +699,9 @@ class IssueEstimationCategoryViewSet(WorkspacesModelViewSet):
 class IssueViewSet(WorkspacesModelViewSet):
 	"""
 	View for getting, editing, deleting instance.
+	List can be filtered, look at IssueFilterSet.
+	With ?facets=true we return only counts of filtered issues
+	per state, assignee and type instead of issues.
 	"""
 	queryset = Issue.objects.all()
 	serializer_class = IssueSerializer
@@ -493,6 +709,63 @@ class IssueViewSet(WorkspacesModelViewSet):
 		IsAuthenticated,
 		IsParticipateInWorkspace,
 	)
+	filter_backends = (
+		SpacedFilter,
+		DjangoFilterBackend,
+	)
+	filterset_class = IssueFilterSet
+	list_version_models = (
+		Issue,
+		IssueAttachment,
+		IssueTypeCategory,
+		IssueStateCategory,
+		IssueEstimationCategory,
+	)
+
+	"""
+	Facet name and field of issue """
+	facets = (
+		('state', 'state_category'),
+		('assignee', 'assignee'),
+		('type', 'type_category'),
+	)
+
+	def get_facets(self, queryset) -> dict:
+		"""
+		One query grouped by all facet fields,
+		then we sum groups up for every facet separately.
+		"""
+		fields = [field for _, field in self.facets]
+
+		groups = queryset \
+			.order_by() \
+			.values(*fields) \
+			.annotate(count=Count('id'))
+
+		total = 0
+		counters = {name: Counter() for name, _ in self.facets}
+
+		for group in groups:
+			total += group['count']
+
+			for name, field in self.facets:
+				counters[name][group[field]] += group['count']
+
+		result = {'total': total}
+		for name, counter in counters.items():
+			result[name] = [
+				{'id': value, 'count': count}
+				for value, count
+				in counter.most_common()
+			]
+
+		return result
+
+	def list(self, request, *args, **kwargs):
+		if request.query_params.get('facets') not in ('true', '1'):
+			return super().list(request, *args, **kwargs)
+
+		return Response(self.get_facets(self.filter_queryset(self.get_queryset())))
 
 
 class IssueFilterBackend(filters.BaseFilterBackend):
@@ -518,6 +791,133 @@ class IssueHistoryViewSet(WorkspacesReadOnlyModelViewSet):
 	)
 
 
+class IssueSearchFilterBackend(filters.BaseFilterBackend):
+	def filter_queryset(self, request, queryset, view):
+		text = request.query_params.get('q', '').strip()
+
+		if not text:
+			return queryset.annotate(rank=Value(0.0, output_field=FloatField())).none()
+
+		return IssueSearchDocument.search(queryset, text)
+
+
+class IssueSearchCursorPagination(CursorPagination):
+	"""
+	The most relevant issues first, look at IssueSearchDocument.search
+	"""
+	ordering = ('-rank', '-id')
+	page_size = settings.PMDRAGON_SEARCH_PAGE_SIZE
+
+
+class IssueSearchViewSet(mixins.ListModelMixin, viewsets.GenericViewSet):
+	"""
+	Full text search of issues by title, description and messages
+	in workspaces of current person, ?q=search text
+	"""
+	queryset = Issue.objects.select_related('project')
+	serializer_class = IssueSearchSerializer
+	pagination_class = IssueSearchCursorPagination
+	permission_classes = (
+		IsAuthenticated,
+	)
+	filter_backends = (
+		SpacedFilter,
+		IssueSearchFilterBackend,
+	)
+
+
+class IssueTypeaheadView(GenericAPIView):
+	"""
+	Quick search of issues to link them or to jump to them, ?q=PRJ-12 or ?q=part of title
+	Key is searched by prefix, title by trigram similarity.
+	We return only id, key and title, and give up if database didn't make it in time -
+	next keystroke will ask again anyway.
+	"""
+	queryset = Issue.objects.all()
+	permission_classes = (
+		IsAuthenticated,
+	)
+	filter_backends = (
+		SpacedFilter,
+	)
+
+	def get_typeahead_queryset(self, text: str):
+		key_query = Q(project_number__startswith=text.upper())
+		title_query = Q(title__icontains=text)
+
+		queryset = self.filter_queryset(self.get_queryset())
+
+		if connection.vendor == 'postgresql':
+			title_query |= Q(title__trigram_similar=text)
+			queryset = queryset.annotate(similarity=TrigramSimilarity('title', text))
+		else:
+			queryset = queryset.annotate(similarity=Value(0.0, output_field=FloatField()))
+
+		return queryset \
+			.filter(key_query | title_query) \
+			.annotate(is_key=Case(When(key_query, then=Value(True)),
+								  default=Value(False),
+								  output_field=BooleanField())) \
+			.order_by('-is_key', '-similarity', '-id') \
+			.values('id', 'project_number', 'title')[:settings.PMDRAGON_TYPEAHEAD_LIMIT]
+
+	def get(self, request):
+		text = request.query_params.get('q', '').strip()
+
+		if not text:
+			return Response([])
+
+		try:
+			with transaction.atomic():
+				if connection.vendor == 'postgresql':
+					with connection.cursor() as cursor:
+						cursor.execute('SET LOCAL statement_timeout = %s', [settings.PMDRAGON_TYPEAHEAD_TIMEOUT])
+
+				issues = list(self.get_typeahead_queryset(text))
+		except OperationalError:
+			issues = []
+
+		return Response([
+			{
+				'id': issue['id'],
+				'key': issue['project_number'],
+				'title': issue['title']
+			}
+			for issue
+			in issues
+		])
+
+
+class MentionCursorPagination(CursorPagination):
+	"""
+	Keyset pagination, next page is found by the last created_at,
+	so it's fast for any page and new mentions don't shift pages.
+	"""
+	ordering = ('-created_at', '-id')
+	page_size = settings.PMDRAGON_MENTIONS_PAGE_SIZE
+
+
+class MentionViewSet(WorkspacesReadOnlyModelViewSet):
+	"""
+	Mentions of current person, the newest first.
+	"""
+	queryset = Mention.objects.all()
+	serializer_class = MentionSerializer
+	pagination_class = MentionCursorPagination
+	permission_classes = (
+		IsAuthenticated,
+		IsParticipateInWorkspace,
+	)
+
+	def get_queryset(self):
+		try:
+			person = self.request.user.person
+		except Person.DoesNotExist:
+			return self.queryset.none()
+
+		return self.queryset.filter(person=person)
+
+
 class IssueMessagesViewSet(WorkspacesModelViewSet):
 	"""
 	We use this view to get messages for current issue.
@@ -708,6 +1108,71 @@ class IssueAttachmentViewSet(WorkspacesReadOnlyModelViewSet,
 		)
 
 
+class IssueImportViewSet(WorkspacesReadOnlyModelViewSet,
+						 mixins.CreateModelMixin):
+	"""
+	Upload CSV or NDJSON file as source to import issues to project.
+	File is imported in background, look at apps/core/imports.py.
+	Progress is sent to workspace subscribers as issue_import model,
+	or it can be retrieved here.
+	"""
+	queryset = IssueImport.objects.all()
+	serializer_class = IssueImportSerializer
+	parser_classes = (
+		MultiPartParser,
+		FormParser,
+	)
+	permission_classes = (
+		IsAuthenticated,
+		IsParticipateInWorkspace,
+	)
+
+	def perform_create(self, serializer):
+		issue_import = serializer.save()
+		transaction.on_commit(lambda: import_issues.delay(issue_import.pk))
+
+
+class WorkspaceExportViewSet(WorkspacesReadOnlyModelViewSet,
+							 mixins.CreateModelMixin):
+	"""
+	Export projects, issues, history, messages and sprints with efforts of workspace.
+	Small workspace is exported in request and returned in response right away.
+	Large one is exported in background to file, export is returned with 202 status,
+	file is available here when export is done.
+	Look at apps/core/exports.py for detailed information.
+	"""
+	queryset = WorkspaceExport.objects.all()
+	serializer_class = WorkspaceExportSerializer
+	permission_classes = (
+		IsAuthenticated,
+		IsParticipateInWorkspace,
+	)
+
+	def create(self, request, *args, **kwargs):
+		serializer = self.get_serializer(data=request.data)
+		serializer.is_valid(raise_exception=True)
+
+		workspace = serializer.validated_data['workspace']
+
+		if is_exported_in_response(workspace):
+			exporter = WorkspaceExporter(workspace,
+										 serializer.validated_data.get('format', WorkspaceExport.FORMAT_NDJSON),
+										 section=serializer.validated_data.get('section', ''))
+
+			response = FileResponse(export_to_response_file(exporter),
+									as_attachment=True,
+									filename=exporter.get_filename(),
+									content_type=exporter.content_type)
+			response['Content-Length'] = exporter.size
+
+			return response
+
+		workspace_export = serializer.save()
+		transaction.on_commit(lambda: export_workspace.delay(workspace_export.pk))
+
+		return Response(serializer.data, status=status.HTTP_202_ACCEPTED)
+
+
 class ProjectBacklogViewSet(WorkspacesReadOnlyModelViewSet,
 							mixins.UpdateModelMixin):
 	"""
@@ -718,14 +1183,19 @@ class ProjectBacklogViewSet(WorkspacesReadOnlyModelViewSet,
 	"""
 	queryset = ProjectBacklog.objects.all()
 	serializer_class = BacklogWritableSerializer
+	list_version_models = (
+		ProjectBacklog,
+		Issue,
+	)
 	permission_classes = (
 		IsAuthenticated,
 		IsParticipateInWorkspace,
 	)
 
 
-class ProjectWorkingDaysViewSet(WorkspacesReadOnlyModelViewSet,
-										mixins.UpdateModelMixin):
+class ProjectWorkingDaysViewSet(CatalogCacheMixin,
+								WorkspacesReadOnlyModelViewSet,
+								mixins.UpdateModelMixin):
 	"""
 	We use Working Days to build a guideline for Sprint BurnDown Chart.
 	ProjectWorkingDays contain:
@@ -733,6 +1203,10 @@ class ProjectWorkingDaysViewSet(WorkspacesReadOnlyModelViewSet,
 	"""
 	queryset = ProjectWorkingDays.objects.all()
 	serializer_class = ProjectWorkingDaysSerializer
+	list_version_models = (
+		ProjectWorkingDays,
+		ProjectNonWorkingDay,
+	)
 	permission_classes = (
 		IsAuthenticated,
 		IsParticipateInWorkspace
@@ -754,7 +1228,7 @@ class ProjectNonWorkingDayViewSet(WorkspacesModelViewSet):
 	)
 
 
-class SprintDurationViewSet(WorkspacesModelViewSet):
+class SprintDurationViewSet(CatalogCacheMixin, WorkspacesModelViewSet):
 	"""
 	View for getting, editing, deleting instance.
 	We do not use it at this stage.
@@ -775,6 +1249,10 @@ class SprintViewSet(WorkspacesModelViewSet):
 	"""
 	queryset = Sprint.objects.all()
 	serializer_class = SprintWritableSerializer
+	list_version_models = (
+		Sprint,
+		Issue,
+	)
 	permission_classes = (
 		IsAuthenticated,
 		IsParticipateInWorkspace,
@@ -981,6 +1459,9 @@ class IssueListUpdateApiView(UpdateAPIView):
 			instances, data=request.data, partial=False, many=True
 		)
 		serializer.is_valid(raise_exception=True)
-		self.perform_update(serializer)
+
+		# All changes are broadcast as one frame after commit
+		with transaction.atomic():
+			self.perform_update(serializer)
 
 		return Response(serializer.data)
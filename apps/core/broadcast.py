@@ -0,0 +1,263 @@
+from collections import OrderedDict
+
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.db import transaction
+
+from libs.helpers.transactions import get_transaction_buffer
+
+from .api.serializers import \
+	IssueMessageSerializer, \
+	IssueSerializer, \
+	IssueTypeSerializer, \
+	IssueTypeIconSerializer, \
+	IssueStateSerializer, \
+	IssueEstimationSerializer, \
+	IssueImportSerializer, \
+	SprintEffortsHistorySerializer
+
+from .models import \
+	Issue, \
+	IssueMessage, \
+	IssueTypeCategory, \
+	IssueTypeCategoryIcon, \
+	IssueStateCategory, \
+	IssueEstimationCategory, \
+	IssueImport, \
+	SprintEffortsHistory, \
+	WorkspaceEvent
+
+WORKSPACE_GROUP_TEMPLATE = 'workspace-{workspace_id}'
+PROJECT_GROUP_TEMPLATE = 'workspace-{workspace_id}-project-{project_id}'
+WORKSPACE_EVENT_TYPE = 'workspace.event'
+
+
+class BroadcastAction:
+	CREATE = 'create'
+	UPDATE = 'update'
+	DELETE = 'delete'
+
+
+"""
+Models that are broadcast to workspace subscribers.
+Model name is used by clients to choose what they want to get. """
+BROADCAST_MODELS = {
+	Issue: ('issue', IssueSerializer),
+	IssueMessage: ('issue_message', IssueMessageSerializer),
+	IssueTypeCategory: ('issue_type', IssueTypeSerializer),
+	IssueTypeCategoryIcon: ('issue_type_icon', IssueTypeIconSerializer),
+	IssueStateCategory: ('issue_state', IssueStateSerializer),
+	IssueEstimationCategory: ('issue_estimation', IssueEstimationSerializer),
+	SprintEffortsHistory: ('sprint_efforts_history', SprintEffortsHistorySerializer),
+	IssueImport: ('issue_import', IssueImportSerializer),
+}
+
+BROADCAST_MODEL_NAMES = frozenset(name for name, _ in BROADCAST_MODELS.values())
+
+
+def get_workspace_group_name(workspace_id: int) -> str:
+	return WORKSPACE_GROUP_TEMPLATE.format(workspace_id=workspace_id)
+
+
+def get_project_group_name(workspace_id: int, project_id: int) -> str:
+	return PROJECT_GROUP_TEMPLATE.format(workspace_id=workspace_id, project_id=project_id)
+
+
+def is_broadcast_model(model) -> bool:
+	return model in BROADCAST_MODELS
+
+
+def get_model_by_name(model_name: str):
+	for model, (name, _) in BROADCAST_MODELS.items():
+		if name == model_name:
+			return model
+
+	raise LookupError(model_name)
+
+
+"""
+Fields that are always sent with changed fields """
+DELTA_KEY_FIELDS = frozenset(['id', 'version'])
+
+SNAPSHOT_ATTRIBUTE = '_broadcast_snapshot'
+
+
+def take_snapshot(instance):
+	"""
+	Remember loaded values, so on save we know which fields were changed.
+	We don't touch deferred fields to not load them. """
+	values = instance.__dict__
+
+	setattr(instance, SNAPSHOT_ATTRIBUTE, {
+		field.attname: values[field.attname]
+		for field
+		in instance._meta.concrete_fields
+		if field.attname in values
+	})
+
+
+def get_changed_fields(instance) -> set:
+	snapshot = getattr(instance, SNAPSHOT_ATTRIBUTE, {})
+	values = instance.__dict__
+
+	return {
+		field.name
+		for field
+		in instance._meta.concrete_fields
+		if field.attname in values
+		and (field.attname not in snapshot or snapshot[field.attname] != values[field.attname])
+	}
+
+
+def serialize(instance, fields=None) -> dict:
+	"""
+	Serialize whole instance or only given fields of it.
+	Not requested fields are removed before serialization,
+	so we don't even calculate them. """
+	_, serializer_class = BROADCAST_MODELS[instance.__class__]
+	serializer = serializer_class(instance)
+
+	if fields is not None:
+		for field_name in list(serializer.fields.keys()):
+			if field_name not in fields and field_name not in DELTA_KEY_FIELDS:
+				serializer.fields.pop(field_name)
+
+	return serializer.data
+
+
+def get_event(instance, action: str, fields=None) -> dict:
+	"""
+	Created instances are sent as whole objects.
+	Updated instances are sent as changed fields plus version,
+	whole object can be requested by client, look at WorkspaceObserver.
+	Deleted instances are not serialized, clients only need to know the key. """
+	model_name, _ = BROADCAST_MODELS[instance.__class__]
+
+	if action == BroadcastAction.DELETE:
+		data = {'id': instance.pk}
+	elif action == BroadcastAction.UPDATE:
+		data = serialize(instance, fields=fields)
+	else:
+		data = serialize(instance)
+
+	return {
+		'model': model_name,
+		'action': action,
+		'pk': instance.pk,
+		'project': instance.project_id,
+		'version': getattr(instance, 'version', None),
+		'data': data
+	}
+
+
+def send_to_workspace(workspace_id: int, events: list):
+	"""
+	Events are logged with sequence number first,
+	so reconnected clients can replay what they missed. """
+	if not events:
+		return
+
+	sequence = WorkspaceEvent.log(workspace_id, events)
+
+	channel_layer = get_channel_layer()
+
+	if channel_layer is None:
+		return
+
+	def get_message(message_events: list) -> dict:
+		return {
+			'type': WORKSPACE_EVENT_TYPE,
+			'workspace_pk': workspace_id,
+			'sequence': sequence,
+			'events': message_events
+		}
+
+	group_send = async_to_sync(channel_layer.group_send)
+	group_send(get_workspace_group_name(workspace_id), get_message(events))
+
+	"""
+	Project subscribers get only events of their project with the same sequence """
+	project_events = OrderedDict()
+	for event in events:
+		project_events.setdefault(event['project'], []).append(event)
+
+	for project_id, events_of_project in project_events.items():
+		group_send(get_project_group_name(workspace_id, project_id), get_message(events_of_project))
+
+
+class WorkspaceEventBuffer:
+	"""
+	Changes collected during one transaction.
+	Changes of the same instance are coalesced, so the last state wins,
+	changed fields are merged, and instance is serialized only once -
+	when the transaction is committed.
+	On flush we send one frame per workspace group.
+	Versions of lists are flushed first, so clients that refetch lists
+	on received frame never get stale ETag.
+	"""
+	commit_order = 1
+
+	def __init__(self):
+		# workspace_id -> (model_name, pk) -> [action, instance or prepared event, changed fields]
+		self.changes = OrderedDict()
+
+	def add(self, instance, action: str, fields: set = None):
+		model_name, _ = BROADCAST_MODELS[instance.__class__]
+		changes = self.changes.setdefault(instance.workspace_id, OrderedDict())
+		key = (model_name, instance.pk)
+		previous = changes.get(key)
+
+		if action == BroadcastAction.DELETE:
+			if previous is not None and previous[0] == BroadcastAction.CREATE:
+				# Created and deleted in the same transaction - nobody has to know
+				del changes[key]
+				return
+
+			changes[key] = [action, get_event(instance, action), None]
+			return
+
+		if previous is not None and previous[0] == BroadcastAction.CREATE:
+			action = BroadcastAction.CREATE
+
+		if previous is not None and previous[0] == BroadcastAction.UPDATE:
+			fields = set(fields or set()) | previous[2]
+
+		changes[key] = [action, instance, set(fields or set())]
+
+	@staticmethod
+	def get_events(changes: OrderedDict) -> list:
+		return [
+			payload if action == BroadcastAction.DELETE else get_event(payload, action, fields=fields)
+			for action, payload, fields
+			in changes.values()
+		]
+
+	def flush(self):
+		changes, self.changes = self.changes, OrderedDict()
+
+		for workspace_id, workspace_changes in changes.items():
+			send_to_workspace(workspace_id, self.get_events(workspace_changes))
+
+
+def broadcast_instances(instances, action: str, fields=None):
+	"""
+	Send changes of instances to workspace groups after commit,
+	so subscribers never get changes that were rolled back.
+	Inside transaction all changes are coalesced and sent as one frame per workspace.
+	If fields are not given - we compare instance with values it was loaded with.
+	Bulk operations don't send signals, so they have to call it directly.
+	"""
+	in_transaction = transaction.get_connection().in_atomic_block
+	buffer = get_transaction_buffer(WorkspaceEventBuffer) if in_transaction else WorkspaceEventBuffer()
+
+	for instance in instances:
+		changed_fields = get_changed_fields(instance) if fields is None else set(fields)
+		buffer.add(instance, action, fields=changed_fields)
+		take_snapshot(instance)
+
+	if not in_transaction:
+		buffer.flush()
+
+
+def broadcast_instance(instance, action: str, fields=None):
+	broadcast_instances([instance], action, fields=fields)
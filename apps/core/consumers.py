@@ -1,9 +1,16 @@
 from channels.db import database_sync_to_async
+from django.core.exceptions import ObjectDoesNotExist
+from django.http import QueryDict
 from djangochannelsrestframework.consumers import AsyncAPIConsumer
 from djangochannelsrestframework.decorators import action
+from djangochannelsrestframework.generics import GenericAsyncAPIConsumer
+from djangochannelsrestframework.mixins import ListModelMixin, RetrieveModelMixin, PatchModelMixin
 from djangochannelsrestframework.observer import model_observer
 from djangochannelsrestframework.permissions import IsAuthenticated
+from rest_framework import status
+from rest_framework.exceptions import NotFound, ValidationError
 
+from .api.views import IssueViewSet, IssueStateCategoryViewSet, IssueTypeCategoryViewSet
 from .api.serializers import \
 	IssueMessageSerializer, \
 	IssueSerializer, \
@@ -12,6 +19,8 @@ from .api.serializers import \
 	IssueStateSerializer, \
 	IssueEstimationSerializer, SprintEffortsHistorySerializer
 
+from .broadcast import BROADCAST_MODEL_NAMES, get_workspace_group_name, get_project_group_name, get_model_by_name, \
+	serialize
 from .models import \
 	Issue, \
 	IssueMessage, \
@@ -19,14 +28,53 @@ from .models import \
 	IssueTypeCategoryIcon, \
 	IssueStateCategory, \
 	IssueEstimationCategory, \
-	Person, \
-	Workspace, SprintEffortsHistory
+	Workspace, SprintEffortsHistory, WorkspaceCounter, WorkspaceEvent, \
+	Project, \
+	Sprint
 
 UNABLE_SUBSCRIBE_NO_WORKSPACE_TEMPLATE = 'Unable to subscribe {obj} cause workspace was not found'
 UNABLE_UNSUBSCRIBE_NO_WORKSPACE_TEMPLATE = 'Unable to unsubscribe {obj} cause workspace was not found'
+UNABLE_SUBSCRIBE_NO_PROJECT_TEMPLATE = 'Unable to subscribe {obj} cause project was not found'
+UNABLE_UNSUBSCRIBE_NO_PROJECT_TEMPLATE = 'Unable to unsubscribe {obj} cause project was not found'
+UNABLE_SUBSCRIBE_NO_SPRINT_TEMPLATE = 'Unable to subscribe {obj} cause sprint was not found'
+UNABLE_UNSUBSCRIBE_NO_SPRINT_TEMPLATE = 'Unable to unsubscribe {obj} cause sprint was not found'
 
+"""
+Downstream message with the payload that is shared by many connections """
+SHARED_FRAME_TYPE = 'multiplexer.frame'
 
-class IssueMessagesObserver(AsyncAPIConsumer):
+
+class PersonScopeMixin:
+	"""
+	Person is resolved once in JWTAuthMiddleware and placed to the scope,
+	so we don't look it up again on every subscribe.
+	"""
+	def get_person(self):
+		return self.scope.get('person')
+
+	@database_sync_to_async
+	def get_workspace_filter_data(self, workspace_pk, **kwargs):
+		workspace = Workspace.objects.get(id=workspace_pk,
+										  participants__in=[self.get_person()])
+
+		return workspace
+
+	@database_sync_to_async
+	def get_project_filter_data(self, project_pk, **kwargs):
+		project = Project.objects.get(id=project_pk,
+									  workspace__participants__in=[self.get_person()])
+
+		return project
+
+	@database_sync_to_async
+	def get_sprint_filter_data(self, sprint_pk, **kwargs):
+		sprint = Sprint.objects.get(id=sprint_pk,
+									workspace__participants__in=[self.get_person()])
+
+		return sprint
+
+
+class IssueMessagesObserver(PersonScopeMixin, AsyncAPIConsumer):
 	"""
     This consumer allow us to subscribe to all messages in give issue.
     By checking permission we have to check that issue belong to one of
@@ -64,12 +112,9 @@ class IssueMessagesObserver(AsyncAPIConsumer):
 
 	@database_sync_to_async
 	def get_issue_filter_data(self, issue_pk, **kwargs):
-		user = self.scope.get('user')
-		person = Person.objects.get(user=user)
-
 		issue = Issue.objects.get(
 			id=issue_pk,
-			workspace__participants__in=[person])
+			workspace__participants__in=[self.get_person()])
 
 		return issue
 
@@ -90,7 +135,7 @@ class IssueMessagesObserver(AsyncAPIConsumer):
 			print(UNABLE_UNSUBSCRIBE_NO_WORKSPACE_TEMPLATE.format(obj=Issue._meta.model_name))
 
 
-class WorkspaceIssuesObserver(AsyncAPIConsumer):
+class WorkspaceIssuesObserver(PersonScopeMixin, AsyncAPIConsumer):
 	"""
     This consumer allow us to subscribe to all issues in give workspace.
     By checking permission we have to check that person participate in given workspace.
@@ -102,6 +147,7 @@ class WorkspaceIssuesObserver(AsyncAPIConsumer):
     }
     With stream payload should look like this.
     {"stream":"workspace_issues","payload":{"action":"subscribe_to_issues_in_workspace","request_id":442,"issue_pk":61}}
+    To get issues of one project only use "subscribe_to_issues_in_project" with "project_pk".
     """
 	permission_classes = (
 		IsAuthenticated,  # Special async permission
@@ -118,25 +164,18 @@ class WorkspaceIssuesObserver(AsyncAPIConsumer):
 	@issue_change_handler.groups_for_signal
 	def issue_change_handler(self, instance: Issue, **kwargs):
 		yield f'-workspace__{instance.workspace_id}'
+		yield f'-project__{instance.project_id}'
 		yield f'-pk__{instance.pk}'
 
 	@issue_change_handler.groups_for_consumer
-	def issue_change_handler(self, workspace=None, issue=None, **kwargs):
+	def issue_change_handler(self, workspace=None, project=None, issue=None, **kwargs):
 		if workspace is not None:
 			yield f'-workspace__{workspace.pk}'
+		if project is not None:
+			yield f'-project__{project.pk}'
 		if issue is not None:
 			yield f'-pk__{issue.pk}'
 
-	@database_sync_to_async
-	def get_workspace_filter_data(self, workspace_pk, **kwargs):
-		user = self.scope.get('user')
-		person = Person.objects.get(user=user)
-
-		workspace = Workspace.objects.get(id=workspace_pk,
-										  participants__in=[person])
-
-		return workspace
-
 	@action()
 	async def subscribe_to_issues_in_workspace(self, workspace_pk, **kwargs):
 		try:
@@ -153,8 +192,24 @@ class WorkspaceIssuesObserver(AsyncAPIConsumer):
 		except Workspace.DoesNotExist:
 			print(UNABLE_UNSUBSCRIBE_NO_WORKSPACE_TEMPLATE.format(obj=Issue._meta.model_name))
 
+	@action()
+	async def subscribe_to_issues_in_project(self, project_pk, **kwargs):
+		try:
+			project = await self.get_project_filter_data(project_pk=project_pk)
+			await self.issue_change_handler.subscribe(project=project)
+		except Project.DoesNotExist:
+			print(UNABLE_SUBSCRIBE_NO_PROJECT_TEMPLATE.format(obj=Issue._meta.model_name))
+
+	@action()
+	async def unsubscribe_from_issues_in_project(self, project_pk, **kwargs):
+		try:
+			project = await self.get_project_filter_data(project_pk=project_pk)
+			await self.issue_change_handler.unsubscribe(project=project)
+		except Project.DoesNotExist:
+			print(UNABLE_UNSUBSCRIBE_NO_PROJECT_TEMPLATE.format(obj=Issue._meta.model_name))
+
 
-class WorkspaceIssueTypeCategoriesObserver(AsyncAPIConsumer):
+class WorkspaceIssueTypeCategoriesObserver(PersonScopeMixin, AsyncAPIConsumer):
 	"""
     This consumer allow us to subscribe to all issues types in given workspace.
     By checking permission we have to check that person participate in given workspace.
@@ -187,25 +242,18 @@ class WorkspaceIssueTypeCategoriesObserver(AsyncAPIConsumer):
 	@issue_type_category_change_handler.groups_for_signal
 	def issue_type_category_change_handler(self, instance: IssueTypeCategory, **kwargs):
 		yield f'-workspace__{instance.workspace_id}'
+		yield f'-project__{instance.project_id}'
 		yield f'-pk__{instance.pk}'
 
 	@issue_type_category_change_handler.groups_for_consumer
-	def issue_type_category_change_handler(self, workspace=None, issue_type=None, **kwargs):
+	def issue_type_category_change_handler(self, workspace=None, project=None, issue_type=None, **kwargs):
 		if workspace is not None:
 			yield f'-workspace__{workspace.pk}'
+		if project is not None:
+			yield f'-project__{project.pk}'
 		if issue_type is not None:
 			yield f'-pk__{issue_type.pk}'
 
-	@database_sync_to_async
-	def get_workspace_filter_data(self, workspace_pk, **kwargs):
-		user = self.scope.get('user')
-		person = Person.objects.get(user=user)
-
-		workspace = Workspace.objects.get(id=workspace_pk,
-										  participants__in=[person])
-
-		return workspace
-
 	@action()
 	async def subscribe_to_issue_type_categories_in_workspace(self, workspace_pk, **kwargs):
 		try:
@@ -222,8 +270,24 @@ class WorkspaceIssueTypeCategoriesObserver(AsyncAPIConsumer):
 		except Workspace.DoesNotExist:
 			print(UNABLE_UNSUBSCRIBE_NO_WORKSPACE_TEMPLATE.format(obj=IssueTypeCategory._meta.model_name))
 
+	@action()
+	async def subscribe_to_issue_type_categories_in_project(self, project_pk, **kwargs):
+		try:
+			project = await self.get_project_filter_data(project_pk=project_pk)
+			await self.issue_type_category_change_handler.subscribe(project=project)
+		except Project.DoesNotExist:
+			print(UNABLE_SUBSCRIBE_NO_PROJECT_TEMPLATE.format(obj=IssueTypeCategory._meta.model_name))
 
-class WorkspaceIssueTypeCategoriesIconsObserver(AsyncAPIConsumer):
+	@action()
+	async def unsubscribe_from_issue_type_categories_in_project(self, project_pk, **kwargs):
+		try:
+			project = await self.get_project_filter_data(project_pk=project_pk)
+			await self.issue_type_category_change_handler.unsubscribe(project=project)
+		except Project.DoesNotExist:
+			print(UNABLE_UNSUBSCRIBE_NO_PROJECT_TEMPLATE.format(obj=IssueTypeCategory._meta.model_name))
+
+
+class WorkspaceIssueTypeCategoriesIconsObserver(PersonScopeMixin, AsyncAPIConsumer):
 	"""
     This consumer allow us to subscribe to all issues types icons in given workspace.
     By checking permission we have to check that person participate in given workspace.
@@ -256,25 +320,18 @@ class WorkspaceIssueTypeCategoriesIconsObserver(AsyncAPIConsumer):
 	@issue_type_category_icon_change_handler.groups_for_signal
 	def issue_type_category_icon_change_handler(self, instance: IssueTypeCategoryIcon, **kwargs):
 		yield f'-workspace__{instance.workspace_id}'
+		yield f'-project__{instance.project_id}'
 		yield f'-pk__{instance.pk}'
 
 	@issue_type_category_icon_change_handler.groups_for_consumer
-	def issue_type_category_icon_change_handler(self, workspace=None, issue_type_category_icon=None, **kwargs):
+	def issue_type_category_icon_change_handler(self, workspace=None, project=None, issue_type_category_icon=None, **kwargs):
 		if workspace is not None:
 			yield f'-workspace__{workspace.pk}'
+		if project is not None:
+			yield f'-project__{project.pk}'
 		if issue_type_category_icon is not None:
 			yield f'-pk__{issue_type_category_icon.pk}'
 
-	@database_sync_to_async
-	def get_workspace_filter_data(self, workspace_pk, **kwargs):
-		user = self.scope.get('user')
-		person = Person.objects.get(user=user)
-
-		workspace = Workspace.objects.get(id=workspace_pk,
-										  participants__in=[person])
-
-		return workspace
-
 	@action()
 	async def subscribe_to_issue_type_categories_icons_in_workspace(self, workspace_pk, **kwargs):
 		try:
@@ -291,8 +348,24 @@ class WorkspaceIssueTypeCategoriesIconsObserver(AsyncAPIConsumer):
 		except Workspace.DoesNotExist:
 			print(UNABLE_UNSUBSCRIBE_NO_WORKSPACE_TEMPLATE.format(obj=IssueTypeCategoryIcon._meta.model_name))
 
+	@action()
+	async def subscribe_to_issue_type_categories_icons_in_project(self, project_pk, **kwargs):
+		try:
+			project = await self.get_project_filter_data(project_pk=project_pk)
+			await self.issue_type_category_icon_change_handler.subscribe(project=project)
+		except Project.DoesNotExist:
+			print(UNABLE_SUBSCRIBE_NO_PROJECT_TEMPLATE.format(obj=IssueTypeCategoryIcon._meta.model_name))
+
+	@action()
+	async def unsubscribe_from_issue_type_categories_icons_in_project(self, project_pk, **kwargs):
+		try:
+			project = await self.get_project_filter_data(project_pk=project_pk)
+			await self.issue_type_category_icon_change_handler.unsubscribe(project=project)
+		except Project.DoesNotExist:
+			print(UNABLE_UNSUBSCRIBE_NO_PROJECT_TEMPLATE.format(obj=IssueTypeCategoryIcon._meta.model_name))
+
 
-class WorkspaceIssueStateCategoriesObserver(AsyncAPIConsumer):
+class WorkspaceIssueStateCategoriesObserver(PersonScopeMixin, AsyncAPIConsumer):
 	"""
     This consumer allow us to subscribe to all issues states in given workspace.
     By checking permission we have to check that person participate in given workspace.
@@ -326,25 +399,18 @@ class WorkspaceIssueStateCategoriesObserver(AsyncAPIConsumer):
 	@issue_state_change_handler.groups_for_signal
 	def issue_state_change_handler(self, instance: IssueStateCategory, **kwargs):
 		yield f'-workspace__{instance.workspace_id}'
+		yield f'-project__{instance.project_id}'
 		yield f'-pk__{instance.pk}'
 
 	@issue_state_change_handler.groups_for_consumer
-	def issue_state_change_handler(self, workspace=None, issue_state=None, **kwargs):
+	def issue_state_change_handler(self, workspace=None, project=None, issue_state=None, **kwargs):
 		if workspace is not None:
 			yield f'-workspace__{workspace.pk}'
+		if project is not None:
+			yield f'-project__{project.pk}'
 		if issue_state is not None:
 			yield f'-pk__{issue_state.pk}'
 
-	@database_sync_to_async
-	def get_workspace_filter_data(self, workspace_pk, **kwargs):
-		user = self.scope.get('user')
-		person = Person.objects.get(user=user)
-
-		workspace = Workspace.objects.get(id=workspace_pk,
-										  participants__in=[person])
-
-		return workspace
-
 	@action()
 	async def subscribe_to_issue_state_categories_in_workspace(self, workspace_pk, **kwargs):
 		try:
@@ -361,8 +427,24 @@ class WorkspaceIssueStateCategoriesObserver(AsyncAPIConsumer):
 		except Workspace.DoesNotExist:
 			print(UNABLE_UNSUBSCRIBE_NO_WORKSPACE_TEMPLATE.format(obj=IssueStateCategory._meta.model_name))
 
+	@action()
+	async def subscribe_to_issue_state_categories_in_project(self, project_pk, **kwargs):
+		try:
+			project = await self.get_project_filter_data(project_pk=project_pk)
+			await self.issue_state_change_handler.subscribe(project=project)
+		except Project.DoesNotExist:
+			print(UNABLE_SUBSCRIBE_NO_PROJECT_TEMPLATE.format(obj=IssueStateCategory._meta.model_name))
+
+	@action()
+	async def unsubscribe_from_issue_state_categories_in_project(self, project_pk, **kwargs):
+		try:
+			project = await self.get_project_filter_data(project_pk=project_pk)
+			await self.issue_state_change_handler.unsubscribe(project=project)
+		except Project.DoesNotExist:
+			print(UNABLE_UNSUBSCRIBE_NO_PROJECT_TEMPLATE.format(obj=IssueStateCategory._meta.model_name))
+
 
-class WorkspaceIssueEstimationCategoriesObserver(AsyncAPIConsumer):
+class WorkspaceIssueEstimationCategoriesObserver(PersonScopeMixin, AsyncAPIConsumer):
 	"""
     This consumer allow us to subscribe to all issues estimations in given workspace.
     By checking permission we have to check that person participate in given workspace.
@@ -396,25 +478,18 @@ class WorkspaceIssueEstimationCategoriesObserver(AsyncAPIConsumer):
 	@issue_estimation_category_change_handler.groups_for_signal
 	def issue_estimation_category_change_handler(self, instance: IssueEstimationCategory, **kwargs):
 		yield f'-workspace__{instance.workspace_id}'
+		yield f'-project__{instance.project_id}'
 		yield f'-pk__{instance.pk}'
 
 	@issue_estimation_category_change_handler.groups_for_consumer
-	def issue_estimation_category_change_handler(self, workspace=None, issue_estimation=None, **kwargs):
+	def issue_estimation_category_change_handler(self, workspace=None, project=None, issue_estimation=None, **kwargs):
 		if workspace is not None:
 			yield f'-workspace__{workspace.pk}'
+		if project is not None:
+			yield f'-project__{project.pk}'
 		if issue_estimation is not None:
 			yield f'-pk__{issue_estimation.pk}'
 
-	@database_sync_to_async
-	def get_workspace_filter_data(self, workspace_pk, **kwargs):
-		user = self.scope.get('user')
-		person = Person.objects.get(user=user)
-
-		workspace = Workspace.objects.get(id=workspace_pk,
-										  participants__in=[person])
-
-		return workspace
-
 	@action()
 	async def subscribe_to_issue_estimation_categories_in_workspace(self, workspace_pk, **kwargs):
 		try:
@@ -431,8 +506,24 @@ class WorkspaceIssueEstimationCategoriesObserver(AsyncAPIConsumer):
 		except Workspace.DoesNotExist:
 			print(UNABLE_UNSUBSCRIBE_NO_WORKSPACE_TEMPLATE.format(obj=IssueEstimationCategory._meta.model_name))
 
+	@action()
+	async def subscribe_to_issue_estimation_categories_in_project(self, project_pk, **kwargs):
+		try:
+			project = await self.get_project_filter_data(project_pk=project_pk)
+			await self.issue_estimation_category_change_handler.subscribe(project=project)
+		except Project.DoesNotExist:
+			print(UNABLE_SUBSCRIBE_NO_PROJECT_TEMPLATE.format(obj=IssueEstimationCategory._meta.model_name))
+
+	@action()
+	async def unsubscribe_from_issue_estimation_categories_in_project(self, project_pk, **kwargs):
+		try:
+			project = await self.get_project_filter_data(project_pk=project_pk)
+			await self.issue_estimation_category_change_handler.unsubscribe(project=project)
+		except Project.DoesNotExist:
+			print(UNABLE_UNSUBSCRIBE_NO_PROJECT_TEMPLATE.format(obj=IssueEstimationCategory._meta.model_name))
+
 
-class WorkspaceSprintEffortsHistoryObserver(AsyncAPIConsumer):
+class WorkspaceSprintEffortsHistoryObserver(PersonScopeMixin, AsyncAPIConsumer):
 	"""
 	This consumer allow us to subscribe to all Sprint Efforts changed.
 	Usually we do this to calculate how close are we to the end of Sprint.
@@ -465,25 +556,21 @@ class WorkspaceSprintEffortsHistoryObserver(AsyncAPIConsumer):
 	@sprint_efforts_history_change_handler.groups_for_signal
 	def sprint_efforts_history_change_handler(self, instance: SprintEffortsHistory, **kwargs):
 		yield f'-workspace__{instance.workspace_id}'
+		yield f'-project__{instance.project_id}'
+		yield f'-sprint__{instance.sprint_id}'
 		yield f'-pk__{instance.pk}'
 
 	@sprint_efforts_history_change_handler.groups_for_consumer
-	def sprint_efforts_history_change_handler(self, workspace=None, sprint_effort_history=None, **kwargs):
+	def sprint_efforts_history_change_handler(self, workspace=None, project=None, sprint=None, sprint_effort_history=None, **kwargs):
 		if workspace is not None:
 			yield f'-workspace__{workspace.pk}'
+		if project is not None:
+			yield f'-project__{project.pk}'
+		if sprint is not None:
+			yield f'-sprint__{sprint.pk}'
 		if sprint_effort_history is not None:
 			yield f'-pk__{sprint_effort_history.pk}'
 
-	@database_sync_to_async
-	def get_workspace_filter_data(self, workspace_pk, **kwargs):
-		user = self.scope.get('user')
-		person = Person.objects.get(user=user)
-
-		workspace = Workspace.objects.get(id=workspace_pk,
-										  participants__in=[person])
-
-		return workspace
-
 	@action()
 	async def subscribe_to_sprint_efforts_history_in_workspace(self, workspace_pk, **kwargs):
 		try:
@@ -500,3 +587,401 @@ class WorkspaceSprintEffortsHistoryObserver(AsyncAPIConsumer):
 		except Workspace.DoesNotExist:
 			print(UNABLE_UNSUBSCRIBE_NO_WORKSPACE_TEMPLATE.format(obj=SprintEffortsHistory._meta.model_name))
 
+	@action()
+	async def subscribe_to_sprint_efforts_history_in_project(self, project_pk, **kwargs):
+		try:
+			project = await self.get_project_filter_data(project_pk=project_pk)
+			await self.sprint_efforts_history_change_handler.subscribe(project=project)
+		except Project.DoesNotExist:
+			print(UNABLE_SUBSCRIBE_NO_PROJECT_TEMPLATE.format(obj=SprintEffortsHistory._meta.model_name))
+
+	@action()
+	async def unsubscribe_from_sprint_efforts_history_in_project(self, project_pk, **kwargs):
+		try:
+			project = await self.get_project_filter_data(project_pk=project_pk)
+			await self.sprint_efforts_history_change_handler.unsubscribe(project=project)
+		except Project.DoesNotExist:
+			print(UNABLE_UNSUBSCRIBE_NO_PROJECT_TEMPLATE.format(obj=SprintEffortsHistory._meta.model_name))
+
+	@action()
+	async def subscribe_to_sprint_efforts_history_in_sprint(self, sprint_pk, **kwargs):
+		try:
+			sprint = await self.get_sprint_filter_data(sprint_pk=sprint_pk)
+			await self.sprint_efforts_history_change_handler.subscribe(sprint=sprint)
+		except Sprint.DoesNotExist:
+			print(UNABLE_SUBSCRIBE_NO_SPRINT_TEMPLATE.format(obj=SprintEffortsHistory._meta.model_name))
+
+	@action()
+	async def unsubscribe_from_sprint_efforts_history_in_sprint(self, sprint_pk, **kwargs):
+		try:
+			sprint = await self.get_sprint_filter_data(sprint_pk=sprint_pk)
+			await self.sprint_efforts_history_change_handler.unsubscribe(sprint=sprint)
+		except Sprint.DoesNotExist:
+			print(UNABLE_UNSUBSCRIBE_NO_SPRINT_TEMPLATE.format(obj=SprintEffortsHistory._meta.model_name))
+
+
+class WorkspaceObserver(PersonScopeMixin, AsyncAPIConsumer):
+	"""
+	Consolidated consumer for all workspace changes.
+	Person is authorized once per workspace and joins the only one group for it (or groups of chosen projects),
+	events are tagged by model, so client chooses which models it wants to get.
+	Payload example
+	{
+		"action": "subscribe_to_workspace",
+		"request_id": 4,
+		"workspace_pk": 34,
+		"models": ["issue", "issue_state"]
+	}
+	Without models we send events for all models.
+	Add "projects": [12, 14] to get changes of these projects only.
+	With stream payload should look like this.
+	{
+	"stream": "workspace", "payload": {
+		"action": "subscribe_to_workspace",
+		"request_id": 442,
+		"workspace_pk": 34,
+		"models": ["issue", "issue_state"]
+	}
+	Events are coming like this.
+	{
+	"stream": "workspace", "payload": {
+		"workspace_pk": 34,
+		"sequence": 120,
+		"events": [{"model": "issue", "action": "update", "pk": 61, "project": 12, "version": 5, "data": {...}}]
+	}
+	Sequence is increasing for every frame in workspace, after reconnect
+	client subscribes with "since": 120 to get everything it missed.
+	Update events contain only changed fields in data,
+	look at retrieve_from_workspace to get the whole object.
+	Look at apps/core/broadcast.py for detailed information.
+	"""
+	permission_classes = (
+		IsAuthenticated,
+	)
+
+	def __init__(self, *args, **kwargs):
+		super().__init__(*args, **kwargs)
+		# workspace_pk -> set of model names person wants to get
+		self.workspace_models = {}
+		# workspace_pk -> set of project ids person wants to get or None for all projects
+		self.workspace_projects = {}
+		# workspace_pk -> set of group names we joined for it
+		self.workspace_groups = {}
+
+	@staticmethod
+	def get_models(models=None) -> frozenset:
+		if not models:
+			return BROADCAST_MODEL_NAMES
+
+		unknown_models = set(models) - BROADCAST_MODEL_NAMES
+
+		if unknown_models:
+			raise ValidationError({'models': [f'Unknown models: {", ".join(sorted(unknown_models))}']})
+
+		return frozenset(models)
+
+	@staticmethod
+	def get_pk(value, field: str) -> int:
+		"""
+		JSON clients can send ids as strings, events and groups use integers """
+		try:
+			return int(value)
+		except (TypeError, ValueError):
+			raise ValidationError({field: ['A valid integer is required.']})
+
+	@database_sync_to_async
+	def get_replay(self, workspace_pk, since: int):
+		entries = WorkspaceEvent.get_since(workspace_pk, since)
+		sequence = WorkspaceCounter.get_value(workspace_pk, WorkspaceEvent.SEQUENCE_COUNTER_LABEL)
+
+		return entries, sequence
+
+	@database_sync_to_async
+	def get_projects(self, workspace_pk, projects: list) -> frozenset:
+		project_ids = frozenset(
+			Project.objects
+			.filter(workspace_id=workspace_pk, id__in=projects)
+			.values_list('id', flat=True)
+		)
+
+		if project_ids != frozenset(projects):
+			raise NotFound(UNABLE_SUBSCRIBE_NO_PROJECT_TEMPLATE.format(obj=Project._meta.model_name))
+
+		return project_ids
+
+	async def set_workspace_groups(self, workspace_pk, groups: set):
+		current_groups = self.workspace_groups.get(workspace_pk, set())
+
+		for group in current_groups - groups:
+			await self.remove_group(group)
+
+		for group in groups - current_groups:
+			await self.add_group(group)
+
+		if groups:
+			self.workspace_groups[workspace_pk] = groups
+		else:
+			self.workspace_groups.pop(workspace_pk, None)
+
+	async def send_events(self, workspace_pk, sequence: int, events: list):
+		models = self.workspace_models.get(workspace_pk)
+		projects = self.workspace_projects.get(workspace_pk)
+
+		if models is None:
+			return
+
+		events = [
+			event
+			for event
+			in events
+			if event['model'] in models and (projects is None or event['project'] in projects)
+		]
+
+		if not events:
+			return
+
+		payload = {'workspace_pk': workspace_pk, 'sequence': sequence, 'events': events}
+
+		if 'demultiplexer_cls' not in self.scope:
+			await self.send_json(payload)
+			return
+
+		"""
+		Everyone who gets the same events gets the same frame,
+		so multiplexer encodes it only once, look at MultiplexerAsyncJson.multiplexer_frame.
+		Messages of project groups have the same sequence and different events,
+		so key is built from events that are actually sent. """
+		await self.base_send({
+			'type': SHARED_FRAME_TYPE,
+			'key': (workspace_pk, sequence, tuple(
+				(event['model'], event['pk'], event['version'], event['action'])
+				for event
+				in events
+			)),
+			'payload': payload
+		})
+
+	@action()
+	async def subscribe_to_workspace(self, workspace_pk, models=None, projects=None, since=None, **kwargs):
+		"""
+		With projects we join only groups of given projects,
+		so we don't get changes from other projects at all.
+		With since (the last sequence client got) we send everything it missed before reply.
+		If the log doesn't contain all events after since anymore - we reply with resync,
+		and client has to fetch everything again.
+		"""
+		models = self.get_models(models)
+		workspace_pk = self.get_pk(workspace_pk, 'workspace_pk')
+
+		if workspace_pk not in self.workspace_models:
+			try:
+				await self.get_workspace_filter_data(workspace_pk=workspace_pk)
+			except Workspace.DoesNotExist:
+				raise NotFound(UNABLE_SUBSCRIBE_NO_WORKSPACE_TEMPLATE.format(obj=Workspace._meta.model_name))
+
+		if projects:
+			projects = await self.get_projects(workspace_pk, [self.get_pk(project, 'projects') for project in projects])
+			groups = {get_project_group_name(workspace_pk, project_pk) for project_pk in projects}
+		else:
+			projects = None
+			groups = {get_workspace_group_name(workspace_pk)}
+
+		await self.set_workspace_groups(workspace_pk, groups)
+
+		self.workspace_models[workspace_pk] = models
+		self.workspace_projects[workspace_pk] = projects
+
+		reply = {
+			'workspace_pk': workspace_pk,
+			'models': sorted(models),
+			'projects': None if projects is None else sorted(projects)
+		}
+
+		if since is None:
+			return reply, status.HTTP_200_OK
+
+		entries, reply['sequence'] = await self.get_replay(workspace_pk, int(since))
+		reply['resync'] = entries is None
+
+		for entry in entries or []:
+			await self.send_events(workspace_pk, entry.sequence, entry.events)
+
+		return reply, status.HTTP_200_OK
+
+	@action()
+	async def unsubscribe_from_workspace(self, workspace_pk, **kwargs):
+		workspace_pk = self.get_pk(workspace_pk, 'workspace_pk')
+		self.workspace_models.pop(workspace_pk, None)
+		self.workspace_projects.pop(workspace_pk, None)
+		await self.set_workspace_groups(workspace_pk, set())
+
+		return {'workspace_pk': workspace_pk}, status.HTTP_200_OK
+
+	@database_sync_to_async
+	def get_instance_data(self, workspace_pk, model: str, pk) -> dict:
+		instance = get_model_by_name(model) \
+			.objects \
+			.get(pk=pk,
+				 workspace_id=workspace_pk,
+				 workspace__participants__in=[self.get_person()])
+
+		return serialize(instance)
+
+	@action()
+	async def retrieve_from_workspace(self, workspace_pk, model, pk, **kwargs):
+		"""
+		Updates contain only changed fields, so whole object can be requested with this action.
+		{
+			"action": "retrieve_from_workspace",
+			"request_id": 4,
+			"workspace_pk": 34,
+			"model": "issue",
+			"pk": 61
+		}
+		"""
+		if model not in BROADCAST_MODEL_NAMES:
+			raise ValidationError({'model': [f'Unknown model: {model}']})
+
+		try:
+			data = await self.get_instance_data(workspace_pk=workspace_pk, model=model, pk=pk)
+		except ObjectDoesNotExist:
+			raise NotFound()
+
+		return data, status.HTTP_200_OK
+
+	async def workspace_event(self, message: dict):
+		"""
+		Handler for messages from workspace group. """
+		await self.send_events(message['workspace_pk'], message['sequence'], message['events'])
+
+
+class WebsocketRequest:
+	"""
+	Just enough of DRF request for permissions and serializers of DRF views.
+	User and person are taken from the scope,
+	so we don't decode token and look for person on every action.
+	"""
+	authenticators = ()
+	successful_authenticator = None
+
+	def __init__(self, scope: dict, method: str, query_params: QueryDict = None):
+		self.user = scope['user']
+		self.method = method
+		self.data = {}
+		self.query_params = query_params if query_params is not None else QueryDict()
+
+		if scope.get('person') is not None:
+			self.user.person = scope['person']
+
+
+class WorkspaceResourceConsumer(PersonScopeMixin,
+								ListModelMixin,
+								RetrieveModelMixin,
+								PatchModelMixin,
+								GenericAsyncAPIConsumer):
+	"""
+	List, retrieve and patch resources of workspaces over websocket.
+	Serializer, permissions, queryset and filters are taken from DRF view set,
+	so we check and filter the same things as for HTTP requests.
+	Fields of payload are query parameters of view, look at IssueFilterSet for example.
+	Payload example
+	{
+		"action": "list",
+		"request_id": 5,
+		"project": 3,
+		"state": 4
+	}
+	{
+		"action": "patch",
+		"request_id": 6,
+		"pk": 61,
+		"data": {"state_category": 4}
+	}
+	Response is the same as dcrf response with data and response_status.
+	"""
+	permission_classes = (
+		IsAuthenticated,
+	)
+	view_class = None
+	filter_fields = (
+		'workspace',
+		'project',
+	)
+
+	"""
+	Actions of consumer -> actions of DRF view set and HTTP methods """
+	view_actions = {
+		'list': ('list', 'GET'),
+		'retrieve': ('retrieve', 'GET'),
+		'patch': ('partial_update', 'PATCH'),
+	}
+
+	"""
+	Fields of payload that are not query parameters """
+	payload_fields = (
+		'action',
+		'request_id',
+		'pk',
+		'data',
+	)
+
+	def get_query_params(self, **kwargs) -> QueryDict:
+		query_params = QueryDict(mutable=True)
+
+		for field, value in kwargs.items():
+			if field not in self.payload_fields and isinstance(value, (str, int, float, bool)):
+				query_params[field] = str(value)
+
+		return query_params
+
+	def get_view(self, action: str, **kwargs):
+		view_action, method = self.view_actions[action]
+		request = WebsocketRequest(self.scope, method=method, query_params=self.get_query_params(**kwargs))
+
+		return self.view_class(request=request, format_kwarg=None, action=view_action, args=(), kwargs={})
+
+	def get_serializer_class(self, **kwargs):
+		return self.view_class.serializer_class
+
+	def get_serializer_context(self, action: str = 'list', **kwargs) -> dict:
+		return self.get_view(action).get_serializer_context()
+
+	def get_queryset(self, action: str = 'list', **kwargs):
+		"""
+		Queryset of view is filtered by its own backends,
+		so workspace isolation and filters are the same as for HTTP requests. """
+		view = self.get_view(action, **kwargs)
+		view.check_permissions(view.request)
+
+		return view.filter_queryset(view.get_queryset())
+
+	def filter_queryset(self, queryset, **kwargs):
+		return queryset.filter(**{
+			field: kwargs[field]
+			for field
+			in self.filter_fields
+			if field in kwargs
+		})
+
+	def get_object(self, action: str = 'retrieve', **kwargs):
+		instance = super().get_object(action=action, **kwargs)
+
+		view = self.get_view(action)
+		view.check_object_permissions(view.request, instance)
+
+		return instance
+
+
+class IssuesConsumer(WorkspaceResourceConsumer):
+	"""
+	Issues for boards, look at WorkspaceResourceConsumer.
+	"""
+	view_class = IssueViewSet
+
+
+class IssueStatesConsumer(WorkspaceResourceConsumer):
+	view_class = IssueStateCategoryViewSet
+
+
+class IssueTypesConsumer(WorkspaceResourceConsumer):
+	view_class = IssueTypeCategoryViewSet
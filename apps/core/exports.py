@@ -0,0 +1,269 @@
+import csv
+import datetime
+import io
+import json
+import tempfile
+
+from django.conf import settings
+from django.core.files import File
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils import timezone
+
+from .models import \
+	Workspace, \
+	WorkspaceExport, \
+	Project, \
+	Issue, \
+	IssueHistory, \
+	IssueMessage, \
+	Sprint, \
+	SprintEffortsHistory
+
+
+class ExportSection:
+	"""
+	Rows of one model in workspace, columns are pairs of name and lookup.
+	Rows are read by values_list, so related titles and usernames are joined
+	by the same query and no model instance is created.
+	"""
+	def __init__(self, name: str, model, columns: tuple, workspace_lookup: str = 'workspace_id'):
+		self.name = name
+		self.model = model
+		self.columns = columns
+		self.workspace_lookup = workspace_lookup
+
+	@property
+	def header(self) -> list:
+		return [name for name, _ in self.columns]
+
+	def get_queryset(self, workspace_id: int):
+		return self.model.objects \
+			.filter(**{self.workspace_lookup: workspace_id}) \
+			.order_by('pk') \
+			.values_list(*[lookup for _, lookup in self.columns])
+
+	def iter_rows(self, workspace_id: int, chunk_size: int):
+		"""
+		On Postgres iterator reads rows by server side cursor,
+		so only chunk_size rows are in memory at once """
+		return self.get_queryset(workspace_id).iterator(chunk_size=chunk_size)
+
+
+EXPORT_SECTIONS = (
+	ExportSection('projects', Project, (
+		('id', 'pk'),
+		('title', 'title'),
+		('key', 'key'),
+		('owned_by', 'owned_by__user__username'),
+		('created_at', 'created_at'),
+	)),
+	ExportSection('issues', Issue, (
+		('id', 'pk'),
+		('project', 'project_id'),
+		('key', 'project_number'),
+		('title', 'title'),
+		('description', 'description'),
+		('type', 'type_category__title'),
+		('state', 'state_category__title'),
+		('estimation', 'estimation_category__title'),
+		('estimation_value', 'estimation_category__value'),
+		('assignee', 'assignee__user__username'),
+		('created_by', 'created_by__user__username'),
+		('ordering', 'ordering'),
+		('created_at', 'created_at'),
+		('updated_at', 'updated_at'),
+	)),
+	ExportSection('issue_history', IssueHistory, (
+		('id', 'pk'),
+		('issue', 'issue_id'),
+		('entry_type', 'entry_type'),
+		('edited_field', 'edited_field'),
+		('before_value', 'before_value'),
+		('after_value', 'after_value'),
+		('changed_by', 'changed_by__user__username'),
+		('created_at', 'created_at'),
+	)),
+	ExportSection('issue_messages', IssueMessage, (
+		('id', 'pk'),
+		('issue', 'issue_id'),
+		('description', 'description'),
+		('created_by', 'created_by__user__username'),
+		('created_at', 'created_at'),
+		('updated_at', 'updated_at'),
+	)),
+	ExportSection('sprints', Sprint, (
+		('id', 'pk'),
+		('project', 'project_id'),
+		('title', 'title'),
+		('goal', 'goal'),
+		('is_started', 'is_started'),
+		('is_completed', 'is_completed'),
+		('started_at', 'started_at'),
+		('finished_at', 'finished_at'),
+	)),
+	ExportSection('sprint_issues', Sprint.issues.through, (
+		('sprint', 'sprint_id'),
+		('issue', 'issue_id'),
+	), workspace_lookup='sprint__workspace_id'),
+	ExportSection('sprint_efforts', SprintEffortsHistory, (
+		('id', 'pk'),
+		('sprint', 'sprint_id'),
+		('point_at', 'point_at'),
+		('total_value', 'total_value'),
+		('done_value', 'done_value'),
+	)),
+)
+
+EXPORT_SECTION_NAMES = tuple(section.name for section in EXPORT_SECTIONS)
+
+CONTENT_TYPES = {
+	WorkspaceExport.FORMAT_CSV: 'text/csv; charset=utf-8',
+	WorkspaceExport.FORMAT_NDJSON: 'application/x-ndjson; charset=utf-8',
+}
+
+
+def is_exported_in_response(workspace: Workspace) -> bool:
+	"""
+	Export is returned in response if it's done before proxies give up on request.
+	Other rows of workspace grow with issues, so issues are enough to estimate it.
+	"""
+	issues = Issue.objects \
+		.filter(workspace=workspace) \
+		.order_by() \
+		.values('pk')[:settings.PMDRAGON_EXPORT_RESPONSE_ISSUES_LIMIT + 1] \
+		.count()
+
+	return issues <= settings.PMDRAGON_EXPORT_RESPONSE_ISSUES_LIMIT
+
+
+class LineBuffer:
+	"""
+	CSV writer writes to this buffer and gets written line back """
+	@staticmethod
+	def write(value: str) -> str:
+		return value
+
+
+def get_csv_value(value):
+	if isinstance(value, datetime.datetime):
+		return value.isoformat()
+
+	return value
+
+
+class WorkspaceExporter:
+	"""
+	Rows of workspace as lines of text, one line is one row.
+	NDJSON contains all or chosen section, every object has section key.
+	CSV is a table, so it contains one chosen section with header line.
+	Lines are generated while rows are read and written to file right away,
+	so memory stays flat.
+	Rows are read by the calling thread, so under ASGI export has to be written
+	in sync view or task, never in iterator of streamed response -
+	Django doesn't allow queries in event loop.
+	"""
+	def __init__(self, workspace: Workspace, export_format: str, section: str = '', chunk_size: int = None):
+		self.workspace = workspace
+		self.format = export_format
+		self.section = section
+		self.chunk_size = chunk_size or settings.PMDRAGON_EXPORT_CHUNK_SIZE
+
+		self.sections = [
+			export_section
+			for export_section
+			in EXPORT_SECTIONS
+			if not section or export_section.name == section
+		]
+
+		self.rows = 0
+		self.size = 0
+
+	@property
+	def content_type(self) -> str:
+		return CONTENT_TYPES[self.format]
+
+	def get_filename(self) -> str:
+		return f'{self.workspace.prefix_url.lower()}-{self.section or "workspace"}.{self.format}'
+
+	def iter_csv_lines(self):
+		writer = csv.writer(LineBuffer())
+
+		for section in self.sections:
+			yield writer.writerow(section.header)
+
+			for row in section.iter_rows(self.workspace.pk, self.chunk_size):
+				self.rows += 1
+				yield writer.writerow([get_csv_value(value) for value in row])
+
+	def iter_ndjson_lines(self):
+		for section in self.sections:
+			header = section.header
+
+			for row in section.iter_rows(self.workspace.pk, self.chunk_size):
+				self.rows += 1
+				yield json.dumps({'section': section.name, **dict(zip(header, row))}, cls=DjangoJSONEncoder) + '\n'
+
+	def iter_lines(self):
+		if self.format == WorkspaceExport.FORMAT_CSV:
+			return self.iter_csv_lines()
+
+		return self.iter_ndjson_lines()
+
+	def write_to(self, file):
+		"""
+		Write lines to binary file and rewind it, file is left open """
+		stream = io.TextIOWrapper(file, encoding='utf-8', newline='')
+		stream.writelines(self.iter_lines())
+		stream.flush()
+		stream.detach()
+
+		self.size = file.tell()
+		file.seek(0)
+
+
+def export_to_response_file(exporter: WorkspaceExporter):
+	"""
+	Small export is kept in memory, it's moved to temporary file on disk
+	only if it's larger than PMDRAGON_EXPORT_RESPONSE_SPOOL_SIZE.
+	"""
+	file = tempfile.SpooledTemporaryFile(max_size=settings.PMDRAGON_EXPORT_RESPONSE_SPOOL_SIZE)
+
+	try:
+		exporter.write_to(file)
+	except Exception:
+		file.close()
+		raise
+
+	return file
+
+
+def export_to_storage(workspace_export: WorkspaceExport) -> WorkspaceExport:
+	"""
+	Lines are written to temporary file on disk, then file is saved to storage,
+	so large export is never kept in memory.
+	"""
+	workspace_export.status = WorkspaceExport.STATUS_RUNNING
+	workspace_export.save()
+
+	exporter = WorkspaceExporter(workspace_export.workspace,
+								 workspace_export.format,
+								 section=workspace_export.section)
+
+	try:
+		with tempfile.TemporaryFile() as file:
+			exporter.write_to(file)
+			workspace_export.file.save(exporter.get_filename(), File(file), save=False)
+
+	except Exception as error:
+		workspace_export.status = WorkspaceExport.STATUS_FAILED
+		workspace_export.error = str(error)
+		workspace_export.finished_at = timezone.now()
+		workspace_export.save()
+		raise
+
+	workspace_export.status = WorkspaceExport.STATUS_DONE
+	workspace_export.rows = exporter.rows
+	workspace_export.finished_at = timezone.now()
+	workspace_export.save()
+
+	return workspace_export
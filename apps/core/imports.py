@@ -0,0 +1,333 @@
+import csv
+import io
+import json
+from itertools import islice
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from conf.common.mime_settings import FRONTEND_ICON_SET
+from .models import \
+	Project, \
+	ProjectBacklog, \
+	Issue, \
+	IssueHistory, \
+	IssueImport, \
+	IssueTypeCategory, \
+	IssueStateCategory, \
+	IssueEstimationCategory, \
+	IssueSearchDocument, \
+	Mention, \
+	WorkspaceCounter, \
+	get_mentioned_user_ids, \
+	post_bulk_create
+
+"""
+Fields of imported row, only title is required.
+Categories are found by title in the project,
+assignee by username or email of workspace participant. """
+IMPORT_FIELDS = ('title', 'description', 'type', 'state', 'estimation', 'assignee')
+
+TITLE_MAX_LENGTH = Issue._meta.get_field('title').max_length
+
+
+class ImportRowError(Exception):
+	pass
+
+
+def open_text(file) -> io.TextIOWrapper:
+	"""
+	Uploaded or stored file is binary, we read it as text line by line,
+	so whole file is never loaded to memory. BOM of spreadsheet exports is skipped.
+	"""
+	return io.TextIOWrapper(file, encoding='utf-8-sig', newline='')
+
+
+def get_format_by_filename(filename: str) -> str:
+	if filename.lower().endswith(('.ndjson', '.jsonl')):
+		return IssueImport.FORMAT_NDJSON
+
+	return IssueImport.FORMAT_CSV
+
+
+def read_csv_rows(stream):
+	"""
+	Header is the first line, rows are numbered by lines of file """
+	reader = csv.DictReader(stream)
+
+	for row in reader:
+		yield reader.line_num, row
+
+
+def read_ndjson_rows(stream):
+	"""
+	One JSON object per line, empty lines are skipped """
+	for line_number, line in enumerate(stream, start=1):
+		if not line.strip():
+			continue
+
+		try:
+			yield line_number, json.loads(line)
+		except ValueError:
+			yield line_number, ImportRowError('Row is not valid JSON')
+
+
+ROW_READERS = {
+	IssueImport.FORMAT_CSV: read_csv_rows,
+	IssueImport.FORMAT_NDJSON: read_ndjson_rows,
+}
+
+
+def get_text(row: dict, field: str) -> str:
+	value = row.get(field)
+
+	if value is None:
+		return ''
+
+	return str(value).strip()
+
+
+class ProjectCatalog:
+	"""
+	Categories and participants of project are loaded once per import,
+	so rows that refer them by title don't cost any query.
+	"""
+	def __init__(self, project: Project):
+		self.types, self.default_type = self.get_categories(IssueTypeCategory, project)
+		self.states, self.default_state = self.get_categories(IssueStateCategory, project)
+		self.estimations, _ = self.get_categories(IssueEstimationCategory, project)
+
+		self.persons = {}
+		for pk, username, email in project.workspace.participants.values_list('pk', 'user__username', 'user__email'):
+			self.persons[username.lower()] = pk
+
+			if email:
+				self.persons[email.lower()] = pk
+
+	@staticmethod
+	def get_categories(model, project: Project):
+		categories = {}
+		default = None
+
+		for category in model.objects.filter(workspace_id=project.workspace_id, project=project):
+			categories.setdefault(category.title.lower(), category.pk)
+
+			if getattr(category, 'is_default', False):
+				default = category.pk
+
+		return categories, default
+
+	@staticmethod
+	def find(mapping: dict, value: str, name: str, default=None):
+		if not value:
+			return default
+
+		try:
+			return mapping[value.lower()]
+		except KeyError:
+			raise ImportRowError(f'Unknown {name}: {value}')
+
+	def get_type(self, value: str):
+		return self.find(self.types, value, 'type', default=self.default_type)
+
+	def get_state(self, value: str):
+		return self.find(self.states, value, 'state', default=self.default_state)
+
+	def get_estimation(self, value: str):
+		return self.find(self.estimations, value, 'estimation')
+
+	def get_assignee(self, value: str):
+		return self.find(self.persons, value, 'assignee')
+
+
+class IssueImporter:
+	"""
+	Issues are created in chunks of PMDRAGON_ISSUE_IMPORT_CHUNK_SIZE rows,
+	every chunk is one transaction:
+	1) Numbers are allocated as one block, project row is locked, so parallel imports don't get the same block.
+	Issues are ordered after the last issue of backlog in order of rows.
+	2) Issues, backlog membership and creation history are inserted with bulk_create.
+	3) Search documents, mentions and list versions are updated for the whole chunk,
+	created issues are broadcast as one frame after commit.
+	4) Progress of import is saved, so workspace subscribers get it after commit.
+	Rows with errors are skipped and remembered in import,
+	already imported chunks stay if import failed.
+	Mentioned persons are indexed, but not notified, and sprints are not touched -
+	imported issues are put to backlog.
+	"""
+	def __init__(self, issue_import: IssueImport, chunk_size: int = None, on_progress=None):
+		self.issue_import = issue_import
+		self.chunk_size = chunk_size or settings.PMDRAGON_ISSUE_IMPORT_CHUNK_SIZE
+		self.on_progress = on_progress
+
+		self.project = issue_import.project
+		self.catalog = ProjectCatalog(self.project)
+		self.backlog = ProjectBacklog.objects \
+			.filter(workspace_id=self.project.workspace_id, project=self.project) \
+			.first()
+
+		self.titles = set()
+
+	def add_error(self, row_number: int, error: str):
+		if len(self.issue_import.errors) < settings.PMDRAGON_ISSUE_IMPORT_ERRORS_LIMIT:
+			self.issue_import.errors.append({'row': row_number, 'error': error})
+
+	def build_issue(self, row) -> Issue:
+		if isinstance(row, ImportRowError):
+			raise row
+
+		if not isinstance(row, dict):
+			raise ImportRowError('Row has to be an object')
+
+		title = get_text(row, 'title')
+
+		if not title:
+			raise ImportRowError('Title is required')
+
+		if len(title) > TITLE_MAX_LENGTH:
+			raise ImportRowError(f'Title is longer than {TITLE_MAX_LENGTH} characters')
+
+		if title in self.titles:
+			raise ImportRowError(f'Title is repeated: {title}')
+
+		issue = Issue(workspace_id=self.project.workspace_id,
+					  project=self.project,
+					  title=title,
+					  description=get_text(row, 'description'),
+					  type_category_id=self.catalog.get_type(get_text(row, 'type')),
+					  state_category_id=self.catalog.get_state(get_text(row, 'state')),
+					  estimation_category_id=self.catalog.get_estimation(get_text(row, 'estimation')),
+					  assignee_id=self.catalog.get_assignee(get_text(row, 'assignee')),
+					  created_by_id=self.issue_import.created_by_id,
+					  updated_by_id=self.issue_import.created_by_id)
+
+		issue.sanitize_description()
+		self.titles.add(title)
+
+		return issue
+
+	def exclude_existing_titles(self, numbered_issues: list) -> list:
+		existing_titles = set(
+			Issue.objects
+			.filter(workspace_id=self.project.workspace_id,
+					project=self.project,
+					title__in=[issue.title for _, issue in numbered_issues])
+			.values_list('title', flat=True)
+		)
+
+		for row_number, issue in numbered_issues:
+			if issue.title in existing_titles:
+				self.add_error(row_number, f'Issue with title already exists: {issue.title}')
+
+		return [issue for _, issue in numbered_issues if issue.title not in existing_titles]
+
+	def allocate_numbers(self, issues: list):
+		"""
+		Lock project till the end of chunk transaction and take the next block of numbers and orderings """
+		list(Project.objects.select_for_update().filter(pk=self.project.pk).values_list('pk', flat=True))
+
+		project_issues = Issue.objects.filter(workspace_id=self.project.workspace_id, project=self.project)
+
+		max_number = project_issues \
+			.aggregate(Max('number')) \
+			.get('number__max') or 0
+
+		backlog_issues = project_issues.filter(projectbacklog=self.backlog) if self.backlog is not None \
+			else project_issues
+
+		max_ordering = backlog_issues \
+			.aggregate(Max('ordering')) \
+			.get('ordering__max')
+
+		first_ordering = 0 if max_ordering is None else max_ordering + 1
+
+		for index, issue in enumerate(issues):
+			issue.number = max_number + 1 + index
+			issue.project_number = f'{self.project.key}-{issue.number}'
+			issue.ordering = first_ordering + index
+
+	def create_relations(self, issues: list):
+		if self.backlog is not None:
+			ProjectBacklog.issues.through.objects.bulk_create([
+				ProjectBacklog.issues.through(projectbacklog_id=self.backlog.pk, issue_id=issue.pk)
+				for issue
+				in issues
+			])
+
+		IssueHistory.objects.bulk_create([
+			IssueHistory(workspace_id=issue.workspace_id,
+						 project_id=issue.project_id,
+						 issue=issue,
+						 entry_type=FRONTEND_ICON_SET + 'playlist-plus',
+						 changed_by_id=issue.updated_by_id)
+			for issue
+			in issues
+		])
+
+		IssueSearchDocument.update_for([issue.pk for issue in issues])
+
+		for issue in issues:
+			if get_mentioned_user_ids(issue.description):
+				Mention.sync(issue, issue.description, mentioned_by=self.issue_import.created_by, created=True)
+
+		WorkspaceCounter.increment_list_versions(self.project.workspace_id, Issue, ProjectBacklog, IssueHistory)
+		post_bulk_create.send(sender=Issue, instances=issues)
+
+	def import_chunk(self, rows: list):
+		numbered_issues = []
+
+		for row_number, row in rows:
+			try:
+				numbered_issues.append((row_number, self.build_issue(row)))
+			except ImportRowError as error:
+				self.add_error(row_number, str(error))
+
+		with transaction.atomic():
+			if numbered_issues:
+				issues = self.exclude_existing_titles(numbered_issues)
+
+				if issues:
+					self.allocate_numbers(issues)
+					issues = Issue.objects.bulk_create(issues)
+					self.create_relations(issues)
+
+					self.issue_import.imported += len(issues)
+
+			self.issue_import.processed += len(rows)
+			self.issue_import.save()
+
+	def finish(self, status: str):
+		self.issue_import.status = status
+		self.issue_import.finished_at = timezone.now()
+		self.issue_import.save()
+
+	def run(self, stream):
+		"""
+		Import rows of given text stream, look at open_text """
+		rows = ROW_READERS[self.issue_import.format](stream)
+
+		self.issue_import.status = IssueImport.STATUS_RUNNING
+		self.issue_import.save()
+
+		try:
+			while True:
+				chunk = list(islice(rows, self.chunk_size))
+
+				if not chunk:
+					break
+
+				self.import_chunk(chunk)
+
+				if self.on_progress is not None:
+					self.on_progress(self.issue_import)
+
+		except Exception as error:
+			self.issue_import.errors.append({'row': None, 'error': str(error)})
+			self.finish(IssueImport.STATUS_FAILED)
+			raise
+
+		self.finish(IssueImport.STATUS_DONE)
+
+		return self.issue_import
@@ -0,0 +1,319 @@
+import json
+import uuid
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from apps.core.models import Person, Workspace, Project, Issue, IssueStateCategory, IssueHistory, IssueMessage, \
+	ProjectBacklog, Sprint, SprintEffortsHistory, Mention, MentionNotification
+
+
+class AuditRollback(Exception):
+	pass
+
+
+class Dataset:
+	"""
+	Generated workspaces, projects and rows of audited tables.
+	Rows are spread over projects, so every query shape selects small part of table,
+	as it happens in production. Planner is free to choose sequential scan for small tables,
+	that's why size of dataset is configurable.
+	"""
+	def __init__(self, rows: int, projects: int):
+		self.rows = rows
+		self.projects_amount = projects
+
+		"""
+		Random token in names, so generated persons and workspaces never collide with existing ones """
+		self.token = uuid.uuid4().hex[:8]
+
+		self.persons = []
+		self.projects = []
+		self.sprints = {}
+		self.backlogs = {}
+		self.issues = []
+
+	def create(self):
+		self.create_persons_and_projects()
+		self.create_issues()
+		self.create_issue_relations()
+		self.create_sprint_relations()
+		self.create_mentions()
+
+	def create_persons_and_projects(self):
+		for index in range(self.projects_amount):
+			user = User.objects.create_user(username=f'index-audit-{self.token}-{index}',
+											email=f'index-audit-{self.token}-{index}@pmdragon.org')
+			person = Person.objects.create(user=user)
+
+			workspace = Workspace.objects.create(prefix_url=f'AUD{self.token}{index}', owned_by=person)
+			workspace.participants.add(person)
+
+			project = Project.objects.create(workspace=workspace,
+											 title=f'AUDIT {index}',
+											 key=f'AUD{index}',
+											 owned_by=person)
+
+			self.persons.append(person)
+			self.projects.append(project)
+			self.sprints[project.pk] = Sprint.objects.create(workspace=workspace,
+															 project=project,
+															 title=f'Sprint {index}')
+			self.backlogs[project.pk] = ProjectBacklog.objects.get(project=project)
+
+	def create_issues(self):
+		state_categories = dict(
+			IssueStateCategory.objects
+			.filter(project__in=self.projects, is_default=True)
+			.values_list('project_id', 'pk')
+		)
+
+		issues = []
+		for number in range(1, self.rows + 1):
+			project = self.projects[number % len(self.projects)]
+			issues.append(Issue(workspace_id=project.workspace_id,
+								project=project,
+								title=f'Audit issue {number}',
+								number=number,
+								project_number=f'{project.key}-{number}',
+								state_category_id=state_categories.get(project.pk),
+								assignee=self.persons[number % len(self.persons)],
+								ordering=number))
+
+		self.issues = Issue.objects.bulk_create(issues, batch_size=1000)
+
+	def create_issue_relations(self):
+		IssueHistory.objects.bulk_create([
+			IssueHistory(workspace_id=issue.workspace_id,
+						 project_id=issue.project_id,
+						 issue=issue,
+						 entry_type='mdi-playlist-plus')
+			for issue
+			in self.issues
+		], batch_size=1000)
+
+		IssueMessage.objects.bulk_create([
+			IssueMessage(workspace_id=issue.workspace_id,
+						 project_id=issue.project_id,
+						 issue=issue,
+						 created_by=issue.assignee,
+						 description='<p>Audit</p>')
+			for issue
+			in self.issues
+		], batch_size=1000)
+
+	def create_sprint_relations(self):
+		in_sprint = self.issues[::2]
+		in_backlog = self.issues[1::2]
+
+		Sprint.issues.through.objects.bulk_create([
+			Sprint.issues.through(sprint_id=self.sprints[issue.project_id].pk, issue_id=issue.pk)
+			for issue
+			in in_sprint
+		], batch_size=1000)
+
+		ProjectBacklog.issues.through.objects.bulk_create([
+			ProjectBacklog.issues.through(projectbacklog_id=self.backlogs[issue.project_id].pk, issue_id=issue.pk)
+			for issue
+			in in_backlog
+		], batch_size=1000)
+
+		now = timezone.now()
+		SprintEffortsHistory.objects.bulk_create([
+			SprintEffortsHistory(workspace_id=project.workspace_id,
+								 project=project,
+								 sprint=self.sprints[project.pk],
+								 point_at=now - timedelta(hours=index),
+								 total_value=index,
+								 done_value=0)
+			for index, project
+			in ((index, self.projects[index % len(self.projects)]) for index in range(self.rows))
+		], batch_size=1000)
+
+	def create_mentions(self):
+		Mention.objects.bulk_create([
+			Mention(workspace_id=issue.workspace_id,
+					project_id=issue.project_id,
+					person=issue.assignee,
+					issue=issue)
+			for issue
+			in self.issues
+		], batch_size=1000)
+
+		"""
+		Almost all notifications were sent already """
+		now = timezone.now()
+		MentionNotification.objects.bulk_create([
+			MentionNotification(workspace_id=issue.workspace_id,
+								project_id=issue.project_id,
+								person=issue.assignee,
+								issue=issue,
+								sent_at=None if index % 100 == 0 else now)
+			for index, issue
+			in enumerate(self.issues)
+		], batch_size=1000)
+
+	@staticmethod
+	def analyze():
+		models = [Issue, IssueHistory, IssueMessage, SprintEffortsHistory, Mention, MentionNotification,
+				  Sprint.issues.through, ProjectBacklog.issues.through]
+
+		with connection.cursor() as cursor:
+			for model in models:
+				cursor.execute(f'ANALYZE {connection.ops.quote_name(model._meta.db_table)}')
+
+	def get_query_shapes(self) -> list:
+		"""
+		Queries used by viewsets, signals and tasks, with table that has to be read by index.
+		Every shape selects one project / issue / person out of generated ones.
+		"""
+		project = self.projects[len(self.projects) // 2]
+		issue = self.issues[len(self.issues) // 2]
+		person = self.persons[len(self.persons) // 2]
+		sprint = self.sprints[project.pk]
+		backlog = self.backlogs[project.pk]
+
+		return [
+			('Issues of project by ordering', Issue,
+			 Issue.objects.filter(workspace_id=project.workspace_id, project=project).order_by('ordering')),
+			('Next issue number', Issue,
+			 Issue.objects.filter(workspace_id=project.workspace_id, project=project).values('project')
+			 .annotate(number=Max('number')).values('number')),
+			('Issues filtered by state', Issue,
+			 Issue.objects.filter(project=project, state_category_id=issue.state_category_id).order_by()),
+			('Issues filtered by assignee', Issue,
+			 Issue.objects.filter(project=project, assignee=person).order_by()),
+			('Issues updated since', Issue,
+			 Issue.objects.filter(project=project, updated_at__gte=timezone.now()).order_by()),
+			('Issue by key prefix', Issue,
+			 Issue.objects.filter(project_number__startswith=issue.project_number).order_by()),
+			('History of issue', IssueHistory,
+			 IssueHistory.objects.filter(issue=issue).order_by('updated_at')),
+			('Messages of issue', IssueMessage,
+			 IssueMessage.objects.filter(issue=issue).order_by('created_at')),
+			('Efforts history of sprint', SprintEffortsHistory,
+			 SprintEffortsHistory.objects.filter(sprint=sprint).order_by('point_at')),
+			('Issues of sprint', Sprint.issues.through,
+			 Sprint.issues.through.objects.filter(sprint_id=sprint.pk)),
+			('Sprint of issue', Sprint.issues.through,
+			 Sprint.issues.through.objects.filter(issue_id=issue.pk)),
+			('Issues of backlog', ProjectBacklog.issues.through,
+			 ProjectBacklog.issues.through.objects.filter(projectbacklog_id=backlog.pk)),
+			('Backlog of issue', ProjectBacklog.issues.through,
+			 ProjectBacklog.issues.through.objects.filter(issue_id=issue.pk)),
+			('Mentions of person', Mention,
+			 Mention.objects.filter(person=person).order_by('-created_at', '-id')),
+			('Pending mention notifications', MentionNotification,
+			 MentionNotification.objects.filter(sent_at__isnull=True, created_at__lte=timezone.now())),
+		]
+
+
+def explain(queryset) -> dict:
+	"""
+	QuerySet.explain() flattens json plan to text, so we run EXPLAIN ourselves """
+	sql, params = queryset.query.sql_with_params()
+
+	with connection.cursor() as cursor:
+		cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}', params)
+		result = cursor.fetchone()[0]
+
+	if isinstance(result, str):
+		result = json.loads(result)
+
+	return result[0]['Plan']
+
+
+def get_seq_scans(plan: dict) -> list:
+	"""
+	Tables that are read by sequential scan anywhere in the plan """
+	tables = []
+
+	if plan.get('Node Type') == 'Seq Scan':
+		tables.append(plan.get('Relation Name'))
+
+	for child in plan.get('Plans', []):
+		tables.extend(get_seq_scans(child))
+
+	return tables
+
+
+def get_scan_nodes(plan: dict) -> list:
+	nodes = []
+
+	if 'Relation Name' in plan or 'Index Name' in plan:
+		node = plan['Node Type']
+
+		if 'Relation Name' in plan:
+			node += f' on {plan["Relation Name"]}'
+
+		if 'Index Name' in plan:
+			node += f' using {plan["Index Name"]}'
+
+		nodes.append(node)
+
+	for child in plan.get('Plans', []):
+		nodes.extend(get_scan_nodes(child))
+
+	return nodes
+
+
+class Command(BaseCommand):
+	help = 'Explain query shapes on generated dataset and fail if some of them use sequential scan. ' \
+		   'Dataset is created in a transaction and rolled back, but ANALYZE statistics stay, ' \
+		   'so run it only against a throwaway copy of database.'
+
+	def add_arguments(self, parser):
+		parser.add_argument('--rows',
+							type=int,
+							default=settings.PMDRAGON_INDEX_AUDIT_ROWS,
+							help='Amount of rows generated for every audited table')
+		parser.add_argument('--projects',
+							type=int,
+							default=50,
+							help='Amount of projects rows are spread over')
+		parser.add_argument('--throwaway-database',
+							action='store_true',
+							help='Confirm that configured database is a throwaway copy')
+
+	def handle(self, *args, **options):
+		if not options['throwaway_database']:
+			raise CommandError('Index audit writes generated rows and table statistics to configured database, '
+							   'point it to a throwaway copy and run with --throwaway-database')
+
+		if connection.vendor != 'postgresql':
+			raise CommandError('Index audit explains queries of Postgres only')
+
+		if options['rows'] < options['projects']:
+			raise CommandError('There have to be more rows than projects')
+
+		failures = []
+
+		try:
+			with transaction.atomic():
+				dataset = Dataset(rows=options['rows'], projects=options['projects'])
+				dataset.create()
+				dataset.analyze()
+
+				for name, model, queryset in dataset.get_query_shapes():
+					plan = explain(queryset)
+					nodes = ', '.join(get_scan_nodes(plan))
+
+					if model._meta.db_table in get_seq_scans(plan):
+						failures.append(name)
+						self.stdout.write(self.style.ERROR(f'SEQ SCAN  {name}: {nodes}'))
+					else:
+						self.stdout.write(f'OK        {name}: {nodes}')
+
+				raise AuditRollback
+		except AuditRollback:
+			pass
+
+		if failures:
+			raise CommandError(f'{len(failures)} query shapes use sequential scan: {", ".join(failures)}')
+
+		self.stdout.write(self.style.SUCCESS('All query shapes use indexes'))
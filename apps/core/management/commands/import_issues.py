@@ -0,0 +1,62 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.core.imports import IssueImporter, get_format_by_filename
+from apps.core.models import Person, Project, IssueImport
+
+
+class Command(BaseCommand):
+	help = 'Import issues to project from CSV or NDJSON file. ' \
+		   'Rows contain title, description, type, state, estimation and assignee.'
+
+	def add_arguments(self, parser):
+		parser.add_argument('project',
+							type=int,
+							help='Id of project issues are imported to')
+		parser.add_argument('path',
+							help='Path to CSV or NDJSON file')
+		parser.add_argument('--format',
+							choices=[value for value, _ in IssueImport.FORMAT_CHOICES],
+							help='Format of file, by default it is chosen by extension')
+		parser.add_argument('--person',
+							help='Username of person who creates issues')
+		parser.add_argument('--chunk-size',
+							type=int,
+							default=settings.PMDRAGON_ISSUE_IMPORT_CHUNK_SIZE,
+							help='Amount of rows imported in one transaction')
+
+	def handle(self, *args, **options):
+		try:
+			project = Project.objects.select_related('workspace').get(pk=options['project'])
+		except Project.DoesNotExist:
+			raise CommandError(f'Project {options["project"]} does not exist')
+
+		person = None
+		if options['person']:
+			try:
+				person = Person.objects.get(user__username=options['person'])
+			except Person.DoesNotExist:
+				raise CommandError(f'Person {options["person"]} does not exist')
+
+		try:
+			stream = open(options['path'], encoding='utf-8-sig', newline='')
+		except OSError as error:
+			raise CommandError(f'Unable to read {options["path"]}: {error}')
+
+		def report(progress: IssueImport):
+			self.stdout.write(f'{progress.processed} rows processed, {progress.imported} issues imported')
+
+		with stream:
+			issue_import = IssueImport.objects.create(workspace=project.workspace,
+													  project=project,
+													  format=options['format'] or get_format_by_filename(options['path']),
+													  created_by=person)
+
+			IssueImporter(issue_import, chunk_size=options['chunk_size'], on_progress=report).run(stream)
+
+		for error in issue_import.errors:
+			self.stdout.write(self.style.WARNING(f'Row {error["row"]}: {error["error"]}'))
+
+		self.stdout.write(self.style.SUCCESS(
+			f'{issue_import.imported} of {issue_import.processed} rows were imported to {project.key}'
+		))
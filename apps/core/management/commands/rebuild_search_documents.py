@@ -0,0 +1,38 @@
+from django.core.management.base import BaseCommand
+
+from apps.core.models import Issue, IssueSearchDocument
+
+
+class Command(BaseCommand):
+	help = 'Rebuild full text search documents of issues'
+
+	def add_arguments(self, parser):
+		parser.add_argument('--chunk-size',
+							type=int,
+							default=1000,
+							help='Amount of issues updated by one query')
+
+	def handle(self, *args, **options):
+		if not IssueSearchDocument.is_supported():
+			self.stdout.write(self.style.WARNING('Full text search is supported by Postgres only'))
+			return
+
+		chunk_size = options['chunk_size']
+		issue_ids = Issue.objects.order_by('pk').values_list('pk', flat=True)
+
+		chunk = []
+		total = 0
+
+		for issue_id in issue_ids.iterator(chunk_size=chunk_size):
+			chunk.append(issue_id)
+
+			if len(chunk) == chunk_size:
+				IssueSearchDocument.update_for(chunk)
+				total += len(chunk)
+				chunk = []
+
+		if chunk:
+			IssueSearchDocument.update_for(chunk)
+			total += len(chunk)
+
+		self.stdout.write(self.style.SUCCESS(f'Search documents of {total} issues were rebuilt'))
@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from libs.releases.feed import ReleaseFeed
+
+
+class Command(BaseCommand):
+	help = 'Save current release feed as bundled fallback for offline installs'
+
+	def handle(self, *args, **options):
+		try:
+			data = ReleaseFeed.fetch()
+		except (OSError, ValueError, KeyError, TypeError) as e:
+			self.stdout.write(self.style.WARNING(f'Release feed is unavailable, snapshot is kept as is: {e!r}'))
+			return
+
+		ReleaseFeed.save_fallback(data)
+		self.stdout.write(self.style.SUCCESS(f'Release snapshot v{data["version"]} was saved'))
@@ -1,27 +1,57 @@
+from typing import Optional, Tuple
 from urllib.parse import parse_qs
 
 from channels.db import database_sync_to_async
 from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.contrib.auth.models import AnonymousUser
-from django.db import close_old_connections
+from django.core.cache import cache
 from jwt import decode as jwt_decode, InvalidTokenError
 
 from libs.exception.websocket import NoTokenError
+from .models import Person
 
 User = get_user_model()
 
+AUTH_CACHE_KEY_TEMPLATE = 'pmdragon:ws-auth:{user_id}:{jti}'
+
 
 class JWTAuthMiddleware:
+    """
+    Resolve user and person from JWT token once per connection and put them to the scope.
+    Resolved pair is cached for a short time by user_id and token jti,
+    so reconnect storms after deploy don't hit database for every socket.
+    """
     def __init__(self, application):
         self.application = application
 
+    @staticmethod
+    def get_cache_key(user_id: int, jti: str) -> str:
+        return AUTH_CACHE_KEY_TEMPLATE.format(user_id=user_id, jti=jti)
+
     @database_sync_to_async
-    def get_user_by_id(self, user_id: int):
+    def get_user_and_person(self, user_id: int, jti: str) -> Tuple[User, Optional[Person]]:
+        """
+        database_sync_to_async is closing old connections itself,
+        so we don't block event loop here. """
+        cache_key = self.get_cache_key(user_id=user_id, jti=jti)
+        cached = cache.get(cache_key)
+
+        if cached is not None:
+            return cached
+
         try:
-            return User.objects.get(pk=user_id)
+            user = User.objects.get(pk=user_id, is_active=True)
         except User.DoesNotExist:
-            return AnonymousUser()
+            return AnonymousUser(), None
+
+        person = Person.objects \
+            .filter(user=user) \
+            .first()
+
+        cache.set(cache_key, (user, person), timeout=settings.PMDRAGON_WEBSOCKET_AUTH_CACHE_TTL)
+
+        return user, person
 
     @staticmethod
     def get_token_from_scope(scope):
@@ -34,8 +64,6 @@ class JWTAuthMiddleware:
         return token_list.pop()
 
     async def __call__(self, scope: dict, receive, send):
-        close_old_connections()
-
         try:
             token = self.get_token_from_scope(scope)
 
@@ -43,13 +71,16 @@ class JWTAuthMiddleware:
                                     settings.SECRET_KEY,
                                     algorithms=settings.SIMPLE_JWT.get('ALGORITHM'))
 
-            user_id = token_data.get('user_id')
-            scope['user'] = await self.get_user_by_id(user_id=user_id)
+            scope['user'], scope['person'] = await self.get_user_and_person(
+                user_id=token_data['user_id'],
+                jti=token_data.get('jti', '')
+            )
 
         except (NoTokenError,
-				InvalidTokenError,
+                InvalidTokenError,
                 KeyError) as e:
             scope['user'] = AnonymousUser()
+            scope['person'] = None
             print(f'JWTAuthMiddleware: {e.__class__.__name__}')
 
         return await self.application(scope, receive, send)
@@ -5,21 +5,37 @@ from datetime import datetime
 from enum import Enum
 from typing import Union
 
-import bleach
 import pytz
 from PIL import Image
 from django.conf import settings
 from django.contrib.auth.models import User
+from django.contrib.postgres.aggregates import StringAgg
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField, SearchVector, SearchQuery, SearchRank
 from django.core.exceptions import ValidationError
 from django.core.validators import RegexValidator
-from django.db import models
-from django.db.models import Max, F
+from django.db import models, transaction, IntegrityError, connection
+from django.db.models import Max, F, Q, Func, OuterRef, Subquery, Value
+from django.db.models.functions import Cast, Concat
+from django.dispatch import Signal
 from django.utils import timezone
 from django.utils.translation import ugettext_lazy as _
 
 from conf.common import mime_settings
 from libs.cryptography import hashing
 from libs.helpers.datetimepresets import day_later
+from libs.helpers.sanitizer import clean_html, get_content_hash
+from libs.helpers.transactions import get_transaction_buffer
+
+"""
+bulk_update doesn't send post_save, so we send this one after it.
+Receivers get sender, instances and fields. """
+post_bulk_update = Signal()
+
+"""
+bulk_create doesn't send post_save either.
+Receivers get sender and created instances. """
+post_bulk_create = Signal()
 
 url_validator = RegexValidator(r'^[a-zA-Z0-9]{3,20}$',
 							   _('From 3 to 20 letters and numbers are allowed'))
@@ -31,6 +47,9 @@ UPDATED_AT_STRING = 'Updated at'
 class UploadPersonsDirections(Enum):
 	AVATAR = 'avatar'
 	ATTACHMENT = 'attachment'
+	THUMBNAIL = 'thumbnail'
+	IMPORT = 'import'
+	EXPORT = 'export'
 
 
 def image_upload_location(instance: Union['Person'], filename: str) -> str:
@@ -61,17 +80,40 @@ def attachment_upload_location(instance: Union['IssueAttachment'], filename: str
 	return f'workspaces/{lower_prefix_url}/uploads/{direction}_{uniq_name}{extension}'
 
 
-def clean_useless_newlines(data: str) -> str:
-	return data.replace('<p></p>', '')
+def thumbnail_upload_location(instance: Union['IssueAttachment'], filename: str) -> str:
+	direction = {
+		isinstance(instance, IssueAttachment):
+			UploadPersonsDirections.THUMBNAIL.value
+	}[True]
+
+	name, extension = os.path.splitext(filename)
+	uniq_name = uuid.uuid4().hex
+
+	lower_prefix_url: str = instance.workspace.prefix_url.lower()
+
+	return f'workspaces/{lower_prefix_url}/uploads/thumbnails/{direction}_{uniq_name}{extension}'
+
 
+def import_upload_location(instance: Union['IssueImport'], filename: str) -> str:
+	name, extension = os.path.splitext(filename)
+	uniq_name = uuid.uuid4().hex
 
-def clean_html(data: str) -> str:
-	return bleach \
-		.clean(data,
-			   tags=settings.BLEACH_ALLOWED_TAGS,
-			   attributes=settings.BLEACH_ALLOWED_ATTRIBUTES,
-			   protocols=settings.BLEACH_ALLOWED_PROTOCOLS,
-			   strip=settings.BLEACH_STRIPPING)
+	lower_prefix_url: str = instance.workspace.prefix_url.lower()
+
+	return f'workspaces/{lower_prefix_url}/imports/{UploadPersonsDirections.IMPORT.value}_{uniq_name}{extension}'
+
+
+def export_upload_location(instance: Union['WorkspaceExport'], filename: str) -> str:
+	name, extension = os.path.splitext(filename)
+	uniq_name = uuid.uuid4().hex
+
+	lower_prefix_url: str = instance.workspace.prefix_url.lower()
+
+	return f'workspaces/{lower_prefix_url}/exports/{UploadPersonsDirections.EXPORT.value}_{uniq_name}{extension}'
+
+
+def clean_useless_newlines(data: str) -> str:
+	return data.replace('<p></p>', '')
 
 
 def get_mentioned_user_ids(data: str) -> list:
@@ -79,13 +121,53 @@ def get_mentioned_user_ids(data: str) -> list:
 
 
 def order_and_save_issues(issues):
+	"""
+	We update only issues with changed ordering.
+	"""
 	_issues = []
 	for _index, _issue in enumerate(issues):
+		if _issue.ordering == _index:
+			continue
+
 		_issue.ordering = _index
 
 		_issues.append(_issue)
 
-	Issue.objects.bulk_update(_issues, ['ordering'])
+	if not _issues:
+		return
+
+	bulk_update_versioned(Issue, _issues, ['ordering'])
+
+
+def bulk_update_versioned(model, instances: list, fields: list):
+	"""
+	bulk_update doesn't call save() and doesn't send post_save,
+	so we increase versions and send post_bulk_update ourselves.
+	"""
+	with transaction.atomic():
+		versions = lock_versions(model, [instance.pk for instance in instances])
+
+		for instance in instances:
+			instance.version = versions.get(instance.pk, instance.version) + 1
+
+		model.objects.bulk_update(instances, [*fields, 'version'])
+
+	post_bulk_update.send(sender=model, instances=instances, fields=fields)
+
+
+def lock_versions(model, pks: list) -> dict:
+	"""
+	Rows are locked till the end of transaction, so concurrent updates
+	increase version one after another and never write the same one.
+	Rows are locked in order of keys to not deadlock with each other.
+	"""
+	return dict(
+		model.objects
+		.select_for_update()
+		.filter(pk__in=pks)
+		.order_by('pk')
+		.values_list('pk', 'version')
+	)
 
 
 class Person(models.Model):
@@ -292,6 +374,75 @@ class ProjectWorkspaceAbstractModel(models.Model):
 		abstract = True
 
 
+class VersionedModel(models.Model):
+	"""
+		Version is increased on every update,
+		so websocket clients can apply only changed fields
+		and understand that they missed something.
+		"""
+	version = models.PositiveIntegerField(verbose_name=_('Version'),
+										  default=1,
+										  editable=False)
+
+	class Meta:
+		abstract = True
+
+	def save(self, *args, **kwargs):
+		if self.pk is None:
+			return super().save(*args, **kwargs)
+
+		"""
+		Version is read from locked row, not from instance,
+		instance could be loaded before concurrent update """
+		with transaction.atomic(using=kwargs.get('using')):
+			versions = lock_versions(self.__class__, [self.pk])
+			self.version = versions.get(self.pk, self.version) + 1
+
+			update_fields = kwargs.get('update_fields')
+			if update_fields is not None:
+				kwargs['update_fields'] = {*update_fields, 'version'}
+
+			super().save(*args, **kwargs)
+
+
+class PortableGinIndex(GinIndex):
+	"""
+	GIN index on Postgres, SQLite (tests) doesn't know GIN, so it gets common index,
+	operator classes are ignored there """
+	def create_sql(self, model, schema_editor, using='', **kwargs):
+		if schema_editor.connection.vendor != 'postgresql':
+			return models.Index.create_sql(self, model, schema_editor, using=using, **kwargs)
+
+		return super().create_sql(model, schema_editor, using=using, **kwargs)
+
+
+class SanitizedDescriptionModel(models.Model):
+	"""
+		Description is sanitized HTML, we keep hash of sanitized value,
+		so unchanged description is not sanitized on every save.
+		If description was changed without sanitization hash doesn't match
+		and we sanitize it again.
+		"""
+	description_hash = models.CharField(verbose_name=_('Description hash'),
+										max_length=32,
+										blank=True,
+										default='',
+										editable=False)
+
+	class Meta:
+		abstract = True
+
+	def is_description_sanitized(self) -> bool:
+		return bool(self.description_hash) and self.description_hash == get_content_hash(self.description)
+
+	def sanitize_description(self):
+		if self.is_description_sanitized():
+			return
+
+		self.description = clean_useless_newlines(clean_html(self.description))
+		self.description_hash = get_content_hash(self.description)
+
+
 class PersonParticipationRequestAbstractValidManager(models.Manager):
 	"""
 		Get not expired Person registration requests manager
@@ -439,7 +590,7 @@ class PersonInvitationRequest(PersonParticipationRequestAbstract):
 		super().save(*args, **kwargs)
 
 
-class IssueTypeCategoryIcon(ProjectWorkspaceAbstractModel):
+class IssueTypeCategoryIcon(VersionedModel, ProjectWorkspaceAbstractModel):
 	"""
 		That is just icon, we use them for Issue Types
 		For example User Story can have bookmark green icon
@@ -471,7 +622,7 @@ class IssueTypeCategoryIcon(ProjectWorkspaceAbstractModel):
 	__repr__ = __str__
 
 
-class IssueTypeCategory(ProjectWorkspaceAbstractModel):
+class IssueTypeCategory(VersionedModel, ProjectWorkspaceAbstractModel):
 	"""
 		IssueTypeCategory is Issue Type that help Users to group Issues by Type
 		For example Issue Type can be:
@@ -545,7 +696,7 @@ class IssueTypeCategory(ProjectWorkspaceAbstractModel):
 		super().save(*args, **kwargs)
 
 
-class IssueStateCategory(ProjectWorkspaceAbstractModel):
+class IssueStateCategory(VersionedModel, ProjectWorkspaceAbstractModel):
 	"""
 		Issue state is way to group issues on the board.
 		For example issue state can be:
@@ -629,7 +780,7 @@ class IssueStateCategory(ProjectWorkspaceAbstractModel):
 		super().save(*args, **kwargs)
 
 
-class IssueEstimationCategory(ProjectWorkspaceAbstractModel):
+class IssueEstimationCategory(VersionedModel, ProjectWorkspaceAbstractModel):
 	"""
 		Estimation is a way to have personal name for any estimation
 		And have numeric data also.
@@ -689,6 +840,12 @@ class IssueAttachment(ProjectWorkspaceAbstractModel):
 									   help_text=_('If yes - we can show small preview of file'),
 									   default=False)
 
+	thumbnail = models.ImageField(verbose_name=_('Thumbnail'),
+								  help_text=_('Small preview of image, generated in background after upload'),
+								  upload_to=thumbnail_upload_location,
+								  null=True,
+								  blank=True)
+
 	icon = models.CharField(verbose_name=_('File Type Icon'),
 							choices=mime_settings.ICON_CHOICES,
 							max_length=255,
@@ -716,7 +873,7 @@ class IssueAttachment(ProjectWorkspaceAbstractModel):
 	__repr__ = __str__
 
 
-class Issue(ProjectWorkspaceAbstractModel):
+class Issue(VersionedModel, SanitizedDescriptionModel, ProjectWorkspaceAbstractModel):
 	"""
 		Issue is a crucial element of pmdragon
 		It can be user Story or Task
@@ -727,6 +884,13 @@ class Issue(ProjectWorkspaceAbstractModel):
 	number = models.IntegerField(verbose_name=_('Number'),
 								 editable=False)
 
+	project_number = models.CharField(verbose_name=_('Issue key'),
+									  help_text=_('Project key and number of issue, for example PRJ-123'),
+									  max_length=32,
+									  blank=True,
+									  default='',
+									  editable=False)
+
 	title = models.CharField(verbose_name=_('Title'),
 							 max_length=255)
 
@@ -797,12 +961,44 @@ class Issue(ProjectWorkspaceAbstractModel):
 			['workspace', 'project', 'title'],
 			['workspace', 'project', 'number']
 		]
+		indexes = [
+			models.Index(fields=['workspace', 'project', 'ordering'],
+						 name='core_issue_ordering_idx'),
+			models.Index(fields=['project', 'state_category'],
+						 name='core_issue_state_idx'),
+			models.Index(fields=['project', 'type_category'],
+						 name='core_issue_type_idx'),
+			models.Index(fields=['project', 'assignee'],
+						 name='core_issue_assignee_idx'),
+			models.Index(fields=['project', 'estimation_category'],
+						 name='core_issue_estimation_idx'),
+			models.Index(fields=['project', 'updated_at'],
+						 name='core_issue_updated_at_idx'),
+			models.Index(fields=['project_number'],
+						 opclasses=['varchar_pattern_ops'],
+						 name='core_issue_key_idx'),
+			PortableGinIndex(fields=['title'],
+							 opclasses=['gin_trgm_ops'],
+							 name='core_issue_title_trgm_idx')
+		]
 		verbose_name = _('Issue')
 		verbose_name_plural = _('Issues')
 
-	@property
-	def project_number(self):
-		return f'{self.project.key}-{self.number}'
+	@classmethod
+	def update_project_numbers(cls, queryset) -> int:
+		"""
+		Update stored keys of issues with one query, for example when project key was changed.
+		Only issues with outdated key are touched.
+		"""
+		project_key = Subquery(Project.objects.filter(pk=OuterRef('project_id')).values('key')[:1])
+		project_number = Concat(project_key,
+								Value('-'),
+								Cast('number', models.CharField()),
+								output_field=models.CharField())
+
+		return queryset \
+			.exclude(project_number=project_number) \
+			.update(project_number=project_number)
 
 	def __str__(self):
 		return f'#{self.id} {self.workspace.prefix_url} - {self.project.title} - {self.title}'
@@ -817,7 +1013,7 @@ class Issue(ProjectWorkspaceAbstractModel):
 
 		super().clean()
 
-		self.description = clean_useless_newlines(clean_html(self.description))
+		self.sanitize_description()
 
 		"""
 				We have to check that we use the state category and type category
@@ -848,6 +1044,11 @@ class Issue(ProjectWorkspaceAbstractModel):
 									'state category should belong to the same project'))
 
 	def set_next_number(self):
+		"""
+		Project is locked till the end of transaction, same as by import of issues,
+		so concurrent issues of the project never get the same number """
+		list(Project.objects.select_for_update().filter(pk=self.project_id).values_list('pk', flat=True))
+
 		max_number = Issue \
 			.objects \
 			.filter(workspace=self.workspace,
@@ -861,47 +1062,51 @@ class Issue(ProjectWorkspaceAbstractModel):
 		self.number = max_number + 1
 
 	def save(self, *args, **kwargs):
-		if self.number is None:
-			self.set_next_number()
-
-		if self.type_category is None or self.type_category == 0:
-			""" If default issue type was set for Workspace, we set it as a default """
-			try:
-				self.type_category = IssueTypeCategory \
-					.objects \
-					.get(workspace=self.workspace,
-						 project=self.project,
-						 is_default=True)
-
-			except IssueTypeCategory.DoesNotExist:
-				pass
-
-		if self.state_category is None or self.state_category == 0:
-			""" If default issue state was set for Workspace, we set it as a default """
-			try:
-				self.state_category = IssueStateCategory \
-					.objects \
-					.get(workspace=self.workspace,
-						 project=self.project,
-						 is_default=True)
-
-			except IssueStateCategory.DoesNotExist:
-				pass
-
-		if self.ordering is None:
-			""" Set the biggest value for current workspace to order """
-			try:
-				max_ordering = Issue.objects \
-					.filter(workspace=self.workspace) \
-					.aggregate(Max('ordering')) \
-					.get('ordering__max')
-			except Issue.DoesNotExist:
-				pass
-
-			else:
-				self.ordering = max_ordering
-
-		super().save(*args, **kwargs)
+		with transaction.atomic(using=kwargs.get('using')):
+			if self.number is None:
+				self.set_next_number()
+
+			if not self.project_number:
+				self.project_number = f'{self.project.key}-{self.number}'
+
+			if self.type_category is None or self.type_category == 0:
+				""" If default issue type was set for Workspace, we set it as a default """
+				try:
+					self.type_category = IssueTypeCategory \
+						.objects \
+						.get(workspace=self.workspace,
+							 project=self.project,
+							 is_default=True)
+
+				except IssueTypeCategory.DoesNotExist:
+					pass
+
+			if self.state_category is None or self.state_category == 0:
+				""" If default issue state was set for Workspace, we set it as a default """
+				try:
+					self.state_category = IssueStateCategory \
+						.objects \
+						.get(workspace=self.workspace,
+							 project=self.project,
+							 is_default=True)
+
+				except IssueStateCategory.DoesNotExist:
+					pass
+
+			if self.ordering is None:
+				""" Set the biggest value for current workspace to order """
+				try:
+					max_ordering = Issue.objects \
+						.filter(workspace=self.workspace) \
+						.aggregate(Max('ordering')) \
+						.get('ordering__max')
+				except Issue.DoesNotExist:
+					pass
+
+				else:
+					self.ordering = max_ordering
+
+			super().save(*args, **kwargs)
 
 
 class IssueHistory(ProjectWorkspaceAbstractModel):
@@ -946,6 +1151,10 @@ class IssueHistory(ProjectWorkspaceAbstractModel):
 	class Meta:
 		db_table = 'core_issue_history'
 		ordering = ['updated_at']
+		indexes = [
+			models.Index(fields=['issue', 'updated_at'],
+						 name='core_issue_history_issue_idx')
+		]
 		verbose_name = _('Issue History')
 		verbose_name_plural = _('Issue History')
 
@@ -959,7 +1168,7 @@ class IssueHistory(ProjectWorkspaceAbstractModel):
 		return f'#{self.issue.id} ({self.issue.title}) - {self.edited_field} changed [ {self.updated_at:%B %d %Y} ]'
 
 
-class IssueMessage(ProjectWorkspaceAbstractModel):
+class IssueMessage(VersionedModel, SanitizedDescriptionModel, ProjectWorkspaceAbstractModel):
 	"""
 		Issue Message is a way to communicate in chosen issue.
 		Issue Message allow us to put additional information to issue
@@ -990,6 +1199,10 @@ class IssueMessage(ProjectWorkspaceAbstractModel):
 		ordering = [
 			'created_at'
 		]
+		indexes = [
+			models.Index(fields=['issue', 'created_at'],
+						 name='core_issue_message_issue_idx')
+		]
 		verbose_name = _('Issue Message')
 		verbose_name_plural = _('Issue Messages')
 
@@ -1003,11 +1216,123 @@ class IssueMessage(ProjectWorkspaceAbstractModel):
 			self.workspace = self.issue.workspace
 			self.project = self.issue.project
 
-		self.description = clean_useless_newlines(clean_html(self.description))
+		update_fields = kwargs.get('update_fields')
+		if update_fields is None or 'description' in update_fields:
+			self.sanitize_description()
+
+			if update_fields is not None:
+				kwargs['update_fields'] = {*update_fields, 'description_hash'}
 
 		super().save(*args, **kwargs)
 
 
+class StripTags(Func):
+	"""
+	Good enough for search, tags are replaced by spaces so words don't stick together """
+	function = 'REGEXP_REPLACE'
+	template = "%(function)s(%(expressions)s, '<[^>]*>', ' ', 'g')"
+	output_field = models.TextField()
+
+
+class IssueSearchDocument(models.Model):
+	"""
+		Full text search document of issue: title, description and messages.
+		It's kept in separate table to not load big tsvector with every issue.
+		Document is updated on issue / message save, look at signals.
+		"""
+	issue = models.OneToOneField(Issue,
+								 verbose_name=_('Issue'),
+								 primary_key=True,
+								 on_delete=models.CASCADE,
+								 related_name='search_document')
+
+	vector = SearchVectorField(verbose_name=_('Search vector'),
+							   null=True)
+
+	class Meta:
+		db_table = 'core_issue_search_document'
+		indexes = [
+			PortableGinIndex(fields=['vector'],
+							 name='core_issue_search_vector_idx')
+		]
+		verbose_name = _('Issue Search Document')
+		verbose_name_plural = _('Issue Search Documents')
+
+	def __str__(self):
+		return f'#{self.issue_id}'
+
+	__repr__ = __str__
+
+	@staticmethod
+	def is_supported() -> bool:
+		return connection.vendor == 'postgresql'
+
+	@staticmethod
+	def get_vector():
+		"""
+		Title is more important than description, description is more important than messages """
+		config = settings.PMDRAGON_SEARCH_CONFIG
+
+		messages = IssueMessage.objects \
+			.filter(issue=OuterRef('pk')) \
+			.values('issue') \
+			.annotate(text=StringAgg(StripTags('description'), delimiter=' ', output_field=models.TextField())) \
+			.values('text')
+
+		return SearchVector('title', config=config, weight='A') + \
+			SearchVector(StripTags('description'), config=config, weight='B') + \
+			SearchVector(Subquery(messages, output_field=models.TextField()), config=config, weight='C')
+
+	@classmethod
+	def update_for(cls, issue_ids, create: bool = True):
+		"""
+		Update documents of given issues with one query.
+		Documents of just created issues are created first,
+		on message deletion we don't create them, issue can be deleted right now.
+		"""
+		if not cls.is_supported():
+			return
+
+		issue_ids = list(issue_ids)
+
+		if create:
+			cls.objects.bulk_create(
+				[cls(issue_id=issue_id) for issue_id in issue_ids],
+				ignore_conflicts=True
+			)
+
+		vectors = Issue.objects \
+			.filter(pk=OuterRef('issue_id')) \
+			.annotate(vector=cls.get_vector()) \
+			.values('vector')
+
+		cls.objects \
+			.filter(issue_id__in=issue_ids) \
+			.update(vector=Subquery(vectors))
+
+	@classmethod
+	def search(cls, queryset, text: str):
+		"""
+		Issues of queryset matched by text with rank annotated.
+		Rank is casted to double precision, so it's the same after json round trip
+		and can be used as a key of cursor pagination.
+		SQLite doesn't have full text search, so we only find substring there.
+		"""
+		if not cls.is_supported():
+			return queryset \
+				.filter(Q(title__icontains=text) |
+						Q(description__icontains=text) |
+						Q(messages__description__icontains=text)) \
+				.distinct() \
+				.annotate(rank=Value(0.0, output_field=models.FloatField()))
+
+		query = SearchQuery(text, config=settings.PMDRAGON_SEARCH_CONFIG, search_type='websearch')
+
+		return queryset \
+			.filter(search_document__vector=query) \
+			.annotate(rank=Cast(SearchRank(F('search_document__vector'), query), models.FloatField()))
+
+
 class ProjectBacklog(ProjectWorkspaceAbstractModel):
 	"""
 		Project Backlog allow us to group issue that wasn't
@@ -1318,7 +1643,7 @@ class ProjectWorkingDays(ProjectWorkspaceAbstractModel):
 	__repr__ = __str__
 
 
-class SprintEffortsHistory(ProjectWorkspaceAbstractModel):
+class SprintEffortsHistory(VersionedModel, ProjectWorkspaceAbstractModel):
 	"""
 		Sprint Estimation is small history of estimation for Sprint.
 		The last action in a Sprint such as completion of issue
@@ -1356,6 +1681,10 @@ class SprintEffortsHistory(ProjectWorkspaceAbstractModel):
 			'updated_at',
 			'created_at'
 		)
+		indexes = [
+			models.Index(fields=['sprint', 'point_at'],
+						 name='core_sprint_efforts_sprint_idx')
+		]
 		verbose_name = 'Sprint Efforts History'
 		verbose_name_plural = 'Sprints Efforts History'
 
@@ -1363,3 +1692,536 @@ class SprintEffortsHistory(ProjectWorkspaceAbstractModel):
 		return f'#{self.id} {self.sprint.title} - {self.done_value} done of {self.total_value} - {self.point_at}'
 
 	__repr__ = __str__
+
+
+class WorkspaceCounter(models.Model):
+	"""
+		Monotonically increasing counters bound to workspace.
+		For example sequence of websocket events
+		or versions of lists, look at WorkspacesReadOnlyModelViewSet.
+		"""
+	LIST_VERSION_LABEL_TEMPLATE = 'list:{model}'
+
+	workspace = models.ForeignKey(Workspace,
+								  verbose_name=_('Workspace'),
+								  db_index=True,
+								  on_delete=models.CASCADE,
+								  related_name='counters')
+
+	label = models.CharField(verbose_name=_('Label'),
+							 max_length=64)
+
+	value = models.BigIntegerField(verbose_name=_('Value'),
+								   default=0)
+
+	class Meta:
+		db_table = 'core_workspace_counter'
+		unique_together = [
+			['workspace', 'label']
+		]
+		verbose_name = _('Workspace Counter')
+		verbose_name_plural = _('Workspace Counters')
+
+	def __str__(self):
+		return f'#{self.workspace_id} {self.label} - {self.value}'
+
+	__repr__ = __str__
+
+	@classmethod
+	def increment(cls, workspace_id: int, label: str) -> int:
+		"""
+		Increase counter and return new value.
+		Update locks the row, so concurrent transactions get different values.
+		"""
+		counters = cls.objects.filter(workspace_id=workspace_id, label=label)
+
+		with transaction.atomic():
+			if not counters.update(value=F('value') + 1):
+				try:
+					with transaction.atomic():
+						cls.objects.create(workspace_id=workspace_id, label=label, value=1)
+						return 1
+				except IntegrityError:
+					counters.update(value=F('value') + 1)
+
+			return counters.values_list('value', flat=True).get()
+
+	@classmethod
+	def get_value(cls, workspace_id: int, label: str) -> int:
+		return cls.objects \
+			.filter(workspace_id=workspace_id, label=label) \
+			.values_list('value', flat=True) \
+			.first() or 0
+
+	@staticmethod
+	def is_list_versioned(model) -> bool:
+		"""
+		Lists of projects, anything bound to project and exports of workspace have version """
+		return issubclass(model, (Project, ProjectWorkspaceAbstractModel, WorkspaceExport))
+
+	@classmethod
+	def get_list_version_label(cls, model) -> str:
+		return cls.LIST_VERSION_LABEL_TEMPLATE.format(model=model._meta.label_lower)
+
+	@classmethod
+	def increment_list_versions(cls, workspace_id: int, *models):
+		"""
+		Has to be called on every change of instances of given models.
+		Signals do it for save, delete and m2m changes,
+		queryset updates and bulk creates have to call it directly.
+		Inside transaction versions are incremented once after commit, look at ListVersionsBuffer.
+		"""
+		labels = [cls.get_list_version_label(model) for model in models]
+
+		if not transaction.get_connection().in_atomic_block:
+			for label in labels:
+				cls.increment(workspace_id, label)
+
+			return
+
+		buffer = get_transaction_buffer(ListVersionsBuffer)
+		for label in labels:
+			buffer.add(workspace_id, label)
+
+	@classmethod
+	def get_list_versions(cls, workspace_ids, models) -> list:
+		"""
+		Versions of lists of given models in given workspaces,
+		lists that were never changed are not returned.
+		"""
+		labels = [cls.get_list_version_label(model) for model in models]
+
+		return list(
+			cls.objects
+			.filter(workspace_id__in=workspace_ids, label__in=labels)
+			.order_by('workspace_id', 'label')
+			.values_list('workspace_id', 'label', 'value')
+		)
+
+
+class ListVersionsBuffer:
+	"""
+	Versions of lists changed during one transaction.
+	Every version is incremented once after commit in sorted order,
+	so writers don't hold counter rows till the end of their transactions
+	and never lock them in different order.
+	Version is never ahead of data, so old list is never cached with the new version.
+	"""
+	commit_order = 0
+
+	def __init__(self):
+		self.labels = set()
+
+	def add(self, workspace_id: int, label: str):
+		self.labels.add((workspace_id, label))
+
+	def flush(self):
+		labels, self.labels = self.labels, set()
+
+		# Workspace could be deleted in the same transaction
+		workspace_ids = set(
+			Workspace.objects
+			.filter(pk__in={workspace_id for workspace_id, _ in labels})
+			.values_list('pk', flat=True)
+		)
+
+		for workspace_id, label in sorted(labels):
+			if workspace_id in workspace_ids:
+				WorkspaceCounter.increment(workspace_id, label)
+
+
+class WorkspaceEvent(models.Model):
+	"""
+		Bounded log of events sent to workspace subscribers.
+		Reconnected clients can get everything they missed by sequence,
+		instead of fetching all lists again.
+		"""
+	SEQUENCE_COUNTER_LABEL = 'events'
+
+	workspace = models.ForeignKey(Workspace,
+								  verbose_name=_('Workspace'),
+								  on_delete=models.CASCADE,
+								  related_name='events')
+
+	sequence = models.BigIntegerField(verbose_name=_('Sequence'))
+
+	events = models.JSONField(verbose_name=_('Events'))
+
+	created_at = models.DateTimeField(verbose_name=_(CREATED_AT_STRING),
+									  auto_now_add=True)
+
+	class Meta:
+		db_table = 'core_workspace_event'
+		ordering = ['sequence']
+		unique_together = [
+			['workspace', 'sequence']
+		]
+		verbose_name = _('Workspace Event')
+		verbose_name_plural = _('Workspace Events')
+
+	def __str__(self):
+		return f'#{self.workspace_id} - {self.sequence}'
+
+	__repr__ = __str__
+
+	@classmethod
+	def log(cls, workspace_id: int, events: list) -> int:
+		"""
+		Store events with the next sequence number and drop
+		the oldest ones to keep only PMDRAGON_WORKSPACE_EVENT_LOG_SIZE entries.
+		"""
+		with transaction.atomic():
+			sequence = WorkspaceCounter.increment(workspace_id, cls.SEQUENCE_COUNTER_LABEL)
+			cls.objects.create(workspace_id=workspace_id, sequence=sequence, events=events)
+
+		cls.objects \
+			.filter(workspace_id=workspace_id,
+					sequence__lte=sequence - settings.PMDRAGON_WORKSPACE_EVENT_LOG_SIZE) \
+			.delete()
+
+		return sequence
+
+	@classmethod
+	def get_since(cls, workspace_id: int, since: int):
+		"""
+		Return events after given sequence or None
+		if log was already truncated after it and client has to fetch everything again.
+		"""
+		current = WorkspaceCounter.get_value(workspace_id, cls.SEQUENCE_COUNTER_LABEL)
+
+		if since > current:
+			return None
+
+		entries = list(cls.objects.filter(workspace_id=workspace_id, sequence__gt=since))
+
+		expected_first = since + 1
+		if since < current and (not entries or entries[0].sequence != expected_first):
+			return None
+
+		return entries
+
+
+class Mention(ProjectWorkspaceAbstractModel):
+	"""
+		Index of mentions, so we don't parse HTML to know who was mentioned where.
+		Mentions are extracted when issue description or message is saved,
+		row without message is a mention in issue description.
+		"""
+	person = models.ForeignKey(Person,
+							   verbose_name=_('Mentioned person'),
+							   on_delete=models.CASCADE,
+							   related_name='mentions')
+
+	mentioned_by = models.ForeignKey(Person,
+									 verbose_name=_('Mentioned by'),
+									 null=True,
+									 on_delete=models.SET_NULL,
+									 related_name='+')
+
+	issue = models.ForeignKey(Issue,
+							  verbose_name=_('Issue'),
+							  on_delete=models.CASCADE,
+							  related_name='mentions')
+
+	message = models.ForeignKey(IssueMessage,
+								verbose_name=_('Issue Message'),
+								null=True,
+								blank=True,
+								on_delete=models.CASCADE,
+								related_name='mentions')
+
+	created_at = models.DateTimeField(verbose_name=_(CREATED_AT_STRING),
+									  auto_now_add=True)
+
+	class Meta:
+		db_table = 'core_mention'
+		ordering = ['-created_at', '-id']
+		constraints = [
+			models.UniqueConstraint(fields=['person', 'issue'],
+									condition=Q(message__isnull=True),
+									name='core_mention_unique_in_description'),
+			models.UniqueConstraint(fields=['person', 'message'],
+									condition=Q(message__isnull=False),
+									name='core_mention_unique_in_message'),
+		]
+		indexes = [
+			models.Index(fields=['person', '-created_at', '-id'],
+						 name='core_mention_person_idx')
+		]
+		verbose_name = _('Mention')
+		verbose_name_plural = _('Mentions')
+
+	def __str__(self):
+		return f'#{self.person_id} - {self.issue_id} {self.message_id or ""}'
+
+	__repr__ = __str__
+
+	@classmethod
+	def sync(cls, issue: Issue, description: str, mentioned_by: Person = None, message: IssueMessage = None,
+			 created: bool = False) -> list:
+		"""
+		Bring index in line with given description of issue or message.
+		Mentions that are gone are removed, only participants of workspace are added.
+		Just created issue or message can't have mentions yet, so we don't look for them.
+		Returns just created mentions.
+		"""
+		mentioned_ids = {int(person_id) for person_id in get_mentioned_user_ids(description or '')}
+
+		mentions = cls.objects.filter(issue=issue, message=message)
+		existing_ids = set() if created else set(mentions.values_list('person_id', flat=True))
+
+		if existing_ids - mentioned_ids:
+			mentions.filter(person_id__in=existing_ids - mentioned_ids).delete()
+
+		new_ids = mentioned_ids - existing_ids
+
+		if not new_ids:
+			return []
+
+		person_ids = issue.workspace.participants \
+			.filter(pk__in=new_ids) \
+			.values_list('pk', flat=True)
+
+		created_mentions = cls.objects.bulk_create([
+			cls(workspace_id=issue.workspace_id,
+				project_id=issue.project_id,
+				issue=issue,
+				message=message,
+				person_id=person_id,
+				mentioned_by=mentioned_by)
+			for person_id
+			in person_ids
+		])
+
+		if created_mentions:
+			WorkspaceCounter.increment_list_versions(issue.workspace_id, cls)
+
+		return created_mentions
+
+
+class MentionNotification(ProjectWorkspaceAbstractModel):
+	"""
+		Person was mentioned in issue description or in issue message.
+		We don't send email right away, pending notifications are grouped
+		per person and sent as one digest email, look at send_mention_digest_emails.
+		"""
+	person = models.ForeignKey(Person,
+							   verbose_name=_('Mentioned person'),
+							   on_delete=models.CASCADE,
+							   related_name='mention_notifications')
+
+	mentioned_by = models.ForeignKey(Person,
+									 verbose_name=_('Mentioned by'),
+									 null=True,
+									 on_delete=models.SET_NULL,
+									 related_name='+')
+
+	issue = models.ForeignKey(Issue,
+							  verbose_name=_('Issue'),
+							  on_delete=models.CASCADE,
+							  related_name='mention_notifications')
+
+	message = models.ForeignKey(IssueMessage,
+								verbose_name=_('Issue Message'),
+								null=True,
+								blank=True,
+								on_delete=models.CASCADE,
+								related_name='mention_notifications')
+
+	created_at = models.DateTimeField(verbose_name=_(CREATED_AT_STRING),
+									  auto_now_add=True)
+
+	sent_at = models.DateTimeField(verbose_name=_('Sent at'),
+								   null=True,
+								   blank=True)
+
+	class Meta:
+		db_table = 'core_mention_notification'
+		ordering = ['created_at']
+		indexes = [
+			models.Index(fields=['created_at'],
+						 name='core_mention_pending_idx',
+						 condition=Q(sent_at__isnull=True))
+		]
+		verbose_name = _('Mention Notification')
+		verbose_name_plural = _('Mention Notifications')
+
+	def __str__(self):
+		return f'#{self.person_id} - {self.issue_id} {self.created_at}'
+
+	__repr__ = __str__
+
+	@classmethod
+	def notify(cls, mentions: list) -> list:
+		"""
+		Create notifications for just created mentions, look at Mention.sync
+		"""
+		return cls.objects.bulk_create([
+			cls(workspace_id=mention.workspace_id,
+				project_id=mention.project_id,
+				issue_id=mention.issue_id,
+				message_id=mention.message_id,
+				person_id=mention.person_id,
+				mentioned_by_id=mention.mentioned_by_id)
+			for mention
+			in mentions
+		])
+
+
+class IssueImport(VersionedModel, ProjectWorkspaceAbstractModel):
+	"""
+		Import of issues from CSV or NDJSON file, for example from another tracker.
+		Rows are imported in chunks, progress is saved after every chunk,
+		so workspace subscribers get it. Look at apps/core/imports.py.
+		"""
+	FORMAT_CSV = 'csv'
+	FORMAT_NDJSON = 'ndjson'
+
+	FORMAT_CHOICES = [
+		(FORMAT_CSV, 'CSV'),
+		(FORMAT_NDJSON, 'NDJSON'),
+	]
+
+	STATUS_PENDING = 'pending'
+	STATUS_RUNNING = 'running'
+	STATUS_DONE = 'done'
+	STATUS_FAILED = 'failed'
+
+	STATUS_CHOICES = [
+		(STATUS_PENDING, _('Pending')),
+		(STATUS_RUNNING, _('Running')),
+		(STATUS_DONE, _('Done')),
+		(STATUS_FAILED, _('Failed')),
+	]
+
+	source = models.FileField(verbose_name=_('Source file'),
+							  upload_to=import_upload_location,
+							  null=True,
+							  blank=True)
+
+	format = models.CharField(verbose_name=_('Format'),
+							  max_length=16,
+							  choices=FORMAT_CHOICES,
+							  default=FORMAT_CSV)
+
+	status = models.CharField(verbose_name=_('Status'),
+							  max_length=16,
+							  choices=STATUS_CHOICES,
+							  default=STATUS_PENDING)
+
+	processed = models.PositiveIntegerField(verbose_name=_('Processed rows'),
+											default=0)
+
+	imported = models.PositiveIntegerField(verbose_name=_('Imported issues'),
+										   default=0)
+
+	errors = models.JSONField(verbose_name=_('Errors'),
+							  help_text=_('Rows that were not imported with reason'),
+							  default=list,
+							  blank=True)
+
+	created_by = models.ForeignKey(Person,
+								   verbose_name=_('Created by'),
+								   null=True,
+								   on_delete=models.SET_NULL)
+
+	created_at = models.DateTimeField(verbose_name=_(CREATED_AT_STRING),
+									  auto_now_add=True)
+
+	finished_at = models.DateTimeField(verbose_name=_('Finished at'),
+									   null=True,
+									   blank=True)
+
+	class Meta:
+		db_table = 'core_issue_import'
+		ordering = ['-created_at']
+		verbose_name = _('Issue Import')
+		verbose_name_plural = _('Issue Imports')
+
+	def __str__(self):
+		return f'#{self.id} {self.project_id} - {self.status} {self.imported} of {self.processed}'
+
+	__repr__ = __str__
+
+
+class WorkspaceExport(models.Model):
+	"""
+		Export of workspace, that is too large to be returned in response.
+		Rows are written to file in background, look at apps/core/exports.py.
+		"""
+	FORMAT_CSV = 'csv'
+	FORMAT_NDJSON = 'ndjson'
+
+	FORMAT_CHOICES = [
+		(FORMAT_CSV, 'CSV'),
+		(FORMAT_NDJSON, 'NDJSON'),
+	]
+
+	STATUS_PENDING = 'pending'
+	STATUS_RUNNING = 'running'
+	STATUS_DONE = 'done'
+	STATUS_FAILED = 'failed'
+
+	STATUS_CHOICES = [
+		(STATUS_PENDING, _('Pending')),
+		(STATUS_RUNNING, _('Running')),
+		(STATUS_DONE, _('Done')),
+		(STATUS_FAILED, _('Failed')),
+	]
+
+	workspace = models.ForeignKey(Workspace,
+								  verbose_name=_('Workspace'),
+								  db_index=True,
+								  on_delete=models.CASCADE,
+								  related_name='exports')
+
+	format = models.CharField(verbose_name=_('Format'),
+							  max_length=16,
+							  choices=FORMAT_CHOICES,
+							  default=FORMAT_NDJSON)
+
+	section = models.CharField(verbose_name=_('Section'),
+							   help_text=_('Exported section, all sections are exported if it is empty'),
+							   max_length=32,
+							   blank=True,
+							   default='')
+
+	status = models.CharField(verbose_name=_('Status'),
+							  max_length=16,
+							  choices=STATUS_CHOICES,
+							  default=STATUS_PENDING)
+
+	rows = models.PositiveIntegerField(verbose_name=_('Exported rows'),
+									   default=0)
+
+	file = models.FileField(verbose_name=_('Exported file'),
+							upload_to=export_upload_location,
+							null=True,
+							blank=True)
+
+	error = models.TextField(verbose_name=_('Error'),
+							 blank=True,
+							 default='')
+
+	created_by = models.ForeignKey(Person,
+								   verbose_name=_('Created by'),
+								   null=True,
+								   on_delete=models.SET_NULL)
+
+	created_at = models.DateTimeField(verbose_name=_(CREATED_AT_STRING),
+									  auto_now_add=True)
+
+	finished_at = models.DateTimeField(verbose_name=_('Finished at'),
+									   null=True,
+									   blank=True)
+
+	class Meta:
+		db_table = 'core_workspace_export'
+		ordering = ['-created_at']
+		verbose_name = _('Workspace Export')
+		verbose_name_plural = _('Workspace Exports')
+
+	def __str__(self):
+		return f'#{self.id} {self.workspace_id} - {self.status} {self.rows}'
+
+	__repr__ = __str__
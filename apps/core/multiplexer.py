@@ -1,22 +1,489 @@
+import asyncio
+import json
+import logging
+import time
+import zlib
+from collections import OrderedDict
+from functools import partial
+from typing import Optional, Tuple, Union
+from urllib.parse import parse_qs
+
+import msgpack
+from asgiref.compatibility import guarantee_single_callable
 from channelsmultiplexer import AsyncJsonWebsocketDemultiplexer
+from django.conf import settings
+
+from libs.check.websocket import outbound_metrics
 from .consumers import \
     IssueMessagesObserver, \
     WorkspaceIssuesObserver, \
     WorkspaceIssueTypeCategoriesObserver, \
     WorkspaceIssueTypeCategoriesIconsObserver, \
     WorkspaceIssueStateCategoriesObserver, \
-    WorkspaceIssueEstimationCategoriesObserver
+    WorkspaceIssueEstimationCategoriesObserver, \
+    WorkspaceSprintEffortsHistoryObserver, \
+    WorkspaceObserver, \
+    IssuesConsumer, \
+    IssueStatesConsumer, \
+    IssueTypesConsumer, \
+    SHARED_FRAME_TYPE
+
+logger = logging.getLogger(__name__)
+
+
+class OverflowPolicy:
+    """
+    What we do with connection if client doesn't read frames as fast as we send them.
+    RESYNC - drop queued frames and send {"resync": true} to every stream that lost frames,
+    client has to fetch the state again (workspace stream can just subscribe with "since").
+    DISCONNECT - close the socket with OVERFLOW_CLOSE_CODE, client reconnects itself.
+    """
+    RESYNC = 'resync'
+    DISCONNECT = 'disconnect'
+
+
+OVERFLOW_CLOSE_CODE = 4008
+IDLE_CLOSE_CODE = 4009
+TOO_LARGE_CLOSE_CODE = 1009
+INVALID_FRAME_CLOSE_CODE = 4010
+INTERNAL_ERROR_CLOSE_CODE = 1011
+
+"""
+Heartbeat stream doesn't have application behind it.
+We send {"stream": "heartbeat", "payload": {"ping": 1634567890}} if client is silent,
+client answers with any frame, {"stream": "heartbeat", "payload": {"pong": 1634567890}} for example.
+Client can send {"ping": ...} itself, then we answer with {"pong": ...}.
+Only clients that sent heartbeat frame at least once are disconnected when idle,
+clients that don't know heartbeat stream may be silent listeners. """
+HEARTBEAT_STREAM = 'heartbeat'
+
+"""
+Marker in outbound queue, writer sends resync frames when it gets it """
+RESYNC_MARKER = object()
+
+
+class FrameEncoding:
+    """
+    Client chooses encoding of frames on connect with subprotocol "pmdragon.msgpack"
+    or with query parameter "encoding=msgpack". JSON text frames are used by default.
+    Binary encodings are sent in binary frames and client sends binary frames back.
+    MSGPACK_DEFLATE is MessagePack compressed with zlib,
+    issues with HTML descriptions are compressed very well.
+    """
+    JSON = 'json'
+    MSGPACK = 'msgpack'
+    MSGPACK_DEFLATE = 'msgpack-deflate'
+
+    ALL = (JSON, MSGPACK, MSGPACK_DEFLATE)
+
+
+SUBPROTOCOL_PREFIX = 'pmdragon.'
+
+
+def encode_frame(content: dict, encoding: str) -> Union[str, bytes]:
+    if encoding == FrameEncoding.JSON:
+        return json.dumps(content)
+
+    data = msgpack.packb(content, use_bin_type=True)
+
+    if encoding == FrameEncoding.MSGPACK_DEFLATE:
+        data = zlib.compress(data, settings.PMDRAGON_WEBSOCKET_DEFLATE_LEVEL)
+
+    return data
+
+
+class FrameTooLarge(ValueError):
+    pass
+
+
+def decode_frame(data: bytes, encoding: str):
+    """
+    Compressed frame of client is inflated up to PMDRAGON_WEBSOCKET_MAX_INFLATED_FRAME_SIZE,
+    so small frame can't take all memory of worker.
+    """
+    if encoding == FrameEncoding.MSGPACK_DEFLATE:
+        decompressor = zlib.decompressobj()
+        data = decompressor.decompress(data, settings.PMDRAGON_WEBSOCKET_MAX_INFLATED_FRAME_SIZE)
+
+        if decompressor.unconsumed_tail:
+            raise FrameTooLarge('Inflated frame is too large')
+
+    return msgpack.unpackb(data, raw=False)
+
+
+"""
+Errors of malformed frames of client: broken JSON, MessagePack or deflate stream,
+unhashable map keys in MessagePack, and so on. """
+FRAME_DECODE_ERRORS = (ValueError, TypeError, zlib.error, msgpack.exceptions.UnpackException)
+
+
+class FrameCache:
+    """
+    Every connection subscribed to the same group gets the same broadcast,
+    so we encode (and compress) it once per worker and reuse bytes for other connections.
+    Key of frame is given by stream application, look at WorkspaceObserver.send_events.
+    """
+    def __init__(self):
+        self.frames = OrderedDict()
+
+    def get_or_encode(self, key, content: dict, encoding: str) -> Union[str, bytes]:
+        key = (key, encoding)
+
+        try:
+            self.frames.move_to_end(key)
+            return self.frames[key]
+        except KeyError:
+            pass
+
+        frame = self.frames[key] = encode_frame(content, encoding)
+
+        while len(self.frames) > settings.PMDRAGON_WEBSOCKET_FRAME_CACHE_SIZE:
+            self.frames.popitem(last=False)
+
+        return frame
+
+
+frame_cache = FrameCache()
 
 
 class MultiplexerAsyncJson(AsyncJsonWebsocketDemultiplexer):
     """
     {"stream":"issue_chat","payload":{"text":"Hello world"}}
+    Stream applications are created lazily on the first frame for the stream,
+    so the socket that uses only "workspace" stream doesn't keep other consumers in memory.
+    Frames for client are put to the bounded queue and written by separate task,
+    so slow client never blocks stream applications and channel layer receive loop.
+    Look at OverflowPolicy for what happens when queue is full.
     """
     applications = {
+        'workspace': WorkspaceObserver.as_asgi(),
         'issue_chat': IssueMessagesObserver.as_asgi(),
         'workspace_issues': WorkspaceIssuesObserver.as_asgi(),
         'workspace_issue_types': WorkspaceIssueTypeCategoriesObserver.as_asgi(),
         'workspace_issue_type_icons': WorkspaceIssueTypeCategoriesIconsObserver.as_asgi(),
         'workspace_issue_states': WorkspaceIssueStateCategoriesObserver.as_asgi(),
         'workspace_issue_estimations': WorkspaceIssueEstimationCategoriesObserver.as_asgi(),
+        'workspace_sprint_efforts_history': WorkspaceSprintEffortsHistoryObserver.as_asgi(),
+        'issues': IssuesConsumer.as_asgi(),
+        'issue_states': IssueStatesConsumer.as_asgi(),
+        'issue_types': IssueTypesConsumer.as_asgi(),
     }
+
+    outbound_queue = None
+    outbound_writer = None
+    encoding = FrameEncoding.JSON
+
+    heartbeat = None
+    heartbeat_supported = False
+
+    async def __call__(self, scope, receive, send):
+        """
+        Messages from server are passed through inbound queue,
+        so we know when client was active last time and can disconnect it ourselves.
+        """
+        self.resync_streams = set()
+        self.overflowed = False
+        self.last_received = time.monotonic()
+        self.inbound_queue = asyncio.Queue()
+        inbound_pump = asyncio.get_event_loop().create_task(self.pump_inbound(receive))
+
+        try:
+            await super().__call__(scope, self.inbound_queue.get, send)
+        finally:
+            inbound_pump.cancel()
+            self.stop_heartbeat()
+            self.stop_outbound_writer()
+
+    async def pump_inbound(self, receive):
+        while True:
+            message = await receive()
+            self.last_received = time.monotonic()
+            await self.inbound_queue.put(message)
+
+    def start_heartbeat(self):
+        if settings.PMDRAGON_WEBSOCKET_PING_INTERVAL:
+            self.heartbeat = asyncio.get_event_loop().create_task(self.beat())
+
+    def stop_heartbeat(self):
+        if self.heartbeat is not None:
+            self.heartbeat.cancel()
+            self.heartbeat = None
+
+    async def beat(self):
+        interval = settings.PMDRAGON_WEBSOCKET_PING_INTERVAL
+
+        while True:
+            await asyncio.sleep(interval)
+            idle = time.monotonic() - self.last_received
+
+            if self.is_reapable(idle):
+                await self.reap()
+                return
+
+            if idle >= interval:
+                await self.enqueue(
+                    encode_frame({'stream': HEARTBEAT_STREAM, 'payload': {'ping': int(time.time())}}, self.encoding),
+                    HEARTBEAT_STREAM
+                )
+
+    def is_reapable(self, idle: float) -> bool:
+        timeout = settings.PMDRAGON_WEBSOCKET_IDLE_TIMEOUT
+
+        return self.heartbeat_supported and bool(timeout) and idle >= timeout
+
+    async def reap(self):
+        """
+        Client didn't send anything for too long, so it's probably gone.
+        We close the socket and disconnect stream applications as if client disconnected,
+        so they leave all their groups right away instead of waiting for TCP timeout.
+        """
+        logger.info('Websocket client is idle, disconnecting it')
+        outbound_metrics.reaped += 1
+        self.heartbeat = None
+        self.stop_outbound_writer()
+
+        await self.close(code=IDLE_CLOSE_CODE)
+        await self.inbound_queue.put({'type': 'websocket.disconnect', 'code': IDLE_CLOSE_CODE})
+
+    def start_outbound_writer(self):
+        self.outbound_queue = asyncio.Queue(maxsize=settings.PMDRAGON_WEBSOCKET_OUTBOUND_QUEUE_SIZE)
+        self.outbound_writer = asyncio.get_event_loop().create_task(self.write_outbound())
+        outbound_metrics.connections.add(self)
+
+    def stop_outbound_writer(self):
+        outbound_metrics.connections.discard(self)
+
+        if self.outbound_writer is not None:
+            self.outbound_writer.cancel()
+            self.outbound_writer = None
+
+    async def write_outbound(self):
+        while True:
+            queued = await self.outbound_queue.get()
+
+            if queued is RESYNC_MARKER:
+                streams, self.resync_streams = self.resync_streams, set()
+
+                for stream_name in sorted(streams):
+                    await self.send_frame(encode_frame({'stream': stream_name, 'payload': {'resync': True}},
+                                                       self.encoding))
+
+                continue
+
+            _, frame = queued
+            await self.send_frame(frame)
+
+    async def send_frame(self, frame: Union[str, bytes]):
+        if isinstance(frame, bytes):
+            await self.send(bytes_data=frame)
+        else:
+            await self.send(text_data=frame)
+
+    async def enqueue(self, frame: Union[str, bytes], stream_name: str):
+        if self.overflowed:
+            return
+
+        try:
+            self.outbound_queue.put_nowait((stream_name, frame))
+        except asyncio.QueueFull:
+            await self.handle_overflow(stream_name)
+
+    def drain_outbound_queue(self) -> set:
+        """
+        Remove everything from the queue and return streams of removed frames. """
+        streams = set()
+
+        while not self.outbound_queue.empty():
+            queued = self.outbound_queue.get_nowait()
+
+            if queued is not RESYNC_MARKER:
+                streams.add(queued[0])
+                outbound_metrics.dropped_frames += 1
+
+        return streams
+
+    async def handle_overflow(self, stream_name: str):
+        outbound_metrics.dropped_frames += 1
+        streams = self.drain_outbound_queue()
+        streams.add(stream_name)
+
+        if settings.PMDRAGON_WEBSOCKET_OVERFLOW_POLICY == OverflowPolicy.DISCONNECT:
+            logger.warning('Outbound websocket queue is full, disconnecting client')
+            outbound_metrics.disconnects += 1
+            self.overflowed = True
+            self.stop_outbound_writer()
+            await self.close(code=OVERFLOW_CLOSE_CODE)
+            return
+
+        logger.warning('Outbound websocket queue is full, asking client to resync %s', sorted(streams))
+        outbound_metrics.resyncs += 1
+        self.resync_streams.update(streams)
+        self.outbound_queue.put_nowait(RESYNC_MARKER)
+
+    async def _create_upstream_applications(self):
+        """
+        Nothing to create on connect, look at _create_upstream_application.
+        """
+        pass
+
+    async def _create_upstream_application(self, stream_name: str):
+        application = guarantee_single_callable(self.applications[stream_name])
+        upstream_queue = asyncio.Queue()
+        self.application_streams[stream_name] = upstream_queue
+        future = self.application_futures[stream_name] = asyncio.get_event_loop().create_task(
+            application(
+                self.scope,
+                upstream_queue.get,
+                partial(self.dispatch_downstream, steam_name=stream_name)
+            )
+        )
+        future.add_done_callback(partial(self.upstream_application_done, stream_name=stream_name))
+
+        await upstream_queue.put({'type': 'websocket.connect'})
+
+    def upstream_application_done(self, future: asyncio.Future, stream_name: str):
+        """
+        Application created lazily is not watched by __call__ of demultiplexer,
+        so its crash is logged here and the socket is closed, as if it was created on connect.
+        Crashed application is forgotten, so its exception is not raised again on disconnect.
+        """
+        if future.cancelled() or future.exception() is None:
+            return
+
+        logger.error('Websocket stream application %s crashed', stream_name, exc_info=future.exception())
+        self.application_futures.pop(stream_name, None)
+        self.application_streams.pop(stream_name, None)
+        self.applications_accepting_frames.discard(stream_name)
+        asyncio.ensure_future(self.close(code=INTERNAL_ERROR_CLOSE_CODE))
+
+    def get_encoding(self) -> Tuple[str, Optional[str]]:
+        """
+        Returns encoding and subprotocol we have to accept.
+        Unknown encodings are ignored, so client gets JSON as before. """
+        for subprotocol in self.scope.get('subprotocols', []):
+            encoding = subprotocol[len(SUBPROTOCOL_PREFIX):]
+
+            if subprotocol.startswith(SUBPROTOCOL_PREFIX) and encoding in FrameEncoding.ALL:
+                return encoding, subprotocol
+
+        query_string = parse_qs(self.scope.get('query_string', b'').decode('utf-8'))
+        encoding = query_string.get('encoding', [FrameEncoding.JSON]).pop()
+
+        if encoding in FrameEncoding.ALL:
+            return encoding, None
+
+        return FrameEncoding.JSON, None
+
+    async def websocket_connect(self, message):
+        self.encoding, subprotocol = self.get_encoding()
+        self.start_outbound_writer()
+        self.start_heartbeat()
+        await self.accept(subprotocol)
+
+    async def send_upstream(self, message, stream_name=None):
+        if stream_name is not None \
+                and stream_name in self.applications \
+                and stream_name not in self.application_streams:
+            await self._create_upstream_application(stream_name)
+
+        await super().send_upstream(message, stream_name=stream_name)
+
+    async def decode_content(self, text_data: Optional[str], bytes_data: Optional[bytes]):
+        if bytes_data is not None and self.encoding != FrameEncoding.JSON:
+            return decode_frame(bytes_data, self.encoding)
+
+        if text_data is None:
+            raise ValueError('No text section for incoming WebSocket frame')
+
+        return await self.decode_json(text_data)
+
+    def is_valid_content(self, content) -> bool:
+        return isinstance(content, dict) \
+            and 'payload' in content \
+            and isinstance(content.get('stream'), str) \
+            and (content['stream'] == HEARTBEAT_STREAM or content['stream'] in self.applications)
+
+    async def receive(self, text_data=None, bytes_data=None, **kwargs):
+        """
+        Malformed frame of client closes the socket with INVALID_FRAME_CLOSE_CODE,
+        stream applications are disconnected as usual.
+        """
+        try:
+            content = await self.decode_content(text_data, bytes_data)
+        except FrameTooLarge:
+            await self.close(code=TOO_LARGE_CLOSE_CODE)
+            return
+        except FRAME_DECODE_ERRORS:
+            content = None
+
+        if not self.is_valid_content(content):
+            logger.warning('Invalid websocket frame received, disconnecting client')
+            await self.close(code=INVALID_FRAME_CLOSE_CODE)
+            return
+
+        await self.receive_json(content, **kwargs)
+
+    async def receive_json(self, content, **kwargs):
+        if not isinstance(content, dict) or 'stream' not in content or 'payload' not in content:
+            raise ValueError('Invalid multiplexed frame received (no channel/payload key)')
+
+        if content['stream'] == HEARTBEAT_STREAM:
+            await self.receive_heartbeat(content['payload'])
+            return
+
+        if content['stream'] not in self.applications:
+            raise ValueError('Invalid multiplexed frame received (stream not mapped)')
+
+        await self.send_upstream(
+            message={
+                'type': 'websocket.receive',
+                'text': await self.encode_json(content['payload'])
+            },
+            stream_name=content['stream']
+        )
+
+    async def receive_heartbeat(self, payload):
+        self.heartbeat_supported = True
+
+        if isinstance(payload, dict) and 'ping' in payload:
+            await self.enqueue(
+                encode_frame({'stream': HEARTBEAT_STREAM, 'payload': {'pong': payload['ping']}}, self.encoding),
+                HEARTBEAT_STREAM
+            )
+
+    async def websocket_send(self, message, stream_name):
+        """
+        Frame is encoded right away, so queue keeps only ready to send data.
+        """
+        payload = await self.decode_json(message.get('text'))
+        frame = encode_frame({'stream': stream_name, 'payload': payload}, self.encoding)
+
+        await self.enqueue(frame, stream_name)
+
+    async def multiplexer_frame(self, message, stream_name):
+        """
+        Payload that is the same for many connections, it's encoded once per worker.
+        """
+        frame = frame_cache.get_or_encode(
+            (stream_name, message['key']),
+            {'stream': stream_name, 'payload': message['payload']},
+            self.encoding
+        )
+
+        await self.enqueue(frame, stream_name)
+
+    async def websocket_accept(self, message, stream_name):
+        """
+        Socket is already accepted on connect.
+        """
+        self.applications_accepting_frames.add(stream_name)
+
+    async def websocket_close(self, message, stream_name):
+        """
+        We don't close the whole socket when one of stream applications is closed.
+        """
+        self.applications_accepting_frames.discard(stream_name)
+
+    async def disconnect(self, code):
+        if self.application_futures:
+            await super().disconnect(code)
@@ -1,29 +1,46 @@
 from django.db.models import Q
 from django.db.models.signals import \
+	post_init, \
 	pre_save, \
 	post_save, \
 	m2m_changed, \
-	post_delete
+	pre_delete, \
+	post_delete, \
+	pre_migrate, \
+	post_migrate
 
 from django.conf import settings
+from django.db import transaction, connections
 from django.dispatch import receiver
 from django.utils.translation import ugettext_lazy as _
 
 from conf.common.mime_settings import FRONTEND_ICON_SET
 from libs.helpers.strings import shorten_string_to, clean_string, foreign_key_title
 from libs.sprint.analyser import SprintAnalyser
-from .api.tasks import send_mentioned_in_message_email, \
-	send_mentioned_in_description_email
+from .api.tasks import generate_attachment_thumbnail
 
+import threading
 from enum import Enum
 
+from .broadcast import BROADCAST_MODELS, is_broadcast_model, broadcast_instance, broadcast_instances, take_snapshot, \
+	BroadcastAction
+
 from .models import Project, \
 	ProjectBacklog, \
 	IssueTypeCategory, \
 	IssueStateCategory, \
 	Sprint, \
 	Issue, \
-	IssueMessage, IssueEstimationCategory, SprintEffortsHistory, IssueHistory, IssueTypeCategoryIcon, ProjectWorkingDays
+	IssueMessage, IssueEstimationCategory, SprintEffortsHistory, IssueHistory, IssueTypeCategoryIcon, ProjectWorkingDays, \
+	IssueAttachment, \
+	Mention, \
+	MentionNotification, \
+	IssueSearchDocument, \
+	Workspace, \
+	WorkspaceCounter, \
+	bulk_update_versioned, \
+	post_bulk_update, \
+	post_bulk_create
 
 
 class ActionM2M(Enum):
@@ -52,11 +69,51 @@ def put_created_issue_to_backlog(instance: Issue, created: bool, **kwargs):
 		backlog.issues.add(instance)
 
 
+"""
+DATABASE SIGNALS
+"""
+
+
+@receiver(pre_migrate)
+def create_database_extensions(sender, using: str, **kwargs):
+	"""
+	Migrations of core are not committed, so we can't put extensions to them.
+	pg_trgm is needed for trigram index of issue titles.
+	"""
+	if sender.name != 'apps.core' or connections[using].vendor != 'postgresql':
+		return
+
+	with connections[using].cursor() as cursor:
+		cursor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+
+
+@receiver(post_migrate)
+def fill_empty_issue_keys(sender, using: str, **kwargs):
+	"""
+	Issues that were created before issue key was stored """
+	if sender.name != 'apps.core':
+		return
+
+	Issue.update_project_numbers(Issue.objects.using(using).filter(project_number=''))
+
+
 """
 PROJECT SIGNALS
 """
 
 
+@receiver(post_save, sender=Project)
+def update_issue_keys_of_project(instance: Project, created: bool, **kwargs):
+	"""
+	Project key could be changed, so stored keys of issues have to follow it.
+	"""
+	if created or kwargs.get('raw'):
+		return
+
+	if Issue.update_project_numbers(Issue.objects.filter(project=instance)):
+		WorkspaceCounter.increment_list_versions(instance.workspace_id, Issue)
+
+
 @receiver(post_save, sender=Project)
 def create_backlog_for_project(instance: Project, created: bool, **kwargs):
 	"""
@@ -182,6 +239,8 @@ def create_default_issue_type_category_for_project(instance: Project, created: b
 							  ordering=3)
 		])
 
+		WorkspaceCounter.increment_list_versions(instance.workspace_id, IssueTypeCategoryIcon, IssueTypeCategory)
+
 
 @receiver(post_save, sender=Project)
 def create_default_issue_state_category_for_project(instance: Project, created: bool, **kwargs):
@@ -217,6 +276,8 @@ def create_default_issue_state_category_for_project(instance: Project, created:
 							   is_done=True)
 		])
 
+		WorkspaceCounter.increment_list_versions(instance.workspace_id, IssueStateCategory)
+
 
 @receiver(post_save, sender=Project)
 def create_default_issue_estimation_for_project(instance: Project, created: bool, **kwargs):
@@ -253,6 +314,8 @@ def create_default_issue_estimation_for_project(instance: Project, created: bool
 										value=13)
 			])
 
+		WorkspaceCounter.increment_list_versions(instance.workspace_id, IssueEstimationCategory)
+
 
 @receiver(pre_save, sender=Sprint)
 def create_sprint_history_first_entry_and_set_issues_state_to_default(instance: Sprint, **kwargs):
@@ -291,7 +354,7 @@ def create_sprint_history_first_entry_and_set_issues_state_to_default(instance:
 
 	"""
 	Updating issues by bulk update """
-	Issue.objects.bulk_update(objects, ['state_category'])
+	bulk_update_versioned(Issue, objects, ['state_category'])
 
 	"""
 	If this Sprint was just created - we have to create first History Entry. """
@@ -370,28 +433,81 @@ def arrange_issue_in_backlog(action, instance, **kwargs):
 		pass
 
 
+def is_description_saved(created: bool, update_fields) -> bool:
+	return created or update_fields is None or 'description' in update_fields
+
+
 @receiver(post_save, sender=IssueMessage)
-def signal_mentioned_in_message_emails(instance: IssueMessage, created: bool, **kwargs):
+def signal_mentioned_in_message_emails(instance: IssueMessage, created: bool, update_fields=None, **kwargs):
 	"""
-	1) Check if someone was mentioned
-	2) Send an email if someone was mentioned
+	1) Update index of mentions in message
+	2) Remember new mentions, emails are sent as digest by send_mention_digest_emails
 	"""
+	if kwargs.get('raw') or not is_description_saved(created, update_fields):
+		return
+
+	mentions = Mention.sync(instance.issue,
+							instance.description,
+							mentioned_by=instance.created_by,
+							message=instance,
+							created=created)
+
+	MentionNotification.notify(mentions)
 
-	if any([not created, settings.DEBUG, settings.TESTING]):
+
+@receiver(post_save, sender=Issue)
+def signal_mentioned_in_description_emails(instance: Issue, created: bool, update_fields=None, **kwargs):
+	"""
+	Update index of mentions in issue description, look at signal_mentioned_in_message_emails
+	"""
+	if kwargs.get('raw') or not is_description_saved(created, update_fields):
 		return
 
-	send_mentioned_in_message_email.delay(instance.pk)
+	mentions = Mention.sync(instance,
+							instance.description,
+							mentioned_by=instance.updated_by or instance.created_by,
+							created=created)
+
+	MentionNotification.notify(mentions)
 
 
 @receiver(post_save, sender=Issue)
-def signal_mentioned_in_description_emails(instance: Issue, created: bool, **kwargs):
+def signal_update_issue_search_document(instance: Issue, created: bool, update_fields=None, **kwargs):
+	"""
+	Keep full text search document of issue up to date, look at IssueSearchDocument
+	"""
+	if kwargs.get('raw'):
+		return
+
+	if not created and update_fields is not None and not {'title', 'description'} & set(update_fields):
+		return
+
+	IssueSearchDocument.update_for([instance.pk])
+
+
+@receiver(post_save, sender=IssueMessage)
+def signal_update_message_search_document(instance: IssueMessage, created: bool, update_fields=None, **kwargs):
+	if kwargs.get('raw') or not is_description_saved(created, update_fields):
+		return
+
+	IssueSearchDocument.update_for([instance.issue_id])
+
+
+@receiver(post_delete, sender=IssueMessage)
+def signal_delete_message_search_document(instance: IssueMessage, **kwargs):
+	IssueSearchDocument.update_for([instance.issue_id], create=False)
+
+
+@receiver(post_save, sender=IssueAttachment)
+def signal_generate_attachment_thumbnail(instance: IssueAttachment, created: bool, **kwargs):
 	"""
-	Send an email if someone was mentioned in issue description
+	Generate thumbnail for just uploaded image in background.
+	We wait for commit, so that worker is able to find attachment.
 	"""
-	if any([not created, settings.DEBUG, settings.TESTING]):
+	if any([not created, not instance.show_preview, settings.DEBUG, settings.TESTING]):
 		return
 
-	send_mentioned_in_description_email.delay(instance.pk)
+	transaction.on_commit(lambda: generate_attachment_thumbnail.delay(instance.pk))
 
 
 @receiver(post_save, sender=Issue)
@@ -552,3 +668,120 @@ def signal_set_create_issue_history(instance: Issue, created: bool, **kwargs):
 	)
 
 	history_entry.save()
+
+
+def signal_remember_broadcast_instance_state(sender, instance, **kwargs):
+	"""
+	We broadcast only changed fields, so we have to know what was loaded.
+	It's sent for every loaded row, so it's connected to broadcast models only. """
+	take_snapshot(instance)
+
+
+for broadcast_model in BROADCAST_MODELS:
+	post_init.connect(signal_remember_broadcast_instance_state, sender=broadcast_model)
+
+
+@receiver(post_save)
+def signal_broadcast_saved_instance(sender, instance, created: bool, raw: bool = False, **kwargs):
+	"""
+	Send changes to consolidated workspace subscribers.
+	Look at apps/core/broadcast.py for detailed information. """
+	if raw or not is_broadcast_model(sender):
+		return
+
+	broadcast_instance(instance, BroadcastAction.CREATE if created else BroadcastAction.UPDATE)
+
+
+@receiver(post_delete)
+def signal_broadcast_deleted_instance(sender, instance, **kwargs):
+	if not is_broadcast_model(sender):
+		return
+
+	broadcast_instance(instance, BroadcastAction.DELETE)
+
+
+@receiver(post_bulk_update)
+def signal_broadcast_bulk_updated_instances(sender, instances, fields, **kwargs):
+	if not is_broadcast_model(sender):
+		return
+
+	broadcast_instances(instances, BroadcastAction.UPDATE, fields=fields)
+
+
+@receiver(post_bulk_create)
+def signal_broadcast_bulk_created_instances(sender, instances, **kwargs):
+	if not is_broadcast_model(sender):
+		return
+
+	broadcast_instances(instances, BroadcastAction.CREATE)
+
+
+"""
+LIST VERSIONS
+"""
+_deleted_workspaces = threading.local()
+
+
+def get_deleted_workspace_ids() -> set:
+	if not hasattr(_deleted_workspaces, 'ids'):
+		_deleted_workspaces.ids = set()
+
+	return _deleted_workspaces.ids
+
+
+@receiver(pre_delete, sender=Workspace)
+def signal_remember_deleted_workspace(instance: Workspace, **kwargs):
+	"""
+	Counters of deleted workspace can be deleted before the rest of its instances,
+	so we don't increment versions for them, otherwise counters would be created again. """
+	get_deleted_workspace_ids().add(instance.pk)
+
+
+@receiver(post_delete, sender=Workspace)
+def signal_forget_deleted_workspace(instance: Workspace, **kwargs):
+	get_deleted_workspace_ids().discard(instance.pk)
+
+
+def increment_list_versions(workspace_id: int, *models):
+	models = [model for model in models if WorkspaceCounter.is_list_versioned(model)]
+
+	if not models or workspace_id is None or workspace_id in get_deleted_workspace_ids():
+		return
+
+	WorkspaceCounter.increment_list_versions(workspace_id, *models)
+
+
+@receiver(post_save)
+def signal_increment_saved_instance_list_version(sender, instance, raw: bool = False, **kwargs):
+	"""
+	Lists are cached by clients with ETag built from versions,
+	look at WorkspacesReadOnlyModelViewSet.
+	Inside transaction versions are incremented once after commit, so they are never ahead of data. """
+	if raw:
+		return
+
+	increment_list_versions(getattr(instance, 'workspace_id', None), sender)
+
+
+@receiver(post_delete)
+def signal_increment_deleted_instance_list_version(sender, instance, **kwargs):
+	increment_list_versions(getattr(instance, 'workspace_id', None), sender)
+
+
+@receiver(m2m_changed)
+def signal_increment_m2m_changed_list_version(sender, instance, action, model, **kwargs):
+	"""
+	Both sides of relation can show it, for example sprint issues """
+	if action not in (ActionM2M.POST_ADD.value, ActionM2M.POST_REMOVE.value, ActionM2M.POST_CLEAR.value):
+		return
+
+	increment_list_versions(getattr(instance, 'workspace_id', None), instance.__class__, model)
+
+
+@receiver(post_bulk_update)
+def signal_increment_bulk_updated_instances_list_version(sender, instances, **kwargs):
+	if not WorkspaceCounter.is_list_versioned(sender):
+		return
+
+	for workspace_id in {instance.workspace_id for instance in instances}:
+		increment_list_versions(workspace_id, sender)
@@ -0,0 +1,179 @@
+import json
+import os
+import tempfile
+from io import StringIO
+
+from django.core.management import call_command, CommandError
+from django.test import TestCase
+
+from apps.core.management.commands.audit_indexes import get_seq_scans
+from apps.core.models import Issue, Project, IssueSearchDocument, IssueHistory, IssueImport, ProjectBacklog, \
+	IssueStateCategory, WorkspaceEvent
+from apps.core.tests.test_models import IssueBasedModelTesting
+
+
+class AuditIndexesCommandTesting(TestCase):
+	def test_seq_scans_are_found_in_nested_plans(self):
+		plan = {
+			'Node Type': 'Nested Loop',
+			'Plans': [
+				{'Node Type': 'Index Scan', 'Relation Name': 'core_issue', 'Index Name': 'core_issue_key_idx'},
+				{'Node Type': 'Seq Scan', 'Relation Name': 'core_issue_history'}
+			]
+		}
+
+		self.assertEqual(get_seq_scans(plan), ['core_issue_history'])
+
+	def test_dataset_is_rolled_back(self):
+		output = StringIO()
+
+		try:
+			call_command('audit_indexes', rows=400, projects=20, throwaway_database=True, stdout=output)
+		except CommandError:
+			"""
+			Planner is free to read tables that small by sequential scan """
+			pass
+
+		self.assertIn('Issues of project by ordering', output.getvalue())
+		self.assertIn('Pending mention notifications', output.getvalue())
+
+		self.assertFalse(Project.objects.exists())
+		self.assertFalse(Issue.objects.exists())
+
+	def test_throwaway_database_has_to_be_confirmed(self):
+		with self.assertRaises(CommandError):
+			call_command('audit_indexes', rows=400, projects=20, stdout=StringIO())
+
+		self.assertFalse(Project.objects.exists())
+
+
+class RebuildSearchDocumentsCommandTesting(IssueBasedModelTesting):
+	def test_documents_are_rebuilt(self):
+		IssueSearchDocument.objects.all().delete()
+
+		call_command('rebuild_search_documents', stdout=StringIO())
+
+		self.assertTrue(IssueSearchDocument.objects.filter(issue=self.issue, vector__isnull=False).exists())
+
+
+class ImportIssuesCommandTesting(IssueBasedModelTesting):
+	def setUp(self):
+		"""
+		Broadcasts are sent after commit, so test data is committed for them """
+		with self.captureOnCommitCallbacks(execute=True):
+			super().setUp()
+
+	def write_file(self, suffix: str, content: str) -> str:
+		descriptor, path = tempfile.mkstemp(suffix=suffix)
+
+		with os.fdopen(descriptor, 'w', encoding='utf-8') as file:
+			file.write(content)
+
+		self.addCleanup(os.remove, path)
+
+		return path
+
+	def test_csv_is_imported_in_chunks(self):
+		path = self.write_file('.csv', '\n'.join([
+			'title,description,type,state,estimation,assignee',
+			'First imported,<p>First</p>,Bug,Done,XL,' + self.user.username,
+			'Second imported,,,,,',
+			'Third imported,,,Unknown,,',
+			'Second imported,,,,,',
+			f'{self.issue.title},,,,,',
+			',,,,,',
+			'Fourth imported,,Task,,,' + self.user.email,
+		]))
+
+		output = StringIO()
+		call_command('import_issues', self.project.pk, path, chunk_size=2, stdout=output)
+
+		issue_import = IssueImport.objects.get(project=self.project)
+		self.assertEqual(issue_import.status, IssueImport.STATUS_DONE)
+		self.assertEqual(issue_import.format, IssueImport.FORMAT_CSV)
+		self.assertEqual(issue_import.processed, 7)
+		self.assertEqual(issue_import.imported, 3)
+		self.assertEqual(sorted(error['row'] for error in issue_import.errors), [4, 5, 6, 7])
+
+		issues = Issue.objects \
+			.filter(project=self.project) \
+			.exclude(pk=self.issue.pk) \
+			.order_by('number')
+
+		self.assertEqual([issue.title for issue in issues], ['First imported', 'Second imported', 'Fourth imported'])
+		self.assertEqual([issue.number for issue in issues],
+						 [self.issue.number + 1, self.issue.number + 2, self.issue.number + 3])
+		self.assertEqual(issues[0].project_number, f'{self.project.key}-{self.issue.number + 1}')
+
+		first = issues[0]
+		self.assertEqual(first.type_category.title, 'Bug')
+		self.assertEqual(first.state_category.title, 'Done')
+		self.assertEqual(first.estimation_category.title, 'XL')
+		self.assertEqual(first.assignee, self.person)
+		self.assertEqual(issues[1].state_category, self.state_category)
+		self.assertEqual(issues[2].assignee, self.person)
+
+		backlog = ProjectBacklog.objects.get(project=self.project)
+		self.assertEqual(backlog.issues.filter(pk__in=issues).count(), 3)
+		self.assertEqual(IssueHistory.objects.filter(issue__in=issues).count(), 3)
+		self.assertEqual(IssueSearchDocument.objects.filter(issue__in=issues).count(), 3)
+
+		self.assertIn('3 of 7 rows were imported', output.getvalue())
+
+	def test_imported_issues_are_ordered_after_backlog_and_broadcast(self):
+		Issue.objects.filter(pk=self.issue.pk).update(ordering=5)
+
+		path = self.write_file('.csv', '\n'.join([
+			'title',
+			'First imported',
+			'Second imported',
+			'Third imported',
+		]))
+
+		with self.captureOnCommitCallbacks(execute=True):
+			call_command('import_issues', self.project.pk, path, chunk_size=2, stdout=StringIO())
+
+		issues = Issue.objects \
+			.filter(project=self.project) \
+			.exclude(pk=self.issue.pk) \
+			.order_by('number')
+
+		self.assertEqual([issue.ordering for issue in issues], [6, 7, 8])
+
+		"""
+		Chunks share the transaction of test, so they are coalesced to one frame """
+		created_per_frame = [
+			[event['pk'] for event in entry.events if event['model'] == 'issue' and event['action'] == 'create']
+			for entry
+			in WorkspaceEvent.objects.filter(workspace=self.workspace)
+		]
+
+		self.assertEqual(created_per_frame[-1], [issue.pk for issue in issues])
+
+	def test_ndjson_is_imported(self):
+		state = IssueStateCategory.objects.get(project=self.project, title='In Progress')
+
+		path = self.write_file('.ndjson', '\n'.join([
+			json.dumps({'title': 'From json', 'state': 'in progress'}),
+			'',
+			'{not json',
+			json.dumps(['From list']),
+		]))
+
+		call_command('import_issues', self.project.pk, path, person=self.user.username, stdout=StringIO())
+
+		issue_import = IssueImport.objects.get(project=self.project)
+		self.assertEqual(issue_import.format, IssueImport.FORMAT_NDJSON)
+		self.assertEqual(issue_import.created_by, self.person)
+		self.assertEqual(issue_import.imported, 1)
+		self.assertEqual([error['row'] for error in issue_import.errors], [3, 4])
+
+		issue = Issue.objects.get(project=self.project, title='From json')
+		self.assertEqual(issue.state_category, state)
+		self.assertEqual(issue.created_by, self.person)
+
+	def test_missing_file_is_reported(self):
+		with self.assertRaises(CommandError):
+			call_command('import_issues', self.project.pk, '/nonexistent/issues.csv', stdout=StringIO())
+
+		self.assertFalse(IssueImport.objects.exists())
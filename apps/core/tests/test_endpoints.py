@@ -1,15 +1,28 @@
 import datetime
 import json
+import shutil
+import tempfile
+from unittest import mock
 
+from asgiref.sync import async_to_sync
+from django.conf import settings
 from django.contrib.auth.models import User
+from django.core.asgi import get_asgi_application
+from django.core.cache import caches
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection, transaction
+from django.test import TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from rest_framework.test import APITestCase
+from rest_framework_simplejwt.tokens import AccessToken
 
 from apps.core.models import Person, PersonRegistrationRequest, PersonForgotRequest, Workspace, Project, \
 	PersonInvitationRequest, IssueTypeCategoryIcon, IssueStateCategory, IssueEstimationCategory, Issue, \
 	IssueTypeCategory, IssueHistory, IssueMessage, ProjectBacklog, SprintDuration, Sprint, ProjectNonWorkingDay, \
-	ProjectWorkingDays
+	ProjectWorkingDays, Mention, WorkspaceCounter, IssueImport, WorkspaceExport
 
+from apps.core.api.views import IssueSearchCursorPagination, WorkspacesReadOnlyModelViewSet
 from apps.core.tests import data_samples
 from apps.core.tests import errors_samples
 from conf.common import url_aliases
@@ -351,6 +364,10 @@ class APIAuthBaseTestCase(APITestCase):
 		json_response = json.loads(response.content)
 		standard = self.create_standard(instance, patch=data, exclude=exclude)
 
+		# Every update increases version of versioned models
+		if 'version' in standard:
+			standard['version'] += 1
+
 		self.assertResponse(json_response, standard)
 
 		return json_response
@@ -1050,6 +1067,17 @@ class IssueBasedTest(APIAuthBaseTestCase):
 				assignee=self.person
 			)
 
+	def create_issue(self, title: str, description: str = '', workspace=None, project=None) -> Issue:
+		return Issue \
+			.objects \
+			.create(
+				workspace=workspace or self.workspace,
+				project=project or self.project,
+				title=title,
+				description=description,
+				created_by=self.person
+			)
+
 	@classmethod
 	def setUpTestData(cls):
 		super().setUpTestData()
@@ -1199,6 +1227,96 @@ class IssueTest(IssueBasedTest):
 		)
 
 
+class IssueFilterTest(IssueBasedTest):
+	def list_issues(self, **params):
+		response = self.client.get(reverse(url_aliases.ISSUES_LIST), params, format='json')
+		self.assertEqual(response.status_code, 200, msg=response.content)
+
+		return json.loads(response.content)
+
+	def setUp(self):
+		self.client.force_login(self.user)
+
+		self.first_issue = self.create_issue('First issue')
+		self.second_issue = self.create_issue('Second issue')
+
+		self.another_state_category = IssueStateCategory \
+			.objects \
+			.filter(
+				workspace=self.workspace,
+				project=self.project,
+				is_default=False
+			) \
+			.first()
+
+		self.second_issue.state_category = self.another_state_category
+		self.second_issue.assignee = self.second_participant_person
+		self.second_issue.save()
+
+	def test_filter_by_state_and_assignee(self):
+		self.assertEqual(
+			[issue['id'] for issue in self.list_issues(state=self.another_state_category.id)],
+			[self.second_issue.id]
+		)
+		self.assertEqual(
+			[issue['id'] for issue in self.list_issues(assignee=self.person.id)],
+			[]
+		)
+		self.assertEqual(
+			[issue['id'] for issue in self.list_issues(project=self.project.id,
+													   assignee=self.second_participant_person.id)],
+			[self.second_issue.id]
+		)
+
+	def test_filter_by_sprint_and_backlog(self):
+		sprint = Sprint \
+			.objects \
+			.create(
+				workspace=self.workspace,
+				project=self.project,
+				title=data_samples.CORRECT_SPRINT_TITLE,
+				goal=data_samples.CORRECT_SPRINT_GOAL
+			)
+		sprint.issues.add(self.first_issue)
+
+		self.assertEqual([issue['id'] for issue in self.list_issues(sprint=sprint.id)], [self.first_issue.id])
+		self.assertEqual([issue['id'] for issue in self.list_issues(backlog='true')], [self.second_issue.id])
+		self.assertEqual([issue['id'] for issue in self.list_issues(backlog='false')], [self.first_issue.id])
+
+	def test_filter_by_updated_since(self):
+		Issue.objects \
+			.filter(pk=self.first_issue.pk) \
+			.update(updated_at=datetime.datetime(2020, 1, 1))
+
+		self.assertEqual(
+			[issue['id'] for issue in self.list_issues(updated_since='2021-01-01T00:00:00')],
+			[self.second_issue.id]
+		)
+
+	def test_facets(self):
+		with CaptureQueriesContext(connection) as context:
+			facets = self.list_issues(facets='true', project=self.project.id)
+
+		self.assertEqual(len([query for query in context.captured_queries if 'core_issue' in query['sql']]), 1)
+
+		self.assertEqual(facets['total'], 2)
+		self.assertEqual(
+			sorted(facets['state'], key=lambda facet: facet['id']),
+			sorted([
+				{'id': self.first_issue.state_category_id, 'count': 1},
+				{'id': self.another_state_category.id, 'count': 1}
+			], key=lambda facet: facet['id'])
+		)
+		self.assertEqual(
+			sorted(facets['assignee'], key=lambda facet: facet['id'] or 0),
+			[
+				{'id': None, 'count': 1},
+				{'id': self.second_participant_person.id, 'count': 1}
+			]
+		)
+		self.assertEqual(facets['type'], [{'id': self.first_issue.type_category_id, 'count': 2}])
+
+
 class IssueHistoryTest(IssueBasedTest):
 	def create_or_get_instance(self):
 		issue = super().create_or_get_instance()
@@ -1278,6 +1396,7 @@ class IssueMessageTest(IssueBasedTest):
 			'workspace',
 			'project',
 			'issue',
+			'description_hash',
 			'created_at',
 			'updated_at'
 		]
@@ -1314,6 +1433,394 @@ class IssueMessageTest(IssueBasedTest):
 										exclude=self.standard_exclude_fields)
 
 		self.assertResponse(json_response_first_slice, standard)
+		self.assertNotIn('description_hash', json_response_first_slice)
+
+
+class IssueSearchTest(IssueBasedTest):
+	def search(self, text: str) -> dict:
+		response = self.client.get(reverse(url_aliases.ISSUES_SEARCH_LIST), {'q': text}, format='json')
+		self.assertEqual(response.status_code, 200)
+
+		return json.loads(response.content)
+
+	def test_title_is_more_relevant(self):
+		self.client.force_login(self.user)
+
+		in_description = self.create_issue('Refactor serializers', '<p>Broken <b>dragon</b> eggs</p>')
+		in_title = self.create_issue('Dragon eggs')
+
+		json_response = self.search('dragon')
+
+		self.assertEqual(
+			[issue['id'] for issue in json_response['results']],
+			[in_title.id, in_description.id]
+		)
+		self.assertEqual(json_response['results'][0]['project_number'], in_title.project_number)
+		self.assertIsNone(json_response['next'])
+
+	def test_pages_follow_rank(self):
+		self.client.force_login(self.user)
+
+		issues = [
+			self.create_issue('Dragon dragon dragon'),
+			self.create_issue('Dragon', '<p>dragon</p>'),
+			self.create_issue('Tail', '<p>dragon</p>'),
+			self.create_issue('Wings', '<p>dragon</p>'),
+		]
+
+		found = []
+
+		with mock.patch.object(IssueSearchCursorPagination, 'page_size', 1):
+			json_response = self.search('dragon')
+			found += json_response['results']
+
+			while json_response['next'] is not None:
+				json_response = json.loads(self.client.get(json_response['next'], format='json').content)
+				found += json_response['results']
+
+		self.assertEqual(len(found), len(issues))
+		self.assertEqual(
+			[issue['id'] for issue in found],
+			[issue['id'] for issue in sorted(found, key=lambda issue: (-issue['rank'], -issue['id']))]
+		)
+		self.assertEqual({issue['id'] for issue in found}, {issue.id for issue in issues})
+
+	def test_search_in_messages(self):
+		self.client.force_login(self.user)
+
+		issue = self.create_issue('Release checklist')
+		self.assertEqual(self.search('migration')['results'], [])
+
+		message = IssueMessage \
+			.objects \
+			.create(
+				workspace=self.workspace,
+				project=self.project,
+				issue=issue,
+				description='<p>Don\'t forget a migration</p>',
+				created_by=self.person
+			)
+
+		self.assertEqual([found['id'] for found in self.search('migration')['results']], [issue.id])
+
+		message.delete()
+		self.assertEqual(self.search('migration')['results'], [])
+
+	def test_search_is_isolated_by_workspace(self):
+		self.client.force_login(self.user)
+
+		foreign_workspace = Workspace \
+			.objects \
+			.create(
+				prefix_url='FOREIGN',
+				owned_by=self.third_not_participant_person
+			)
+
+		foreign_project = Project \
+			.objects \
+			.create(
+				workspace=foreign_workspace,
+				title=data_samples.CORRECT_PROJECT_TITLE,
+				key=data_samples.CORRECT_PROJECT_KEY,
+				owned_by=self.third_not_participant_person
+			)
+
+		self.create_issue('Secret dragon', workspace=foreign_workspace, project=foreign_project)
+
+		self.assertEqual(self.search('dragon')['results'], [])
+		self.assertEqual(self.search('')['results'], [])
+
+
+class IssueTypeaheadTest(IssueBasedTest):
+	def typeahead(self, text: str) -> list:
+		response = self.client.get(reverse(url_aliases.ISSUES_TYPEAHEAD), {'q': text}, format='json')
+		self.assertEqual(response.status_code, 200)
+
+		return json.loads(response.content)
+
+	def test_key_is_stored(self):
+		issue = self.create_issue('Stored key')
+
+		self.assertEqual(
+			Issue.objects.filter(project_number=f'{self.project.key}-{issue.number}').get(),
+			issue
+		)
+
+	def test_key_follows_project_key(self):
+		issue = self.create_issue('Renamed project')
+
+		self.project.key = 'renamed'
+		self.project.save()
+
+		issue.refresh_from_db()
+		self.assertEqual(issue.project_number, f'RENAMED-{issue.number}')
+
+	def test_typeahead_by_key(self):
+		self.client.force_login(self.user)
+
+		issue = self.create_issue('Typeahead by key')
+		self.create_issue(f'Mention of {issue.project_number.lower()} in title')
+
+		results = self.typeahead(issue.project_number.lower())
+
+		self.assertEqual(results[0], {
+			'id': issue.id,
+			'key': issue.project_number,
+			'title': issue.title
+		})
+
+	def test_typeahead_by_title(self):
+		self.client.force_login(self.user)
+
+		issue = self.create_issue('Burndown chart is empty')
+		self.create_issue('Sprint duration')
+
+		self.assertEqual([found['id'] for found in self.typeahead('burndwn chart')], [issue.id])
+		self.assertEqual([found['id'] for found in self.typeahead('chart is')], [issue.id])
+		self.assertEqual(self.typeahead(''), [])
+
+	def test_typeahead_gives_up_in_time(self):
+		self.client.force_login(self.user)
+
+		self.create_issue('Slow typeahead')
+
+		with self.settings(PMDRAGON_TYPEAHEAD_TIMEOUT=1), \
+				mock.patch('apps.core.api.views.IssueTypeaheadView.get_typeahead_queryset',
+						   return_value=Issue.objects.extra(where=['pg_sleep(0.05) IS NOT NULL'])):
+			self.assertEqual(self.typeahead('slow'), [])
+
+
+class MentionTest(IssueBasedTest):
+	def mention(self, *persons) -> str:
+		return ''.join(f'<span data-mentioned-user-id="{person.pk}">@</span>' for person in persons)
+
+	def test_mentions_are_indexed_on_save(self):
+		issue: Issue = self.create_or_get_instance()
+
+		issue.description = self.mention(self.second_participant_person, self.third_not_participant_person)
+		issue.save()
+
+		self.assertEqual(
+			list(Mention.objects.filter(issue=issue).values_list('person_id', flat=True)),
+			[self.second_participant_person.pk]
+		)
+
+		issue.description = data_samples.CORRECT_ISSUE_DESCRIPTION
+		issue.save()
+
+		self.assertFalse(Mention.objects.filter(issue=issue).exists())
+
+	def test_can_list_own_mentions(self):
+		self.client.force_login(self.user)
+
+		issue: Issue = self.create_or_get_instance()
+
+		IssueMessage \
+			.objects \
+			.create(
+				workspace=self.workspace,
+				project=self.project,
+				issue=issue,
+				description=self.mention(self.person, self.second_participant_person),
+				created_by=self.second_participant_person
+			)
+
+		issue.description = self.mention(self.person)
+		issue.save()
+
+		response = self.client.get(reverse(url_aliases.MENTIONS_LIST), format='json')
+
+		self.assertEqual(response.status_code, 200)
+
+		json_response = json.loads(response.content)
+		self.assertIsNone(json_response['next'])
+
+		description_mention, message_mention = json_response['results']
+
+		self.assertIsNone(description_mention['message'])
+		self.assertIsNotNone(message_mention['message'])
+		self.assertEqual(message_mention['mentioned_by'], self.second_participant_person.pk)
+
+
+class CommittedTestDataMixin:
+	@classmethod
+	def setUpTestData(cls):
+		"""
+		List versions are incremented after commit, so test data is committed for them """
+		with cls.captureOnCommitCallbacks(execute=True):
+			super().setUpTestData()
+
+
+class ListETagTest(CommittedTestDataMixin, IssueBasedTest):
+	def get_list(self, url_alias: str, etag: str = None, **params):
+		headers = {} if etag is None else {'HTTP_IF_NONE_MATCH': etag}
+		return self.client.get(reverse(url_alias), params, format='json', **headers)
+
+	def get_etag(self, url_alias: str, **params) -> str:
+		response = self.get_list(url_alias, **params)
+		self.assertEqual(response.status_code, 200, msg=response.content)
+
+		return response['ETag']
+
+	def setUp(self):
+		self.client.force_login(self.user)
+
+		with self.captureOnCommitCallbacks(execute=True):
+			self.issue = self.create_issue('Cached issue')
+
+	def test_not_modified_list_does_not_touch_listed_table(self):
+		etag = self.get_etag(url_aliases.ISSUES_LIST)
+
+		with CaptureQueriesContext(connection) as context:
+			response = self.get_list(url_aliases.ISSUES_LIST, etag=etag)
+
+		self.assertEqual(response.status_code, 304)
+		self.assertEqual(response['ETag'], etag)
+		self.assertEqual(response.content, b'')
+		self.assertFalse([query for query in context.captured_queries if '"core_issue"' in query['sql']])
+
+	def test_etag_is_changed_by_save_and_delete(self):
+		etag = self.get_etag(url_aliases.ISSUES_LIST)
+
+		with self.captureOnCommitCallbacks(execute=True):
+			self.issue.title = 'Changed issue'
+			self.issue.save()
+
+		changed_etag = self.get_etag(url_aliases.ISSUES_LIST)
+		self.assertNotEqual(etag, changed_etag)
+		self.assertEqual(self.get_list(url_aliases.ISSUES_LIST, etag=etag).status_code, 200)
+
+		with self.captureOnCommitCallbacks(execute=True):
+			self.issue.delete()
+
+		self.assertNotEqual(self.get_etag(url_aliases.ISSUES_LIST), changed_etag)
+
+	def test_etag_is_changed_by_m2m_change(self):
+		with self.captureOnCommitCallbacks(execute=True):
+			sprint = Sprint \
+				.objects \
+				.create(
+					workspace=self.workspace,
+					project=self.project,
+					title=data_samples.CORRECT_SPRINT_TITLE,
+					goal=data_samples.CORRECT_SPRINT_GOAL
+				)
+
+		etag = self.get_etag(url_aliases.SPRINTS_LIST)
+
+		with self.captureOnCommitCallbacks(execute=True):
+			sprint.issues.add(self.issue)
+
+		self.assertEqual(self.get_list(url_aliases.SPRINTS_LIST, etag=etag).status_code, 200)
+
+	def test_etag_is_changed_by_project_key(self):
+		etag = self.get_etag(url_aliases.ISSUES_LIST)
+
+		with self.captureOnCommitCallbacks(execute=True):
+			self.project.key = data_samples.CORRECT_PROJECT_KEY_3
+			self.project.save()
+
+		self.assertNotEqual(self.get_etag(url_aliases.ISSUES_LIST), etag)
+
+	def test_list_version_is_incremented_once_after_commit(self):
+		label = WorkspaceCounter.get_list_version_label(Issue)
+		version = WorkspaceCounter.get_value(self.workspace.id, label)
+
+		with self.captureOnCommitCallbacks() as callbacks:
+			with transaction.atomic():
+				self.create_issue('First issue')
+				self.create_issue('Second issue')
+
+			self.assertEqual(WorkspaceCounter.get_value(self.workspace.id, label), version)
+
+		for callback in callbacks:
+			callback()
+
+		self.assertEqual(WorkspaceCounter.get_value(self.workspace.id, label), version + 1)
+
+	def test_etag_depends_on_query_string(self):
+		self.assertNotEqual(
+			self.get_etag(url_aliases.ISSUES_LIST),
+			self.get_etag(url_aliases.ISSUES_LIST, project=self.project.id)
+		)
+
+	def test_list_of_other_model_keeps_etag(self):
+		etag = self.get_etag(url_aliases.SPRINT_DURATIONS_LIST)
+
+		self.create_issue('Another issue')
+
+		self.assertEqual(self.get_list(url_aliases.SPRINT_DURATIONS_LIST, etag=etag).status_code, 304)
+
+	def test_list_version_models_are_versioned(self):
+		viewsets = [WorkspacesReadOnlyModelViewSet]
+
+		while viewsets:
+			viewset = viewsets.pop()
+			viewsets.extend(viewset.__subclasses__())
+
+			if viewset.queryset is None:
+				continue
+
+			for model in viewset().get_list_version_models():
+				self.assertTrue(WorkspaceCounter.is_list_versioned(model), msg=f'{viewset.__name__} {model}')
+
+	def test_workspace_can_be_deleted(self):
+		self.get_etag(url_aliases.ISSUES_LIST)
+
+		workspace_id = self.workspace.pk
+		self.workspace.delete()
+
+		self.assertFalse(WorkspaceCounter.objects.filter(workspace_id=workspace_id).exists())
+
+
+class CatalogCacheTest(CommittedTestDataMixin, APIAuthBaseTestCase):
+	def list_issue_states(self) -> list:
+		response = self.client.get(reverse(url_aliases.ISSUE_STATES_LIST), format='json')
+		self.assertEqual(response.status_code, 200, msg=response.content)
+
+		return json.loads(response.content)
+
+	def setUp(self):
+		self.client.force_login(self.user)
+
+	def test_catalog_is_read_from_cache(self):
+		states = self.list_issue_states()
+		self.assertTrue(states)
+
+		with CaptureQueriesContext(connection) as context:
+			self.assertEqual(self.list_issue_states(), states)
+
+		self.assertFalse([query for query in context.captured_queries if '"core_issue_state"' in query['sql']])
+
+	def test_cache_hit_takes_fewer_queries_than_miss(self):
+		caches[settings.PMDRAGON_CATALOG_CACHE].clear()
+
+		with CaptureQueriesContext(connection) as miss_context:
+			states = self.list_issue_states()
+
+		with CaptureQueriesContext(connection) as hit_context:
+			self.assertEqual(self.list_issue_states(), states)
+
+		self.assertLess(len(hit_context.captured_queries), len(miss_context.captured_queries))
+
+	def test_changed_catalog_is_not_read_from_cache(self):
+		states = self.list_issue_states()
+
+		with self.captureOnCommitCallbacks(execute=True):
+			state = IssueStateCategory \
+				.objects \
+				.create(
+					workspace=self.workspace,
+					project=self.project,
+					title=data_samples.CORRECT_ISSUE_STATE_TITLE
+				)
+
+		self.assertIn(state.id, [entry['id'] for entry in self.list_issue_states()])
+
+		with self.captureOnCommitCallbacks(execute=True):
+			state.delete()
+
+		self.assertEqual(self.list_issue_states(), states)
 
 
 class ProjectBacklogTest(APIAuthBaseTestCase):
@@ -1413,3 +1920,200 @@ class ProjectWorkingDaysTest(APIAuthBaseTestCase):
 				workspace=self.workspace,
 				project=self.project
 			)
+
+
+class IssueImportTest(IssueBasedTest):
+	def setUp(self):
+		self.media_root = tempfile.mkdtemp()
+		self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+
+		self.client.force_login(self.user)
+
+	def post_import(self, name: str, content: bytes, project=None):
+		data = {
+			'workspace': self.workspace.pk,
+			'project': (project or self.project).pk,
+			'source': SimpleUploadedFile(name, content)
+		}
+
+		with override_settings(MEDIA_ROOT=self.media_root), \
+				mock.patch('apps.core.api.views.import_issues.delay') as delay, \
+				self.captureOnCommitCallbacks(execute=True):
+			response = self.client.post(reverse(url_aliases.ISSUE_IMPORTS_LIST), data, format='multipart')
+
+		return response, delay
+
+	def test_import_is_started_after_upload(self):
+		response, delay = self.post_import('issues.ndjson', b'{"title": "Imported"}\n')
+		self.assertEqual(response.status_code, 201, msg=response.content)
+
+		json_response = json.loads(response.content)
+		self.assertEqual(json_response['format'], IssueImport.FORMAT_NDJSON)
+		self.assertEqual(json_response['status'], IssueImport.STATUS_PENDING)
+		self.assertEqual(json_response['created_by'], self.person.pk)
+		self.assertNotIn('source', json_response)
+
+		delay.assert_called_once_with(json_response['id'])
+
+		detail_response = self.client.get(reverse(url_aliases.ISSUE_IMPORTS_DETAIL, args=[json_response['id']]))
+		self.assertEqual(detail_response.status_code, 200)
+
+	def test_project_of_other_workspace_is_rejected(self):
+		other_workspace = Workspace.objects.create(prefix_url='IMPORTS', owned_by=self.person)
+		other_project = Project.objects.create(workspace=other_workspace,
+											   title='Other',
+											   key='OTH',
+											   owned_by=self.person)
+
+		response, delay = self.post_import('issues.csv', b'title\nImported\n', project=other_project)
+
+		self.assertEqual(response.status_code, 400)
+		delay.assert_not_called()
+		self.assertFalse(IssueImport.objects.exists())
+
+
+class WorkspaceExportTest(IssueBasedTest):
+	def setUp(self):
+		self.client.force_login(self.user)
+
+		self.issue = self.create_issue('Exported issue', '<p>Exported</p>')
+		self.sprint = Sprint.objects.create(workspace=self.workspace, project=self.project, title='Exported sprint')
+		self.sprint.issues.add(self.issue)
+
+	def post_export(self, **data):
+		return self.client.post(reverse(url_aliases.WORKSPACE_EXPORTS_LIST),
+								{'workspace': self.workspace.pk, **data},
+								format='json')
+
+	@staticmethod
+	def get_content(response) -> str:
+		return b''.join(response.streaming_content).decode('utf-8')
+
+	def test_small_workspace_is_returned_as_ndjson(self):
+		response = self.post_export()
+		self.assertEqual(response.status_code, 200)
+		self.assertTrue(response.streaming)
+		self.assertTrue(response['Content-Type'].startswith('application/x-ndjson'))
+		self.assertIn('attachment', response['Content-Disposition'])
+
+		content = self.get_content(response)
+		self.assertEqual(int(response['Content-Length']), len(content.encode('utf-8')))
+
+		rows = [json.loads(line) for line in content.splitlines()]
+		sections = {row['section'] for row in rows}
+
+		self.assertTrue({'projects', 'issues', 'issue_history', 'sprints', 'sprint_issues'} <= sections)
+
+		issue_row = next(row for row in rows if row['section'] == 'issues' and row['id'] == self.issue.pk)
+		self.assertEqual(issue_row['title'], 'Exported issue')
+		self.assertEqual(issue_row['key'], self.issue.project_number)
+		self.assertEqual(issue_row['created_by'], self.user.username)
+
+		self.assertIn({'section': 'sprint_issues', 'sprint': self.sprint.pk, 'issue': self.issue.pk}, rows)
+		self.assertFalse(WorkspaceExport.objects.exists())
+
+	def test_section_is_returned_as_csv(self):
+		response = self.post_export(format=WorkspaceExport.FORMAT_CSV, section='sprints')
+		self.assertEqual(response.status_code, 200)
+		self.assertTrue(response['Content-Type'].startswith('text/csv'))
+
+		lines = self.get_content(response).splitlines()
+		self.assertTrue(lines[0].startswith('id,project,title,goal'))
+		self.assertEqual(len(lines), 2)
+		self.assertIn('Exported sprint', lines[1])
+
+	def test_csv_requires_section(self):
+		response = self.post_export(format=WorkspaceExport.FORMAT_CSV)
+		self.assertEqual(response.status_code, 400)
+		self.assertIn('section', json.loads(response.content))
+
+	def test_large_workspace_is_exported_in_background(self):
+		with override_settings(PMDRAGON_EXPORT_RESPONSE_ISSUES_LIMIT=0), \
+				mock.patch('apps.core.api.views.export_workspace.delay') as delay, \
+				self.captureOnCommitCallbacks(execute=True):
+			response = self.post_export()
+
+		self.assertEqual(response.status_code, 202, msg=response.content)
+
+		json_response = json.loads(response.content)
+		self.assertEqual(json_response['status'], WorkspaceExport.STATUS_PENDING)
+		self.assertEqual(json_response['created_by'], self.person.pk)
+
+		delay.assert_called_once_with(json_response['id'])
+
+		detail_response = self.client.get(reverse(url_aliases.WORKSPACE_EXPORTS_DETAIL, args=[json_response['id']]))
+		self.assertEqual(detail_response.status_code, 200)
+
+
+class WorkspaceExportAsgiTest(TransactionTestCase):
+	"""
+	Export is requested through ASGI handler as in production, where queries are not allowed in event loop.
+	Handler is closing connections, so we can't use TestCase with transaction around every test here.
+	"""
+	def setUp(self):
+		self.user = User.objects.create_user(
+			username=data_samples.CORRECT_USERNAME,
+			email=data_samples.CORRECT_EMAIL,
+			is_active=True
+		)
+
+		self.person = Person.objects.create(user=self.user, phone=data_samples.CORRECT_PHONE)
+
+		self.workspace = Workspace.objects.create(prefix_url=data_samples.CORRECT_PREFIX_URL, owned_by=self.person)
+		self.workspace.participants.add(self.person)
+
+		self.project = Project \
+			.objects \
+			.create(
+				workspace=self.workspace,
+				title=data_samples.CORRECT_PROJECT_TITLE,
+				key=data_samples.CORRECT_PROJECT_KEY,
+				owned_by=self.person
+			)
+
+		self.issue = Issue.objects.create(workspace=self.workspace,
+										  project=self.project,
+										  title='Exported issue',
+										  created_by=self.person)
+
+	def post_export(self, data: dict) -> tuple:
+		body = json.dumps(data).encode('utf-8')
+		scope = {
+			'type': 'http',
+			'asgi': {'version': '3.0'},
+			'http_version': '1.1',
+			'method': 'POST',
+			'scheme': 'http',
+			'path': reverse(url_aliases.WORKSPACE_EXPORTS_LIST),
+			'query_string': b'',
+			'headers': [
+				(b'host', b'testserver'),
+				(b'content-type', b'application/json'),
+				(b'content-length', str(len(body)).encode('ascii')),
+				(b'authorization', f'Bearer {AccessToken.for_user(self.user)}'.encode('ascii')),
+			],
+		}
+
+		messages = []
+
+		async def receive():
+			return {'type': 'http.request', 'body': body, 'more_body': False}
+
+		async def send(message):
+			messages.append(message)
+
+		async_to_sync(get_asgi_application())(scope, receive, send)
+
+		status_code = next(message['status'] for message in messages if message['type'] == 'http.response.start')
+		content = b''.join(message.get('body', b'') for message in messages if message['type'] == 'http.response.body')
+
+		return status_code, content
+
+	def test_export_is_returned_by_asgi_handler(self):
+		status_code, content = self.post_export({'workspace': self.workspace.pk})
+		self.assertEqual(status_code, 200, msg=content)
+
+		rows = [json.loads(line) for line in content.decode('utf-8').splitlines()]
+
+		self.assertIn(self.project.pk, [row['id'] for row in rows if row['section'] == 'projects'])
+		self.assertIn(self.issue.pk, [row['id'] for row in rows if row['section'] == 'issues'])
@@ -1,9 +1,14 @@
 import datetime
+import importlib.util
+from unittest import mock, skipUnless
 
 from django.contrib.auth.models import User
-from django.test import TestCase
+from django.db import connection
+from django.test import TestCase, SimpleTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 
 from libs.cryptography import hashing
+from libs.helpers.sanitizer import SanitizerBackend, clean_html, get_content_hash, sanitized_cache
 from apps.core.models import Person, Workspace, Project, PersonForgotRequest, PersonRegistrationRequest, PersonInvitationRequest, \
 	IssueTypeCategoryIcon, IssueTypeCategory, IssueStateCategory, IssueEstimationCategory, Issue, ProjectBacklog, \
 	IssueHistory, IssueMessage, Sprint, ProjectNonWorkingDay, ProjectWorkingDays, SprintEffortsHistory
@@ -587,6 +592,57 @@ class IssueModelTesting(IssueBasedModelTesting):
 			0
 		)
 
+	def test_version_is_increased_from_stored_row(self):
+		stale_issue = Issue.objects.get(pk=self.issue.pk)
+
+		self.issue.title = data_samples.CORRECT_ISSUE_TITLE_2
+		self.issue.save()
+		self.assertEqual(self.issue.version, 2)
+
+		stale_issue.description = '<p>Stale</p>'
+		stale_issue.save()
+		self.assertEqual(stale_issue.version, 3)
+		self.assertEqual(Issue.objects.get(pk=self.issue.pk).version, 3)
+
+	def test_next_number_is_taken_under_project_lock(self):
+		issue = Issue(workspace=self.workspace,
+					  project=self.project,
+					  title=data_samples.CORRECT_ISSUE_TITLE_2,
+					  created_by=self.person)
+
+		with CaptureQueriesContext(connection) as context:
+			issue.save()
+
+		queries = [query['sql'] for query in context.captured_queries]
+		lock_index = next(index for index, sql in enumerate(queries)
+						  if 'FOR UPDATE' in sql and '"core_project"' in sql)
+		number_index = next(index for index, sql in enumerate(queries) if 'MAX("core_issue"."number")' in sql)
+
+		self.assertLess(lock_index, number_index)
+		self.assertEqual(issue.number, self.issue.number + 1)
+
+	def test_only_broadcast_models_take_snapshot_on_load(self):
+		with mock.patch('apps.core.signals.take_snapshot') as take_snapshot:
+			list(IssueHistory.objects.filter(issue=self.issue))
+			take_snapshot.assert_not_called()
+
+			issue = Issue.objects.get(pk=self.issue.pk)
+			take_snapshot.assert_called_once_with(issue)
+
+	def test_internal_fields_are_not_in_history(self):
+		self.issue.title = data_samples.CORRECT_ISSUE_TITLE_2
+		self.issue.description = '<p>Changed</p>'
+		self.issue.save()
+
+		edited_fields = set(
+			IssueHistory.objects
+			.filter(issue=self.issue, edited_field__isnull=False)
+			.values_list('edited_field', flat=True)
+		)
+
+		self.assertEqual(edited_fields, {str(Issue._meta.get_field('title').verbose_name),
+										 str(Issue._meta.get_field('description').verbose_name)})
+
 
 class IssueHistoryModelTesting(IssueBasedModelTesting):
 	def setUp(self):
@@ -655,6 +711,93 @@ class IssueMessageModelTesting(IssueBasedModelTesting):
 			self.issue_message.updated_at.date() == datetime.date.today()
 		)
 
+	def test_description_hash(self):
+		self.assertEqual(
+			self.issue_message.description_hash,
+			get_content_hash(self.issue_message.description)
+		)
+
+	def test_unchanged_description_is_not_sanitized(self):
+		with mock.patch('apps.core.models.clean_html', wraps=clean_html) as sanitizer:
+			self.issue_message.save()
+			self.issue_message.save(update_fields=['updated_at'])
+
+			self.issue_message.description = '<p onclick="alert(1)">changed</p>'
+			self.issue_message.save(update_fields=['description'])
+
+		self.assertEqual(sanitizer.call_count, 1)
+
+		self.issue_message.refresh_from_db()
+		self.assertEqual(self.issue_message.description, '<p>changed</p>')
+		self.assertTrue(self.issue_message.is_description_sanitized())
+
+	def test_description_changed_without_sanitization(self):
+		IssueMessage.objects \
+			.filter(pk=self.issue_message.pk) \
+			.update(description='<script>alert(1)</script>')
+
+		self.issue_message.refresh_from_db()
+		self.issue_message.save()
+
+		self.assertEqual(self.issue_message.description, 'alert(1)')
+
+
+SANITIZER_CORPUS = (
+	('<p>Hello <b>world</b></p>', '<p>Hello <b>world</b></p>'),
+	('<script>alert(1)</script><p>x</p>', 'alert(1)<p>x</p>'),
+	('<style>p {}</style>text', 'p {}text'),
+	('<a href="javascript:alert(1)">x</a>', '<a>x</a>'),
+	('<a href="https://pmdragon.org" rel="nofollow" onclick="x">link</a>',
+	 '<a href="https://pmdragon.org" rel="nofollow">link</a>'),
+	('<a href="mailto:pmdragon@pmdragon.org">mail</a>', '<a href="mailto:pmdragon@pmdragon.org">mail</a>'),
+	('<a href="ftp://pmdragon.org">ftp</a>', '<a>ftp</a>'),
+	('<span class="mention" contenteditable="false" data-mentioned-user-id="12">@person</span>',
+	 '<span class="mention" contenteditable="false" data-mentioned-user-id="12">@person</span>'),
+	('<p style="color: red" id="paragraph">text</p>', '<p>text</p>'),
+	('<div><p>nested</p></div>', '<p>nested</p>'),
+	('<!-- comment --><p>x</p>', '<p>x</p>'),
+	('<p>a &amp; b < c</p>', '<p>a &amp; b &lt; c</p>'),
+	('<img src=x onerror=alert(1)>', ''),
+	('<iframe src="https://pmdragon.org">inside</iframe>', 'inside'),
+	('<ul><li>one</li><li>two</li></ul>', '<ul><li>one</li><li>two</li></ul>'),
+	('<p>unclosed <b>bold', '<p>unclosed <b>bold</b></p>'),
+	('<code>&lt;b&gt;</code>', '<code>&lt;b&gt;</code>'),
+	('<p>Юникод 😀</p>', '<p>Юникод 😀</p>'),
+	('plain text', 'plain text'),
+	('', ''),
+)
+
+
+class SanitizerTesting(SimpleTestCase):
+	def setUp(self):
+		sanitized_cache.clear()
+
+	def check_corpus(self):
+		for data, expected in SANITIZER_CORPUS:
+			with self.subTest(data=data):
+				self.assertEqual(clean_html(data), expected)
+
+	@override_settings(PMDRAGON_HTML_SANITIZER=SanitizerBackend.BLEACH)
+	def test_bleach_corpus(self):
+		self.check_corpus()
+
+	@skipUnless(importlib.util.find_spec('nh3'), 'nh3 is not installed')
+	@override_settings(PMDRAGON_HTML_SANITIZER=SanitizerBackend.NH3)
+	def test_nh3_corpus(self):
+		self.check_corpus()
+
+	@override_settings(PMDRAGON_HTML_SANITIZER_CACHE_SIZE=2)
+	def test_cache_is_bounded(self):
+		for data in ('<p>1</p>', '<p>2</p>', '<p>3</p>'):
+			clean_html(data)
+
+		self.assertEqual(len(sanitized_cache.outputs), 2)
+
+		with mock.patch('libs.helpers.sanitizer.clean_with_bleach') as sanitizer:
+			clean_html('<p>3</p>')
+
+		sanitizer.assert_not_called()
+
 
 class ProjectBacklogModelTesting(IssueBasedModelTesting):
 	def setUp(self):
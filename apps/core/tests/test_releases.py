@@ -0,0 +1,85 @@
+from unittest import mock
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import SimpleTestCase
+
+from libs.releases.feed import ReleaseFeed
+
+RELEASES = {
+	'version': '1.0.0',
+	'releases': {
+		'linux': [
+			{'filename': 'pmdragon-1.0.0.AppImage'}
+		]
+	},
+	'timestamp': '2021-10-01T10:00:00'
+}
+
+
+class ReleaseFeedTesting(SimpleTestCase):
+	def setUp(self):
+		cache.clear()
+		self.feed = ReleaseFeed()
+
+	def tearDown(self):
+		cache.clear()
+
+	def test_fallback_without_cache(self):
+		self.assertEqual(self.feed.get(), ReleaseFeed.get_fallback())
+
+	def test_refresh_stores_last_good_copy(self):
+		with mock.patch.object(ReleaseFeed, 'fetch', return_value=RELEASES):
+			self.assertTrue(self.feed.refresh())
+
+		self.assertEqual(self.feed.get(), RELEASES)
+
+	def test_failed_refresh_keeps_last_good_copy(self):
+		with mock.patch.object(ReleaseFeed, 'fetch', return_value=RELEASES):
+			self.feed.refresh()
+
+		cache.delete(ReleaseFeed.FRESH_KEY)
+
+		with mock.patch.object(ReleaseFeed, 'fetch', side_effect=OSError), \
+				self.assertLogs('libs.releases.feed', level='WARNING'):
+			self.assertFalse(self.feed.refresh())
+
+		self.assertEqual(self.feed.get(), RELEASES)
+
+	def test_fresh_copy_is_not_fetched_again(self):
+		with mock.patch.object(ReleaseFeed, 'fetch', return_value=RELEASES) as fetch:
+			self.feed.refresh()
+			self.feed.refresh()
+
+		fetch.assert_called_once()
+
+	def test_refresher_logs_unexpected_errors(self):
+		class StopRefresher(BaseException):
+			pass
+
+		with mock.patch.object(ReleaseFeed, 'refresh', side_effect=RuntimeError('cache is gone')), \
+				mock.patch('libs.releases.feed.time.sleep', side_effect=StopRefresher), \
+				self.assertLogs('libs.releases.feed', level='ERROR') as logs:
+			with self.assertRaises(StopRefresher):
+				self.feed._run()
+
+		self.assertIn('cache is gone', logs.output[0])
+
+	def test_snapshot_command_saves_feed(self):
+		with mock.patch.object(ReleaseFeed, 'fetch', return_value=RELEASES), \
+				mock.patch.object(ReleaseFeed, 'save_fallback') as save_fallback:
+			call_command('snapshot_releases', stdout=mock.Mock())
+
+		save_fallback.assert_called_once_with(RELEASES)
+
+	def test_snapshot_command_keeps_snapshot_without_network(self):
+		with mock.patch.object(ReleaseFeed, 'fetch', side_effect=OSError), \
+				mock.patch.object(ReleaseFeed, 'save_fallback') as save_fallback:
+			call_command('snapshot_releases', stdout=mock.Mock())
+
+		save_fallback.assert_not_called()
+
+	def test_main_page_renders_without_network(self):
+		response = self.client.get('/')
+
+		self.assertEqual(response.status_code, 200)
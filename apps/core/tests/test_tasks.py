@@ -0,0 +1,350 @@
+import json
+import shutil
+import tempfile
+from io import BytesIO
+from smtplib import SMTPException, SMTPServerDisconnected
+from unittest import mock
+
+from PIL import Image
+from django.contrib.auth.models import User
+from django.core import mail
+from django.core.files.base import ContentFile
+from django.test import override_settings
+
+from apps.core.api.tasks import generate_attachment_thumbnail, send_mention_digest_emails, import_issues, \
+	export_workspace
+from apps.core.models import IssueAttachment, Issue, IssueMessage, Person, Mention, MentionNotification, \
+	IssueImport, WorkspaceExport, Sprint
+from apps.core.tests import data_samples
+from apps.core.tests.test_models import BaseModelTesting
+from libs.email.compose import connection_pool
+
+MEDIA_ROOT = tempfile.mkdtemp()
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class AttachmentThumbnailTaskTesting(BaseModelTesting):
+	@classmethod
+	def tearDownClass(cls):
+		shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+		super().tearDownClass()
+
+	def create_attachment(self, name: str, content: bytes, show_preview: bool = True) -> IssueAttachment:
+		return IssueAttachment \
+			.objects \
+			.create(
+				workspace=self.workspace,
+				project=self.project,
+				title=name,
+				attachment=ContentFile(content, name=name),
+				attachment_size=len(content),
+				show_preview=show_preview,
+				created_by=self.person
+			)
+
+	@staticmethod
+	def get_image_content(size=(1600, 1200), image_format='PNG') -> bytes:
+		buffer = BytesIO()
+		Image.new('RGB', size, color='#f02222').save(buffer, format=image_format)
+		return buffer.getvalue()
+
+	def test_thumbnail_is_generated(self):
+		attachment = self.create_attachment('screenshot.png', self.get_image_content())
+
+		self.assertTrue(generate_attachment_thumbnail(attachment.pk))
+
+		attachment.refresh_from_db()
+		self.assertTrue(attachment.thumbnail)
+
+		with attachment.thumbnail.open('rb') as thumbnail_file:
+			thumbnail = Image.open(thumbnail_file)
+			self.assertLessEqual(thumbnail.width, 320)
+			self.assertLessEqual(thumbnail.height, 320)
+
+		self.assertLess(attachment.thumbnail.size, attachment.attachment_size)
+
+	def test_thumbnail_is_not_generated_without_preview(self):
+		attachment = self.create_attachment('screenshot.png', self.get_image_content(), show_preview=False)
+
+		self.assertFalse(generate_attachment_thumbnail(attachment.pk))
+
+		attachment.refresh_from_db()
+		self.assertFalse(attachment.thumbnail)
+
+	def test_thumbnail_is_not_generated_for_unreadable_image(self):
+		attachment = self.create_attachment('diagram.svg', b'<svg xmlns="http://www.w3.org/2000/svg"></svg>')
+
+		self.assertFalse(generate_attachment_thumbnail(attachment.pk))
+
+		attachment.refresh_from_db()
+		self.assertFalse(attachment.thumbnail)
+
+
+class MentionDigestTaskTesting(BaseModelTesting):
+	def setUp(self):
+		super().setUp()
+
+		user = User.objects.create_user(
+			username=data_samples.CORRECT_USERNAME_2,
+			email=data_samples.CORRECT_EMAIL_2,
+			is_active=True
+		)
+		self.another_person = Person.objects.create(user=user, phone=data_samples.CORRECT_PHONE)
+		self.workspace.participants.add(self.another_person)
+
+		self.issue = Issue \
+			.objects \
+			.create(
+				workspace=self.workspace,
+				project=self.project,
+				title=data_samples.CORRECT_ISSUE_TITLE,
+				created_by=self.person
+			)
+
+	def create_message(self, *persons) -> IssueMessage:
+		mentions = ''.join(f'<span data-mentioned-user-id="{person.pk}">@{person.pk}</span>' for person in persons)
+
+		return IssueMessage \
+			.objects \
+			.create(
+				workspace=self.workspace,
+				project=self.project,
+				issue=self.issue,
+				description=f'<p>{mentions} take a look</p>',
+				created_by=self.person
+			)
+
+	def test_mentions_are_remembered(self):
+		message = self.create_message(self.person, self.another_person)
+
+		self.assertEqual(
+			set(MentionNotification.objects.filter(message=message).values_list('person_id', flat=True)),
+			{self.person.pk, self.another_person.pk}
+		)
+
+	def test_only_participants_are_notified(self):
+		self.workspace.participants.remove(self.another_person)
+		self.create_message(self.person, self.another_person)
+
+		self.assertEqual(MentionNotification.objects.get().person, self.person)
+
+	def test_edited_message_updates_mentions(self):
+		message = self.create_message(self.person)
+
+		message.description = f'<span data-mentioned-user-id="{self.another_person.pk}">@</span>'
+		message.save()
+
+		self.assertEqual(
+			list(Mention.objects.filter(message=message).values_list('person_id', flat=True)),
+			[self.another_person.pk]
+		)
+		self.assertEqual(MentionNotification.objects.filter(message=message).count(), 2)
+
+		message.save()
+		self.assertEqual(MentionNotification.objects.filter(message=message).count(), 2)
+
+	@override_settings(PMDRAGON_MENTION_DIGEST_WINDOW=0)
+	def test_one_email_per_person(self):
+		self.create_message(self.another_person)
+		self.create_message(self.person, self.another_person)
+
+		self.assertEqual(send_mention_digest_emails(), 2)
+
+		self.assertEqual(
+			sorted(email.to[0] for email in mail.outbox),
+			sorted([data_samples.CORRECT_EMAIL, data_samples.CORRECT_EMAIL_2])
+		)
+		self.assertFalse(MentionNotification.objects.filter(sent_at__isnull=True).exists())
+
+		self.assertEqual(send_mention_digest_emails(), 0)
+		self.assertEqual(len(mail.outbox), 2)
+
+	def test_mentions_wait_for_window(self):
+		self.create_message(self.another_person)
+
+		self.assertEqual(send_mention_digest_emails(), 0)
+		self.assertEqual(len(mail.outbox), 0)
+
+	@override_settings(PMDRAGON_MENTION_DIGEST_WINDOW=0)
+	def test_connection_is_reused(self):
+		self.create_message(self.person)
+		send_mention_digest_emails()
+		connection = connection_pool.connection
+
+		self.create_message(self.another_person)
+		send_mention_digest_emails()
+
+		self.assertIs(connection_pool.connection, connection)
+		self.assertEqual(len(mail.outbox), 2)
+
+	def test_only_unsent_messages_are_resent_after_disconnect(self):
+		messages = [mail.EmailMessage(to=[email]) for email in (data_samples.CORRECT_EMAIL, data_samples.CORRECT_EMAIL_2)]
+		connection = mail.get_connection()
+		send_messages = connection.send_messages
+		disconnected = []
+
+		def disconnect_before_second_message(batch):
+			if batch[0] is messages[1] and not disconnected:
+				disconnected.append(batch[0])
+				raise SMTPServerDisconnected()
+
+			return send_messages(batch)
+
+		with mock.patch.object(connection_pool, 'get_connection', return_value=connection), \
+				mock.patch.object(connection, 'send_messages', side_effect=disconnect_before_second_message):
+			self.assertEqual(connection_pool.send_messages(messages), 2)
+
+		self.assertEqual(disconnected, [messages[1]])
+		self.assertEqual([email.to[0] for email in mail.outbox], [data_samples.CORRECT_EMAIL, data_samples.CORRECT_EMAIL_2])
+
+	def test_repeated_disconnect_is_raised(self):
+		messages = [mail.EmailMessage(to=[data_samples.CORRECT_EMAIL])]
+		connection = mail.get_connection()
+
+		with mock.patch.object(connection_pool, 'get_connection', return_value=connection), \
+				mock.patch.object(connection, 'send_messages', side_effect=SMTPServerDisconnected()) as send_messages:
+			with self.assertRaises(SMTPServerDisconnected):
+				connection_pool.send_messages(messages)
+
+		self.assertEqual(send_messages.call_count, 2)
+		self.assertFalse(mail.outbox)
+
+
+	@override_settings(PMDRAGON_MENTION_DIGEST_WINDOW=0)
+	def test_failed_email_is_retried_alone(self):
+		self.create_message(self.person, self.another_person)
+		send_messages = connection_pool.send_messages
+
+		def fail_for_another_person(messages):
+			if messages[0].to == [data_samples.CORRECT_EMAIL_2]:
+				raise SMTPException('Temporary failure')
+
+			return send_messages(messages)
+
+		with mock.patch.object(connection_pool, 'send_messages', side_effect=fail_for_another_person):
+			with self.assertRaises(SMTPException):
+				send_mention_digest_emails()
+
+		self.assertEqual([email.to[0] for email in mail.outbox], [data_samples.CORRECT_EMAIL])
+		self.assertEqual(
+			list(MentionNotification.objects.filter(sent_at__isnull=True).values_list('person_id', flat=True)),
+			[self.another_person.pk]
+		)
+
+		self.assertEqual(send_mention_digest_emails(), 1)
+		self.assertEqual([email.to[0] for email in mail.outbox], [data_samples.CORRECT_EMAIL, data_samples.CORRECT_EMAIL_2])
+
+
+	@override_settings(PMDRAGON_MENTION_DIGEST_WINDOW=0)
+	def test_unreachable_server_keeps_notifications_pending(self):
+		self.create_message(self.person, self.another_person)
+
+		with mock.patch.object(connection_pool, 'send_messages', side_effect=ConnectionRefusedError()):
+			with self.assertRaises(OSError):
+				send_mention_digest_emails()
+
+		self.assertFalse(mail.outbox)
+		self.assertEqual(
+			set(MentionNotification.objects.filter(sent_at__isnull=True).values_list('person_id', flat=True)),
+			{self.person.pk, self.another_person.pk}
+		)
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class ImportIssuesTaskTesting(BaseModelTesting):
+	@classmethod
+	def tearDownClass(cls):
+		shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+		super().tearDownClass()
+
+	def create_import(self, name: str, content: bytes) -> IssueImport:
+		return IssueImport \
+			.objects \
+			.create(
+				workspace=self.workspace,
+				project=self.project,
+				source=ContentFile(content, name=name),
+				format=IssueImport.FORMAT_CSV,
+				created_by=self.person
+			)
+
+	def test_uploaded_file_is_imported(self):
+		issue_import = self.create_import('issues.csv', '\ufefftitle,description\nImported,<p>Hello</p>\n'.encode())
+
+		self.assertTrue(import_issues(issue_import.pk))
+
+		issue_import.refresh_from_db()
+		self.assertEqual(issue_import.status, IssueImport.STATUS_DONE)
+		self.assertEqual(issue_import.imported, 1)
+		self.assertIsNotNone(issue_import.finished_at)
+
+		issue = Issue.objects.get(project=self.project, title='Imported')
+		self.assertEqual(issue.created_by, self.person)
+
+	def test_finished_import_is_not_repeated(self):
+		issue_import = self.create_import('issues.csv', b'title\nImported\n')
+
+		self.assertTrue(import_issues(issue_import.pk))
+		self.assertFalse(import_issues(issue_import.pk))
+
+		self.assertEqual(Issue.objects.filter(project=self.project, title='Imported').count(), 1)
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class ExportWorkspaceTaskTesting(BaseModelTesting):
+	@classmethod
+	def tearDownClass(cls):
+		shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+		super().tearDownClass()
+
+	def setUp(self):
+		super().setUp()
+
+		self.issues = [
+			Issue.objects.create(workspace=self.workspace, project=self.project, title=f'Exported {number}')
+			for number
+			in range(5)
+		]
+
+		self.sprint = Sprint.objects.create(workspace=self.workspace, project=self.project)
+		for issue in self.issues[:2]:
+			self.sprint.issues.add(issue)
+
+	def test_workspace_is_exported_to_file(self):
+		workspace_export = WorkspaceExport.objects.create(workspace=self.workspace, created_by=self.person)
+
+		with self.settings(PMDRAGON_EXPORT_CHUNK_SIZE=2):
+			self.assertTrue(export_workspace(workspace_export.pk))
+
+		workspace_export.refresh_from_db()
+		self.assertEqual(workspace_export.status, WorkspaceExport.STATUS_DONE)
+		self.assertIsNotNone(workspace_export.finished_at)
+		self.assertTrue(workspace_export.file.name.endswith('.ndjson'))
+
+		with workspace_export.file.open('rb') as file:
+			rows = [json.loads(line) for line in file.read().decode('utf-8').splitlines()]
+
+		self.assertEqual(workspace_export.rows, len(rows))
+
+		issue_rows = [row for row in rows if row['section'] == 'issues']
+		self.assertEqual(sorted(row['title'] for row in issue_rows),
+						 sorted(issue.title for issue in self.issues))
+		self.assertEqual(len([row for row in rows if row['section'] == 'sprint_issues']), 2)
+
+		self.assertFalse(export_workspace(workspace_export.pk))
+
+	def test_section_is_exported_as_csv(self):
+		workspace_export = WorkspaceExport.objects.create(workspace=self.workspace,
+														  format=WorkspaceExport.FORMAT_CSV,
+														  section='issues')
+
+		export_workspace(workspace_export.pk)
+
+		workspace_export.refresh_from_db()
+
+		with workspace_export.file.open('rb') as file:
+			lines = file.read().decode('utf-8').splitlines()
+
+		self.assertTrue(lines[0].startswith('id,project,key,title'))
+		self.assertEqual(len(lines), len(self.issues) + 1)
+		self.assertEqual(workspace_export.rows, len(self.issues))
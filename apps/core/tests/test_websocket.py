@@ -0,0 +1,1082 @@
+import zlib
+from unittest import mock
+
+from asgiref.sync import async_to_sync
+from channels.db import database_sync_to_async
+from channels.layers import get_channel_layer
+from channels.testing import WebsocketCommunicator
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import transaction
+from django.test import TransactionTestCase, override_settings
+from rest_framework_simplejwt.tokens import AccessToken
+
+from apps.core.middleware import JWTAuthMiddleware
+from apps.core.models import Person, Workspace, Project, Issue, IssueStateCategory, order_and_save_issues
+from apps.core.multiplexer import MultiplexerAsyncJson, OverflowPolicy, OVERFLOW_CLOSE_CODE, IDLE_CLOSE_CODE, \
+	TOO_LARGE_CLOSE_CODE, INVALID_FRAME_CLOSE_CODE, INTERNAL_ERROR_CLOSE_CODE, FrameEncoding, decode_frame, \
+	encode_frame, frame_cache
+from apps.core.broadcast import get_workspace_group_name
+from apps.core.tests import data_samples
+from libs.check.websocket import outbound_metrics
+
+UPDATED_ISSUE_TITLE = 'As a user i want to get updates in one frame'
+
+
+class BaseWebsocketTesting(TransactionTestCase):
+	"""
+	database_sync_to_async is closing connections,
+	so we can't use TestCase with transaction around every test here.
+	"""
+	def setUp(self):
+		cache.clear()
+
+		self.user = User.objects.create_user(
+			username=data_samples.CORRECT_USERNAME,
+			first_name=data_samples.CORRECT_FIRST_NAME,
+			last_name=data_samples.CORRECT_LAST_NAME,
+			email=data_samples.CORRECT_EMAIL,
+			is_active=True
+		)
+
+		self.person = Person \
+			.objects \
+			.create(
+				user=self.user,
+				phone=data_samples.CORRECT_PHONE
+			)
+
+		self.workspace = Workspace \
+			.objects \
+			.create(
+				prefix_url=data_samples.CORRECT_PREFIX_URL,
+				owned_by=self.person
+			)
+
+		self.workspace.participants.add(self.person)
+
+		self.project = Project \
+			.objects \
+			.create(
+				workspace=self.workspace,
+				title=data_samples.CORRECT_PROJECT_TITLE,
+				key=data_samples.CORRECT_PROJECT_KEY,
+				owned_by=self.person
+			)
+
+		self.token = str(AccessToken.for_user(self.user))
+
+	def tearDown(self) -> None:
+		cache.clear()
+
+	def get_query_string(self, token: str = None) -> bytes:
+		return f'token={token or self.token}'.encode()
+
+	def get_communicator(self, path: str = '/ws/', subprotocols: list = None) -> WebsocketCommunicator:
+		communicator = WebsocketCommunicator(MultiplexerAsyncJson.as_asgi(), path, subprotocols=subprotocols)
+		communicator.scope['user'] = self.user
+		communicator.scope['person'] = self.person
+
+		return communicator
+
+	@database_sync_to_async
+	def create_issue(self, title: str = data_samples.CORRECT_ISSUE_TITLE) -> Issue:
+		return Issue \
+			.objects \
+			.create(
+				title=title,
+				workspace=self.workspace,
+				project=self.project,
+				created_by=self.person
+			)
+
+	@staticmethod
+	async def request(communicator: WebsocketCommunicator, stream: str, action: str, **kwargs) -> dict:
+		await communicator.send_json_to({
+			'stream': stream,
+			'payload': dict(action=action, request_id=1, **kwargs)
+		})
+
+		return (await communicator.receive_json_from())['payload']
+
+
+class JWTAuthMiddlewareTesting(BaseWebsocketTesting):
+	def resolve_scope(self, query_string: bytes) -> dict:
+		resolved = {}
+
+		async def application(scope, receive, send):
+			resolved.update(scope)
+
+		middleware = JWTAuthMiddleware(application)
+		async_to_sync(middleware)({'type': 'websocket', 'query_string': query_string}, None, None)
+
+		return resolved
+
+	def test_user_and_person_in_scope(self):
+		scope = self.resolve_scope(self.get_query_string())
+
+		self.assertEqual(scope['user'], self.user)
+		self.assertEqual(scope['person'], self.person)
+
+	def test_resolution_is_cached(self):
+		self.resolve_scope(self.get_query_string())
+
+		with self.assertNumQueries(0):
+			scope = self.resolve_scope(self.get_query_string())
+
+		self.assertEqual(scope['person'], self.person)
+
+	def test_invalid_token(self):
+		scope = self.resolve_scope(self.get_query_string(token='invalid'))
+
+		self.assertFalse(scope['user'].is_authenticated)
+		self.assertIsNone(scope['person'])
+
+	def test_no_token(self):
+		scope = self.resolve_scope(b'')
+
+		self.assertFalse(scope['user'].is_authenticated)
+		self.assertIsNone(scope['person'])
+
+
+class WorkspaceObserverTesting(BaseWebsocketTesting):
+	def test_subscribe_and_receive_events(self):
+		async def scenario():
+			communicator = self.get_communicator()
+			connected, _ = await communicator.connect()
+			self.assertTrue(connected)
+
+			reply = await self.request(communicator, 'workspace', 'subscribe_to_workspace',
+									   workspace_pk=self.workspace.pk)
+			self.assertEqual(reply['response_status'], 200)
+
+			issue = await self.create_issue()
+			frame = (await communicator.receive_json_from())['payload']
+
+			self.assertEqual(frame['workspace_pk'], self.workspace.pk)
+			events = [event for event in frame['events'] if event['model'] == 'issue']
+			self.assertEqual(events[0]['pk'], issue.pk)
+			self.assertEqual(events[0]['action'], 'create')
+
+			await communicator.disconnect()
+
+		async_to_sync(scenario)()
+
+	def test_events_are_filtered_by_models(self):
+		async def scenario():
+			communicator = self.get_communicator()
+			await communicator.connect()
+
+			await self.request(communicator, 'workspace', 'subscribe_to_workspace',
+							   workspace_pk=self.workspace.pk,
+							   models=['issue_message'])
+
+			await self.create_issue()
+			self.assertTrue(await communicator.receive_nothing())
+
+			await communicator.disconnect()
+
+		async_to_sync(scenario)()
+
+	def test_unable_to_subscribe_foreign_workspace(self):
+		async def scenario():
+			communicator = self.get_communicator()
+			await communicator.connect()
+
+			reply = await self.request(communicator, 'workspace', 'subscribe_to_workspace',
+									   workspace_pk=self.workspace.pk + 1)
+			self.assertEqual(reply['response_status'], 404)
+
+			await communicator.disconnect()
+
+		async_to_sync(scenario)()
+
+	def test_unable_to_subscribe_unknown_models(self):
+		async def scenario():
+			communicator = self.get_communicator()
+			await communicator.connect()
+
+			reply = await self.request(communicator, 'workspace', 'subscribe_to_workspace',
+									   workspace_pk=self.workspace.pk,
+									   models=['person'])
+			self.assertEqual(reply['response_status'], 400)
+
+			await communicator.disconnect()
+
+		async_to_sync(scenario)()
+
+	def test_stream_applications_are_created_lazily(self):
+		async def scenario():
+			application = MultiplexerAsyncJson()
+			communicator = WebsocketCommunicator(application, '/ws/')
+			communicator.scope['user'] = self.user
+			communicator.scope['person'] = self.person
+			await communicator.connect()
+
+			await self.request(communicator, 'workspace', 'subscribe_to_workspace',
+							   workspace_pk=self.workspace.pk)
+			self.assertEqual(set(application.application_futures), {'workspace'})
+
+			await communicator.disconnect()
+
+		async_to_sync(scenario)()
+
+	def test_legacy_stream_still_works(self):
+		async def scenario():
+			communicator = self.get_communicator()
+			await communicator.connect()
+
+			await communicator.send_json_to({
+				'stream': 'workspace_issues',
+				'payload': {
+					'action': 'subscribe_to_issues_in_workspace',
+					'request_id': 1,
+					'workspace_pk': self.workspace.pk
+				}
+			})
+			await communicator.receive_nothing()
+
+			issue = await self.create_issue()
+			frame = await communicator.receive_json_from()
+
+			self.assertEqual(frame['stream'], 'workspace_issues')
+			self.assertEqual(frame['payload']['message']['id'], issue.pk)
+
+			await communicator.disconnect()
+
+		async_to_sync(scenario)()
+
+
+class WorkspaceEventBufferTesting(BaseWebsocketTesting):
+	async def get_subscribed_communicator(self) -> WebsocketCommunicator:
+		communicator = self.get_communicator()
+		await communicator.connect()
+		await self.request(communicator, 'workspace', 'subscribe_to_workspace',
+						   workspace_pk=self.workspace.pk,
+						   models=['issue'])
+
+		return communicator
+
+	@database_sync_to_async
+	def create_and_update_issues_in_transaction(self, rollback: bool = False):
+		with transaction.atomic():
+			first_issue = Issue.objects.create(title=data_samples.CORRECT_ISSUE_TITLE,
+											   workspace=self.workspace,
+											   project=self.project,
+											   created_by=self.person)
+			second_issue = Issue.objects.create(title=data_samples.CORRECT_ISSUE_TITLE_2,
+												workspace=self.workspace,
+												project=self.project,
+												created_by=self.person)
+
+			first_issue.title = UPDATED_ISSUE_TITLE
+			first_issue.save()
+
+			if rollback:
+				transaction.set_rollback(True)
+
+		return first_issue, second_issue
+
+	@database_sync_to_async
+	def reorder_issues(self, issues):
+		order_and_save_issues(reversed(issues))
+
+	def test_changes_are_coalesced_into_one_frame(self):
+		async def scenario():
+			communicator = await self.get_subscribed_communicator()
+
+			first_issue, second_issue = await self.create_and_update_issues_in_transaction()
+			frame = (await communicator.receive_json_from())['payload']
+
+			self.assertEqual([event['pk'] for event in frame['events']], [first_issue.pk, second_issue.pk])
+			self.assertEqual([event['action'] for event in frame['events']], ['create', 'create'])
+			self.assertEqual(frame['events'][0]['data']['title'], UPDATED_ISSUE_TITLE)
+			self.assertTrue(await communicator.receive_nothing())
+
+			await communicator.disconnect()
+
+		async_to_sync(scenario)()
+
+	def test_rolled_back_changes_are_not_sent(self):
+		async def scenario():
+			communicator = await self.get_subscribed_communicator()
+
+			await self.create_and_update_issues_in_transaction(rollback=True)
+			self.assertTrue(await communicator.receive_nothing())
+
+			await communicator.disconnect()
+
+		async_to_sync(scenario)()
+
+	def test_rolled_back_changes_are_not_sent_with_next_transaction(self):
+		async def scenario():
+			communicator = await self.get_subscribed_communicator()
+
+			await self.create_and_update_issues_in_transaction(rollback=True)
+			first_issue, second_issue = await self.create_and_update_issues_in_transaction()
+
+			frame = (await communicator.receive_json_from())['payload']
+			self.assertEqual([event['pk'] for event in frame['events']], [first_issue.pk, second_issue.pk])
+			self.assertTrue(await communicator.receive_nothing())
+
+			await communicator.disconnect()
+
+		async_to_sync(scenario)()
+
+	def test_bulk_update_is_sent_as_one_frame(self):
+		async def scenario():
+			issues = [
+				await self.create_issue(data_samples.CORRECT_ISSUE_TITLE),
+				await self.create_issue(data_samples.CORRECT_ISSUE_TITLE_2)
+			]
+
+			communicator = await self.get_subscribed_communicator()
+
+			await self.reorder_issues(issues)
+			frame = (await communicator.receive_json_from())['payload']
+
+			# Only issues with changed ordering are updated
+			self.assertTrue(frame['events'])
+			self.assertLessEqual({event['pk'] for event in frame['events']}, {issue.pk for issue in issues})
+			self.assertTrue(all(event['action'] == 'update' for event in frame['events']))
+			self.assertTrue(await communicator.receive_nothing())
+
+			await communicator.disconnect()
+
+		async_to_sync(scenario)()
+
+
+class DeltaEventsTesting(BaseWebsocketTesting):
+	@database_sync_to_async
+	def update_issue_title(self, issue: Issue) -> Issue:
+		issue = Issue.objects.get(pk=issue.pk)
+		issue.title = UPDATED_ISSUE_TITLE
+		issue.save()
+
+		return issue
+
+	def test_update_contains_only_changed_fields(self):
+		async def scenario():
+			issue = await self.create_issue()
+
+			communicator = self.get_communicator()
+			await communicator.connect()
+			await self.request(communicator, 'workspace', 'subscribe_to_workspace',
+							   workspace_pk=self.workspace.pk,
+							   models=['issue'])
+
+			issue = await self.update_issue_title(issue)
+			event = (await communicator.receive_json_from())['payload']['events'][0]
+
+			self.assertEqual(event['action'], 'update')
+			self.assertEqual(event['version'], issue.version)
+			self.assertEqual(event['data']['title'], UPDATED_ISSUE_TITLE)
+			self.assertEqual(event['data']['version'], issue.version)
+			self.assertNotIn('description', event['data'])
+			self.assertNotIn('attachments', event['data'])
+
+			await communicator.disconnect()
+
+		async_to_sync(scenario)()
+
+	def test_retrieve_whole_object(self):
+		async def scenario():
+			issue = await self.create_issue()
+
+			communicator = self.get_communicator()
+			await communicator.connect()
+
+			reply = await self.request(communicator, 'workspace', 'retrieve_from_workspace',
+									   workspace_pk=self.workspace.pk,
+									   model='issue',
+									   pk=issue.pk)
+
+			self.assertEqual(reply['response_status'], 200)
+			self.assertEqual(reply['data']['id'], issue.pk)
+			self.assertIn('description', reply['data'])
+
+			reply = await self.request(communicator, 'workspace', 'retrieve_from_workspace',
+									   workspace_pk=self.workspace.pk,
+									   model='issue',
+									   pk=issue.pk + 1)
+
+			self.assertEqual(reply['response_status'], 404)
+
+			await communicator.disconnect()
+
+		async_to_sync(scenario)()
+
+
+class WorkspaceEventLogTesting(BaseWebsocketTesting):
+	async def subscribe(self, communicator: WebsocketCommunicator, **kwargs) -> dict:
+		return await self.request(communicator, 'workspace', 'subscribe_to_workspace',
+								  workspace_pk=self.workspace.pk,
+								  models=['issue'],
+								  **kwargs)
+
+	def test_frames_have_increasing_sequence(self):
+		async def scenario():
+			communicator = self.get_communicator()
+			await communicator.connect()
+			await self.subscribe(communicator)
+
+			await self.create_issue(data_samples.CORRECT_ISSUE_TITLE)
+			first_frame = (await communicator.receive_json_from())['payload']
+
+			await self.create_issue(data_samples.CORRECT_ISSUE_TITLE_2)
+			second_frame = (await communicator.receive_json_from())['payload']
+
+			self.assertGreater(second_frame['sequence'], first_frame['sequence'])
+
+			await communicator.disconnect()
+
+		async_to_sync(scenario)()
+
+	def test_missed_events_are_replayed(self):
+		async def scenario():
+			communicator = self.get_communicator()
+			await communicator.connect()
+			await self.subscribe(communicator)
+
+			await self.create_issue(data_samples.CORRECT_ISSUE_TITLE)
+			last_seen_sequence = (await communicator.receive_json_from())['payload']['sequence']
+			await communicator.disconnect()
+
+			missed_issue = await self.create_issue(data_samples.CORRECT_ISSUE_TITLE_2)
+
+			communicator = self.get_communicator()
+			await communicator.connect()
+			await communicator.send_json_to({
+				'stream': 'workspace',
+				'payload': {
+					'action': 'subscribe_to_workspace',
+					'request_id': 1,
+					'workspace_pk': self.workspace.pk,
+					'models': ['issue'],
+					'since': last_seen_sequence
+				}
+			})
+
+			replayed_frame = (await communicator.receive_json_from())['payload']
+			self.assertEqual(replayed_frame['events'][0]['pk'], missed_issue.pk)
+
+			reply = (await communicator.receive_json_from())['payload']
+			self.assertFalse(reply['data']['resync'])
+			self.assertEqual(reply['data']['sequence'], replayed_frame['sequence'])
+
+			await communicator.disconnect()
+
+		async_to_sync(scenario)()
+
+	@override_settings(PMDRAGON_WORKSPACE_EVENT_LOG_SIZE=1)
+	def test_resync_if_log_is_truncated(self):
+		async def scenario():
+			await self.create_issue(data_samples.CORRECT_ISSUE_TITLE)
+			await self.create_issue(data_samples.CORRECT_ISSUE_TITLE_2)
+
+			communicator = self.get_communicator()
+			await communicator.connect()
+
+			reply = await self.subscribe(communicator, since=0)
+			self.assertTrue(reply['data']['resync'])
+
+			await communicator.disconnect()
+
+		async_to_sync(scenario)()
+
+	def test_up_to_date_client_does_not_resync(self):
+		async def scenario():
+			communicator = self.get_communicator()
+			await communicator.connect()
+
+			reply = await self.subscribe(communicator, since=0)
+			self.assertFalse(reply['data']['resync'])
+			self.assertEqual(reply['data']['sequence'], 0)
+
+			await communicator.disconnect()
+
+		async_to_sync(scenario)()
+
+
+class ProjectScopedSubscriptionTesting(BaseWebsocketTesting):
+	def setUp(self):
+		super().setUp()
+
+		self.another_project = Project \
+			.objects \
+			.create(
+				workspace=self.workspace,
+				title=data_samples.CORRECT_PROJECT_TITLE_2,
+				key=data_samples.CORRECT_PROJECT_KEY_2,
+				owned_by=self.person
+			)
+
+	@database_sync_to_async
+	def create_issue_in_another_project(self) -> Issue:
+		return Issue \
+			.objects \
+			.create(
+				title=data_samples.CORRECT_ISSUE_TITLE_2,
+				workspace=self.workspace,
+				project=self.another_project,
+				created_by=self.person
+			)
+
+	def test_events_of_other_projects_are_not_sent(self):
+		async def scenario():
+			communicator = self.get_communicator()
+			await communicator.connect()
+
+			reply = await self.request(communicator, 'workspace', 'subscribe_to_workspace',
+									   workspace_pk=self.workspace.pk,
+									   models=['issue'],
+									   projects=[self.project.pk])
+			self.assertEqual(reply['data']['projects'], [self.project.pk])
+
+			await self.create_issue_in_another_project()
+			self.assertTrue(await communicator.receive_nothing())
+
+			issue = await self.create_issue()
+			frame = (await communicator.receive_json_from())['payload']
+			self.assertEqual([event['pk'] for event in frame['events']], [issue.pk])
+			self.assertEqual(frame['events'][0]['project'], self.project.pk)
+
+			await communicator.disconnect()
+
+		async_to_sync(scenario)()
+
+	def test_ids_can_be_sent_as_strings(self):
+		async def scenario():
+			communicator = self.get_communicator()
+			await communicator.connect()
+
+			reply = await self.request(communicator, 'workspace', 'subscribe_to_workspace',
+									   workspace_pk=str(self.workspace.pk),
+									   models=['issue'],
+									   projects=[str(self.project.pk)])
+			self.assertEqual(reply['response_status'], 200)
+			self.assertEqual(reply['data']['projects'], [self.project.pk])
+
+			issue = await self.create_issue()
+			frame = (await communicator.receive_json_from())['payload']
+			self.assertEqual([event['pk'] for event in frame['events']], [issue.pk])
+
+			await communicator.disconnect()
+
+		async_to_sync(scenario)()
+
+	def test_resubscribe_to_whole_workspace(self):
+		async def scenario():
+			communicator = self.get_communicator()
+			await communicator.connect()
+
+			await self.request(communicator, 'workspace', 'subscribe_to_workspace',
+							   workspace_pk=self.workspace.pk,
+							   models=['issue'],
+							   projects=[self.project.pk])
+			await self.request(communicator, 'workspace', 'subscribe_to_workspace',
+							   workspace_pk=self.workspace.pk,
+							   models=['issue'])
+
+			issue = await self.create_issue_in_another_project()
+			frame = (await communicator.receive_json_from())['payload']
+			self.assertEqual(frame['events'][0]['pk'], issue.pk)
+			self.assertTrue(await communicator.receive_nothing())
+
+			await communicator.disconnect()
+
+		async_to_sync(scenario)()
+
+	def test_unable_to_subscribe_foreign_project(self):
+		async def scenario():
+			communicator = self.get_communicator()
+			await communicator.connect()
+
+			reply = await self.request(communicator, 'workspace', 'subscribe_to_workspace',
+									   workspace_pk=self.workspace.pk,
+									   projects=[self.project.pk, self.another_project.pk + 1])
+			self.assertEqual(reply['response_status'], 404)
+
+			await communicator.disconnect()
+
+		async_to_sync(scenario)()
+
+	def test_legacy_subscribe_to_issues_in_project(self):
+		async def scenario():
+			communicator = self.get_communicator()
+			await communicator.connect()
+
+			await communicator.send_json_to({
+				'stream': 'workspace_issues',
+				'payload': {
+					'action': 'subscribe_to_issues_in_project',
+					'request_id': 1,
+					'project_pk': self.project.pk
+				}
+			})
+			await communicator.receive_nothing()
+
+			await self.create_issue_in_another_project()
+			self.assertTrue(await communicator.receive_nothing())
+
+			issue = await self.create_issue()
+			frame = await communicator.receive_json_from()
+			self.assertEqual(frame['payload']['message']['id'], issue.pk)
+
+			await communicator.disconnect()
+
+		async_to_sync(scenario)()
+
+
+@override_settings(PMDRAGON_WEBSOCKET_OUTBOUND_QUEUE_SIZE=2)
+class OutboundQueueTesting(BaseWebsocketTesting):
+	"""
+	Frames are put to the queue without giving writer a chance to send them,
+	so it looks like client doesn't read anything.
+	"""
+	async def get_connected(self):
+		application = MultiplexerAsyncJson()
+		communicator = WebsocketCommunicator(application, '/ws/')
+		communicator.scope['user'] = self.user
+		communicator.scope['person'] = self.person
+		await communicator.connect()
+
+		return application, communicator
+
+	@staticmethod
+	async def overflow(application: MultiplexerAsyncJson, stream_name: str = 'workspace'):
+		for number in range(5):
+			await application.websocket_send({'type': 'websocket.send', 'text': f'{{"number": {number}}}'},
+											 stream_name=stream_name)
+
+	def test_resync_on_overflow(self):
+		async def scenario():
+			application, communicator = await self.get_connected()
+			self.assertIn(application, outbound_metrics.connections)
+
+			await self.overflow(application)
+			self.assertLessEqual(application.outbound_queue.qsize(), 2)
+
+			frame = await communicator.receive_json_from()
+			self.assertEqual(frame, {'stream': 'workspace', 'payload': {'resync': True}})
+			self.assertTrue(await communicator.receive_nothing())
+
+			await communicator.disconnect()
+			self.assertNotIn(application, outbound_metrics.connections)
+
+		async_to_sync(scenario)()
+
+	def test_frames_after_resync_are_sent(self):
+		async def scenario():
+			application, communicator = await self.get_connected()
+
+			await self.overflow(application)
+			await application.websocket_send({'type': 'websocket.send', 'text': '{"number": 5}'},
+											 stream_name='workspace')
+
+			self.assertTrue((await communicator.receive_json_from())['payload']['resync'])
+			self.assertEqual((await communicator.receive_json_from())['payload'], {'number': 5})
+
+			await communicator.disconnect()
+
+		async_to_sync(scenario)()
+
+	@override_settings(PMDRAGON_WEBSOCKET_OVERFLOW_POLICY=OverflowPolicy.DISCONNECT)
+	def test_disconnect_on_overflow(self):
+		async def scenario():
+			application, communicator = await self.get_connected()
+
+			await self.overflow(application)
+
+			output = await communicator.receive_output()
+			self.assertEqual(output, {'type': 'websocket.close', 'code': OVERFLOW_CLOSE_CODE})
+			self.assertNotIn(application, outbound_metrics.connections)
+
+			await communicator.disconnect()
+
+		async_to_sync(scenario)()
+
+
+class FrameEncodingTesting(BaseWebsocketTesting):
+	async def request_binary(self, communicator: WebsocketCommunicator, encoding: str, **payload) -> dict:
+		await communicator.send_to(bytes_data=encode_frame({'stream': 'workspace', 'payload': payload}, encoding))
+
+		return decode_frame(await communicator.receive_from(), encoding)
+
+	def check_encoding(self, encoding: str, communicator: WebsocketCommunicator):
+		async def scenario():
+			await communicator.connect()
+
+			reply = await self.request_binary(communicator, encoding,
+											  action='subscribe_to_workspace',
+											  request_id=1,
+											  workspace_pk=self.workspace.pk,
+											  models=['issue'])
+			self.assertEqual(reply['stream'], 'workspace')
+			self.assertEqual(reply['payload']['response_status'], 200)
+
+			issue = await self.create_issue()
+			frame = decode_frame(await communicator.receive_from(), encoding)
+			self.assertEqual(frame['payload']['events'][0]['pk'], issue.pk)
+
+			await communicator.disconnect()
+
+		async_to_sync(scenario)()
+
+	def test_msgpack_with_query_parameter(self):
+		self.check_encoding(FrameEncoding.MSGPACK, self.get_communicator('/ws/?encoding=msgpack'))
+
+	def test_compressed_msgpack_with_subprotocol(self):
+		communicator = self.get_communicator(subprotocols=['pmdragon.msgpack-deflate'])
+		self.check_encoding(FrameEncoding.MSGPACK_DEFLATE, communicator)
+
+	def test_subprotocol_is_accepted(self):
+		async def scenario():
+			communicator = self.get_communicator(subprotocols=['pmdragon.msgpack'])
+			connected, subprotocol = await communicator.connect()
+
+			self.assertTrue(connected)
+			self.assertEqual(subprotocol, 'pmdragon.msgpack')
+
+			await communicator.disconnect()
+
+		async_to_sync(scenario)()
+
+	def test_unknown_encoding_falls_back_to_json(self):
+		async def scenario():
+			communicator = self.get_communicator('/ws/?encoding=xml')
+			await communicator.connect()
+
+			reply = await self.request(communicator, 'workspace', 'subscribe_to_workspace',
+									   workspace_pk=self.workspace.pk)
+			self.assertEqual(reply['response_status'], 200)
+
+			await communicator.disconnect()
+
+		async_to_sync(scenario)()
+
+	def test_broadcast_is_encoded_once(self):
+		async def scenario():
+			communicators = [self.get_communicator('/ws/?encoding=msgpack') for _ in range(2)]
+
+			for communicator in communicators:
+				await communicator.connect()
+				await self.request_binary(communicator, FrameEncoding.MSGPACK,
+										  action='subscribe_to_workspace',
+										  request_id=1,
+										  workspace_pk=self.workspace.pk,
+										  models=['issue'])
+
+			frame_cache.frames.clear()
+			await self.create_issue()
+
+			frames = [await communicator.receive_from() for communicator in communicators]
+			self.assertEqual(len(frame_cache.frames), 1)
+			self.assertIs(frames[0], frames[1])
+
+			for communicator in communicators:
+				await communicator.disconnect()
+
+		async_to_sync(scenario)()
+
+	@override_settings(PMDRAGON_WEBSOCKET_MAX_INFLATED_FRAME_SIZE=1024)
+	def test_too_large_inflated_frame_closes_socket(self):
+		async def scenario():
+			communicator = self.get_communicator(subprotocols=['pmdragon.msgpack-deflate'])
+			await communicator.connect()
+
+			await communicator.send_to(bytes_data=zlib.compress(b'\0' * 1024 * 1024))
+
+			output = await communicator.receive_output()
+			self.assertEqual(output, {'type': 'websocket.close', 'code': TOO_LARGE_CLOSE_CODE})
+
+			await communicator.disconnect()
+
+		async_to_sync(scenario)()
+
+	def test_malformed_frames_close_socket(self):
+		frames = (
+			(['pmdragon.msgpack'], {'bytes_data': b'\xc1\xff\x00garbage'}),
+			(['pmdragon.msgpack'], {'bytes_data': b'\x01\x02'}),
+			(['pmdragon.msgpack'], {'bytes_data': encode_frame([1, 2, 3], FrameEncoding.MSGPACK)}),
+			(['pmdragon.msgpack-deflate'], {'bytes_data': b'not deflate at all'}),
+			([], {'text_data': '{"stream": "workspace", "payload":'}),
+			([], {'text_data': '{"stream": "unknown", "payload": {}}'}),
+		)
+
+		async def scenario(subprotocols: list, frame: dict):
+			communicator = self.get_communicator(subprotocols=subprotocols)
+			await communicator.connect()
+
+			await communicator.send_to(**frame)
+
+			output = await communicator.receive_output()
+			self.assertEqual(output, {'type': 'websocket.close', 'code': INVALID_FRAME_CLOSE_CODE})
+
+			await communicator.disconnect()
+
+		for subprotocols, frame in frames:
+			with self.subTest(frame=frame):
+				async_to_sync(scenario)(subprotocols, frame)
+
+	@database_sync_to_async
+	def create_issues_in_projects(self, projects: list) -> list:
+		with transaction.atomic():
+			return [
+				Issue.objects.create(title=data_samples.CORRECT_ISSUE_TITLE,
+									 workspace=self.workspace,
+									 project=project,
+									 created_by=self.person)
+				for project
+				in projects
+			]
+
+	def test_frames_of_project_groups_are_not_mixed(self):
+		async def scenario():
+			second_project = await database_sync_to_async(Project.objects.create)(
+				workspace=self.workspace,
+				title=data_samples.CORRECT_PROJECT_TITLE_2,
+				key=data_samples.CORRECT_PROJECT_KEY_2,
+				owned_by=self.person
+			)
+
+			communicator = self.get_communicator('/ws/?encoding=msgpack')
+			await communicator.connect()
+			await self.request_binary(communicator, FrameEncoding.MSGPACK,
+									  action='subscribe_to_workspace',
+									  request_id=1,
+									  workspace_pk=self.workspace.pk,
+									  models=['issue'],
+									  projects=[self.project.pk, second_project.pk])
+
+			issues = await self.create_issues_in_projects([self.project, second_project])
+
+			frames = [decode_frame(await communicator.receive_from(), FrameEncoding.MSGPACK) for _ in issues]
+			received = sorted(event['pk'] for frame in frames for event in frame['payload']['events'])
+
+			self.assertEqual(received, sorted(issue.pk for issue in issues))
+			self.assertTrue(await communicator.receive_nothing())
+
+			await communicator.disconnect()
+
+		async_to_sync(scenario)()
+
+
+class UpstreamApplicationTesting(BaseWebsocketTesting):
+	def test_crashed_stream_application_closes_socket(self):
+		async def crashing_application(scope, receive, send):
+			await receive()
+			await receive()
+			raise RuntimeError('Stream application crashed')
+
+		async def scenario():
+			communicator = self.get_communicator()
+			await communicator.connect()
+
+			await communicator.send_json_to({'stream': 'crashing', 'payload': {}})
+
+			output = await communicator.receive_output()
+			self.assertEqual(output, {'type': 'websocket.close', 'code': INTERNAL_ERROR_CLOSE_CODE})
+
+			await communicator.disconnect()
+
+		with mock.patch.dict(MultiplexerAsyncJson.applications, {'crashing': crashing_application}), \
+				self.assertLogs('apps.core.multiplexer', level='ERROR') as logs:
+			async_to_sync(scenario)()
+
+		self.assertIn('crashing', logs.output[0])
+
+
+class WorkspaceResourceConsumerTesting(BaseWebsocketTesting):
+	@database_sync_to_async
+	def get_issue_state(self) -> IssueStateCategory:
+		return IssueStateCategory \
+			.objects \
+			.create(
+				workspace=self.workspace,
+				project=self.project,
+				title=data_samples.CORRECT_ISSUE_STATE_TITLE
+			)
+
+	def get_participant_communicator(self) -> WebsocketCommunicator:
+		user = User.objects.create_user(
+			username=data_samples.CORRECT_USERNAME_2,
+			email=data_samples.CORRECT_EMAIL_2,
+			is_active=True
+		)
+		person = Person.objects.create(user=user, phone=data_samples.CORRECT_PHONE)
+		self.workspace.participants.add(person)
+
+		communicator = WebsocketCommunicator(MultiplexerAsyncJson.as_asgi(), '/ws/')
+		communicator.scope['user'] = user
+		communicator.scope['person'] = person
+
+		return communicator
+
+	def test_list_issues_of_project(self):
+		async def scenario():
+			issue = await self.create_issue()
+			communicator = self.get_communicator()
+			await communicator.connect()
+
+			reply = await self.request(communicator, 'issues', 'list', project=self.project.pk)
+			self.assertEqual(reply['response_status'], 200)
+			self.assertEqual([data['id'] for data in reply['data']], [issue.pk])
+
+			reply = await self.request(communicator, 'issues', 'list', project=self.project.pk + 1)
+			self.assertEqual(reply['data'], [])
+
+			await communicator.disconnect()
+
+		async_to_sync(scenario)()
+
+	def test_list_issues_with_filters_of_view(self):
+		@database_sync_to_async
+		def create_issue_in_state(state: IssueStateCategory) -> Issue:
+			return Issue.objects.create(title=data_samples.CORRECT_ISSUE_TITLE_2,
+										workspace=self.workspace,
+										project=self.project,
+										state_category=state,
+										created_by=self.person)
+
+		async def scenario():
+			issue_state = await self.get_issue_state()
+			issue = await create_issue_in_state(issue_state)
+			await self.create_issue()
+
+			communicator = self.get_communicator()
+			await communicator.connect()
+
+			reply = await self.request(communicator, 'issues', 'list', state=issue_state.pk)
+			self.assertEqual(reply['response_status'], 200)
+			self.assertEqual([data['id'] for data in reply['data']], [issue.pk])
+
+			await communicator.disconnect()
+
+		async_to_sync(scenario)()
+
+	def test_retrieve_and_patch_issue(self):
+		async def scenario():
+			issue = await self.create_issue()
+			communicator = self.get_communicator()
+			await communicator.connect()
+
+			reply = await self.request(communicator, 'issues', 'retrieve', pk=issue.pk)
+			self.assertEqual(reply['data']['title'], data_samples.CORRECT_ISSUE_TITLE)
+
+			reply = await self.request(communicator, 'issues', 'patch', pk=issue.pk,
+									   data={'title': UPDATED_ISSUE_TITLE})
+			self.assertEqual(reply['response_status'], 200)
+			self.assertEqual(reply['data']['title'], UPDATED_ISSUE_TITLE)
+			self.assertEqual(reply['data']['version'], issue.version + 1)
+
+			await communicator.disconnect()
+
+		async_to_sync(scenario)()
+
+		issue = Issue.objects.get()
+		self.assertEqual(issue.title, UPDATED_ISSUE_TITLE)
+		self.assertEqual(issue.updated_by, self.person)
+
+	def test_unable_to_retrieve_foreign_issue(self):
+		async def scenario():
+			issue = await self.create_issue()
+			communicator = self.get_communicator()
+			await communicator.connect()
+
+			reply = await self.request(communicator, 'issues', 'retrieve', pk=issue.pk + 1)
+			self.assertEqual(reply['response_status'], 404)
+
+			await communicator.disconnect()
+
+		async_to_sync(scenario)()
+
+	def test_same_permissions_as_http(self):
+		"""
+		Only owner of workspace can change issue states.
+		"""
+		communicator = self.get_participant_communicator()
+
+		async def scenario():
+			issue_state = await self.get_issue_state()
+			await communicator.connect()
+
+			reply = await self.request(communicator, 'issue_states', 'retrieve', pk=issue_state.pk)
+			self.assertEqual(reply['response_status'], 200)
+
+			reply = await self.request(communicator, 'issue_states', 'patch', pk=issue_state.pk,
+									   data={'title': data_samples.CORRECT_ISSUE_STATE_TITLE_2})
+			self.assertEqual(reply['response_status'], 403)
+
+			await communicator.disconnect()
+
+		async_to_sync(scenario)()
+
+
+@override_settings(PMDRAGON_WEBSOCKET_PING_INTERVAL=0.05, PMDRAGON_WEBSOCKET_IDLE_TIMEOUT=0.2)
+class HeartbeatTesting(BaseWebsocketTesting):
+	def test_silent_client_is_pinged(self):
+		async def scenario():
+			communicator = self.get_communicator()
+			await communicator.connect()
+
+			frame = await communicator.receive_json_from()
+			self.assertEqual(frame['stream'], 'heartbeat')
+			self.assertIn('ping', frame['payload'])
+
+			await communicator.disconnect()
+
+		async_to_sync(scenario)()
+
+	def test_ping_from_client_is_answered(self):
+		async def scenario():
+			communicator = self.get_communicator()
+			await communicator.connect()
+
+			await communicator.send_json_to({'stream': 'heartbeat', 'payload': {'ping': 42}})
+			frame = await communicator.receive_json_from()
+			self.assertEqual(frame, {'stream': 'heartbeat', 'payload': {'pong': 42}})
+
+			await communicator.disconnect()
+
+		async_to_sync(scenario)()
+
+	def test_idle_client_is_reaped(self):
+		group_name = get_workspace_group_name(self.workspace.pk)
+
+		async def scenario():
+			communicator = self.get_communicator()
+			await communicator.connect()
+
+			await self.request(communicator, 'workspace', 'subscribe_to_workspace',
+							   workspace_pk=self.workspace.pk)
+			self.assertTrue(get_channel_layer().groups.get(group_name))
+
+			await communicator.send_json_to({'stream': 'heartbeat', 'payload': {'pong': 42}})
+
+			while True:
+				output = await communicator.receive_output(timeout=1)
+				if output['type'] == 'websocket.close':
+					break
+
+			self.assertEqual(output['code'], IDLE_CLOSE_CODE)
+			await communicator.wait(timeout=1)
+			self.assertFalse(get_channel_layer().groups.get(group_name))
+
+		async_to_sync(scenario)()
+
+	def test_client_without_heartbeat_is_not_reaped(self):
+		async def scenario():
+			communicator = self.get_communicator()
+			await communicator.connect()
+
+			await self.request(communicator, 'workspace', 'subscribe_to_workspace',
+							   workspace_pk=self.workspace.pk)
+
+			for _ in range(8):
+				frame = await communicator.receive_json_from(timeout=1)
+				self.assertEqual(frame['stream'], 'heartbeat')
+
+			await communicator.disconnect()
+
+		async_to_sync(scenario)()
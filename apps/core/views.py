@@ -1,20 +1,25 @@
 import json
-import urllib.request
 
+from django.conf import settings
 from django.views.generic import TemplateView
 
+from libs.releases.feed import release_feed
+
 
 class MainView(TemplateView):
     template_name = 'index/index.html'
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        with urllib.request.urlopen('https://phoenixnap.dl.sourceforge.net/project/pmdragon/releases.json') as url:
-            # @todo Not the best option - better do it on client.
-            data = json.loads(url.read().decode())
 
-            context['version'] = data["version"]
-            context['releases'] = json.dumps(data["releases"])
-            context['timestamp'] = data['timestamp']
+        # Feed is refreshed in background, we only read the last good copy here
+        if not settings.TESTING:
+            release_feed.start()
+
+        data = release_feed.get()
+
+        context['version'] = data['version']
+        context['releases'] = json.dumps(data['releases'])
+        context['timestamp'] = data['timestamp']
 
-            return context
+        return context
@@ -1,3 +1,3 @@
 #!/usr/bin/env bash
 # We use this script for launch it from docker-compose or docker container.
-su -m rabbituu -c "celery -A conf.production.celery worker --loglevel=INFO"
\ No newline at end of file
+su -m rabbituu -c "celery -A conf.production.celery worker --beat --loglevel=INFO"
\ No newline at end of file
@@ -6,9 +6,15 @@ from apps.core.middleware import JWTAuthMiddleware
 from channels.routing import ProtocolTypeRouter, URLRouter
 from django.core.asgi import get_asgi_application
 import apps.core.routing as api_routing
+from libs.check.health import health_monitor
 
 http_asgi_application = get_asgi_application()
 
+"""
+Start health probes in background right away,
+so readiness is known before the first load balancer request. """
+health_monitor.start()
+
 """
 We recognize protocol and use suited routing for that
 For socket we use accumulate all routes for sockets. """
@@ -15,6 +15,7 @@ INSTALLED_APPS = [
 	'django.contrib.sessions',
 	'django.contrib.messages',
 	'django.contrib.staticfiles',
+	'django.contrib.postgres',
 	'channels',
 	'apps.core.apps.CoreConfig',
 	'django_filters',
@@ -171,7 +172,10 @@ PMDRAGON_ISSUE_DO_NOT_WATCH_FIELDS = [
 		'created_by',
 		'updated_by',
 		'created_at',
-		'updated_at'
+		'updated_at',
+		'version',
+		'description_hash',
+		'project_number'
 ]
 
 PMDRAGON_ISSUE_FOREIGN_DATA = [
@@ -182,3 +186,159 @@ PMDRAGON_ISSUE_FOREIGN_DATA = [
 		'estimation_category',
 		'assignee'
 ]
+
+"""
+Max width and height of generated preview for image attachments """
+PMDRAGON_ATTACHMENT_THUMBNAIL_SIZE = (320, 320)
+
+"""
+Health checks are running in background thread every PMDRAGON_HEALTH_CHECK_INTERVAL seconds.
+Every probe waits for the answer no more than PMDRAGON_HEALTH_CHECK_TIMEOUT seconds. """
+PMDRAGON_HEALTH_CHECK_INTERVAL = 10
+PMDRAGON_HEALTH_CHECK_TIMEOUT = 2
+
+"""
+Release feed for the landing page.
+It's fetched in background every PMDRAGON_RELEASES_REFRESH_INTERVAL seconds
+if cached copy is older than PMDRAGON_RELEASES_TTL seconds. """
+PMDRAGON_RELEASES_URL = 'https://phoenixnap.dl.sourceforge.net/project/pmdragon/releases.json'
+PMDRAGON_RELEASES_TTL = 60 * 60
+PMDRAGON_RELEASES_TIMEOUT = 5
+PMDRAGON_RELEASES_REFRESH_INTERVAL = 60
+
+"""
+How long resolved user and person for websocket token are cached in seconds """
+PMDRAGON_WEBSOCKET_AUTH_CACHE_TTL = 60
+
+"""
+How many entries of workspace events we keep for reconnected websocket clients """
+PMDRAGON_WORKSPACE_EVENT_LOG_SIZE = 1000
+
+"""
+How many frames can wait to be sent to one websocket client.
+If client is too slow and queue is full we follow PMDRAGON_WEBSOCKET_OVERFLOW_POLICY:
+'resync' - drop queued frames and ask client to resync, 'disconnect' - close the socket.
+Look at apps/core/multiplexer.py for detailed information. """
+PMDRAGON_WEBSOCKET_OUTBOUND_QUEUE_SIZE = 100
+PMDRAGON_WEBSOCKET_OVERFLOW_POLICY = 'resync'
+
+"""
+Websocket clients can choose MessagePack or compressed MessagePack frames.
+Broadcast frames are encoded once per worker, we keep last PMDRAGON_WEBSOCKET_FRAME_CACHE_SIZE of them.
+Compressed frames of clients are inflated up to PMDRAGON_WEBSOCKET_MAX_INFLATED_FRAME_SIZE bytes,
+socket is closed on larger ones. Look at apps/core/multiplexer.py for detailed information. """
+PMDRAGON_WEBSOCKET_DEFLATE_LEVEL = 6
+PMDRAGON_WEBSOCKET_FRAME_CACHE_SIZE = 256
+PMDRAGON_WEBSOCKET_MAX_INFLATED_FRAME_SIZE = 1024 * 1024
+
+"""
+We ping silent websocket clients every PMDRAGON_WEBSOCKET_PING_INTERVAL seconds,
+clients that answered heartbeat before and didn't send anything for PMDRAGON_WEBSOCKET_IDLE_TIMEOUT seconds
+are disconnected. Set interval to 0 to turn heartbeat off, set timeout to 0 to never disconnect idle clients. """
+PMDRAGON_WEBSOCKET_PING_INTERVAL = 30
+PMDRAGON_WEBSOCKET_IDLE_TIMEOUT = 90
+
+"""
+Mail connection is reused by email tasks of the worker process,
+connection that was idle longer than PMDRAGON_EMAIL_CONNECTION_MAX_IDLE seconds is reopened. """
+PMDRAGON_EMAIL_CONNECTION_MAX_IDLE = 60
+
+"""
+Mentions are sent as one digest email per person.
+Digest is sent when the oldest pending mention of person is older than PMDRAGON_MENTION_DIGEST_WINDOW seconds,
+we check it every PMDRAGON_MENTION_DIGEST_INTERVAL seconds. """
+PMDRAGON_MENTION_DIGEST_WINDOW = 15 * 60
+PMDRAGON_MENTION_DIGEST_INTERVAL = 60
+
+CELERY_BEAT_SCHEDULE = {
+	'send-mention-digest-emails': {
+		'task': 'apps.core.api.tasks.send_mention_digest_emails',
+		'schedule': PMDRAGON_MENTION_DIGEST_INTERVAL,
+	},
+}
+
+"""
+Page size of mentions list of person """
+PMDRAGON_MENTIONS_PAGE_SIZE = 50
+
+"""
+Sanitizer of issue and message descriptions, 'bleach' or 'nh3'.
+nh3 is faster, but it's not installed by default.
+Last PMDRAGON_HTML_SANITIZER_CACHE_SIZE outputs are kept in memory of every worker.
+Look at libs/helpers/sanitizer.py for detailed information. """
+PMDRAGON_HTML_SANITIZER = 'bleach'
+PMDRAGON_HTML_SANITIZER_CACHE_SIZE = 512
+
+"""
+Full text search of issues.
+Config is Postgres text search configuration, 'simple' doesn't stem words,
+so it works the same for any language. Documents have to be rebuilt after changing it:
+python manage.py rebuild_search_documents """
+PMDRAGON_SEARCH_CONFIG = 'simple'
+PMDRAGON_SEARCH_PAGE_SIZE = 25
+
+"""
+Typeahead of issues returns not more than PMDRAGON_TYPEAHEAD_LIMIT issues
+and gives up after PMDRAGON_TYPEAHEAD_TIMEOUT milliseconds """
+PMDRAGON_TYPEAHEAD_LIMIT = 10
+PMDRAGON_TYPEAHEAD_TIMEOUT = 200
+
+"""
+Amount of rows generated for every table by index audit, it has to be run against a throwaway database:
+python manage.py audit_indexes --throwaway-database """
+PMDRAGON_INDEX_AUDIT_ROWS = 20000
+
+"""
+Catalogs of projects (issue types, icons, states, estimations, working days, sprint durations)
+are cached in PMDRAGON_CATALOG_CACHE, so all workers share them.
+Deployments put it to Redis of channel layer by get_catalog_cache, local memory is used in tests.
+Look at CatalogCacheMixin in apps/core/api/views.py for detailed information. """
+CACHES = {
+	'default': {
+		'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+	},
+	'catalogs': {
+		'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+		'LOCATION': 'catalogs',
+	}
+}
+
+
+def get_catalog_cache(redis_connection) -> dict:
+	"""
+	Connection is url or pair of host and port, the same as for channel layer.
+	If Redis is not available, catalogs are read from database. """
+	if isinstance(redis_connection, str):
+		location = redis_connection
+	else:
+		location = 'redis://{}:{}'.format(*redis_connection)
+
+	return {
+		'BACKEND': 'django_redis.cache.RedisCache',
+		'LOCATION': location,
+		'KEY_PREFIX': 'pmdragon',
+		'OPTIONS': {
+			'IGNORE_EXCEPTIONS': True,
+		}
+	}
+
+
+PMDRAGON_CATALOG_CACHE = 'catalogs'
+PMDRAGON_CATALOG_CACHE_TTL = 24 * 60 * 60
+
+"""
+Issues are imported in chunks of PMDRAGON_ISSUE_IMPORT_CHUNK_SIZE rows, every chunk is one transaction.
+Only first PMDRAGON_ISSUE_IMPORT_ERRORS_LIMIT errors of rows are kept in import.
+Look at apps/core/imports.py for detailed information. """
+PMDRAGON_ISSUE_IMPORT_CHUNK_SIZE = 500
+PMDRAGON_ISSUE_IMPORT_ERRORS_LIMIT = 100
+
+"""
+Workspace export reads rows by server side cursor, PMDRAGON_EXPORT_CHUNK_SIZE rows per fetch.
+Workspaces with more issues than PMDRAGON_EXPORT_RESPONSE_ISSUES_LIMIT are exported in background to storage,
+smaller ones are returned in response. Export in response is kept in memory
+till PMDRAGON_EXPORT_RESPONSE_SPOOL_SIZE bytes, then it's moved to temporary file.
+Look at apps/core/exports.py for detailed information. """
+PMDRAGON_EXPORT_CHUNK_SIZE = 2000
+PMDRAGON_EXPORT_RESPONSE_ISSUES_LIMIT = 5000
+PMDRAGON_EXPORT_RESPONSE_SPOOL_SIZE = 8 * 1024 * 1024
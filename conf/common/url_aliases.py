@@ -13,6 +13,10 @@ PERSONS_DETAIL = 'core_api:persons-detail'
 ISSUES_LIST = 'core_api:issues-list'
 ISSUES_DETAIL = 'core_api:issues-detail'
 
+ISSUES_SEARCH_LIST = 'core_api:issues-search-list'
+
+ISSUES_TYPEAHEAD = 'core_api:issues-typeahead'
+
 ISSUES_HISTORY_LIST = 'core_api:issue-history-list'
 ISSUES_HISTORY_DETAIL = 'core_api:issue-history-detail'
 
@@ -34,9 +38,17 @@ PROJECT_NON_WORKING_DAYS_DETAIL = 'core_api:non-working-days-detail'
 ISSUE_MESSAGES_LIST = 'core_api:issue-messages-list'
 ISSUE_MESSAGES_DETAIL = 'core_api:issue-messages-detail'
 
+MENTIONS_LIST = 'core_api:mentions-list'
+
 ISSUE_ATTACHMENTS_LIST = 'core_api:issue-attachments-list'
 ISSUE_ATTACHMENTS_DETAIL = 'core_api:issue-attachments-detail'
 
+ISSUE_IMPORTS_LIST = 'core_api:issue-imports-list'
+ISSUE_IMPORTS_DETAIL = 'core_api:issue-imports-detail'
+
+WORKSPACE_EXPORTS_LIST = 'core_api:workspace-exports-list'
+WORKSPACE_EXPORTS_DETAIL = 'core_api:workspace-exports-detail'
+
 BACKLOGS_LIST = 'core_api:backlogs-list'
 BACKLOGS_DETAIL = 'core_api:backlogs-detail'
 
@@ -74,6 +86,12 @@ ISSUE_ORDERING = 'core_api:issue-ordering'
 
 CHECK = 'check'
 
+CHECK_LIVE = 'check-live'
+
+CHECK_READY = 'check-ready'
+
+CHECK_WEBSOCKET = 'check-websocket'
+
 PASSWORD_CHANGE = 'password-change'
 
 AUTH_PERSONS_DETAIL = 'persons-detail'
@@ -15,7 +15,7 @@ from apps.core.api.views import PersonRegistrationRequestVerifyView, \
 	PersonAvatarUpload, \
 	PersonRegistrationRequestView, \
 	PersonForgotPasswordRequestConfirmView, \
-	CheckConnection, SprintGuidelineView
+	CheckConnection, CheckLiveness, CheckReadiness, CheckWebsocket, SprintGuidelineView
 
 from apps.core.api.views import TokenObtainPairExtendedView
 from apps.core.views import MainView
@@ -55,6 +55,18 @@ urlpatterns = [
 		 CheckConnection.as_view(),
 		 name='check'),
 
+	path('api/check/live/',
+		 CheckLiveness.as_view(),
+		 name='check-live'),
+
+	path('api/check/ready/',
+		 CheckReadiness.as_view(),
+		 name='check-ready'),
+
+	path('api/check/websocket/',
+		 CheckWebsocket.as_view(),
+		 name='check-websocket'),
+
 	path('api/auth/obtain/',
 		 TokenObtainPairExtendedView.as_view(),
 		 name='token-obtain'),
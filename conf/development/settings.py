@@ -39,6 +39,9 @@ CHANNEL_LAYERS = {
 	}
 }
 
+if not TESTING:
+	CACHES['catalogs'] = get_catalog_cache(REDIS_CONNECTION)
+
 """
 JWT Tokens settings
 We need Session Authentication to have swagger spec. """
@@ -39,3 +39,5 @@ CHANNEL_LAYERS = {
         }
     }
 }
+
+CACHES['catalogs'] = get_catalog_cache(REDIS_CONNECTION)
@@ -83,6 +83,8 @@ CHANNEL_LAYERS = {
     }
 }
 
+CACHES['catalogs'] = get_catalog_cache(REDIS_CONNECTION)
+
 DJANGO_CHANNELS_REST_API = {
     "DEFAULT_PERMISSION_CLASSES": ("djangochannelsrestframework.permissions.IsAuthenticated",)
 }
@@ -7,5 +7,8 @@ echo -e "\e[94m Making migrations...\e[0m"
 python manage.py makemigrations
 python manage.py migrate
 
+echo -e "\e[94m Saving release snapshot...\e[0m"
+python manage.py snapshot_releases
+
 echo -e "\e[92m Starting service...\e[0m"
 uvicorn conf.asgi:application --uds /uvicorn_socket/uvicorn.socket
\ No newline at end of file
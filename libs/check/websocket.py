@@ -0,0 +1,33 @@
+import weakref
+
+from django.conf import settings
+
+
+class OutboundMetrics:
+    """
+    Outbound queues and idle connections of websocket clients served by this worker.
+    Look at CheckWebsocket view to get them and apps/core/multiplexer.py for queues.
+    """
+    def __init__(self):
+        self.connections = weakref.WeakSet()
+        self.dropped_frames = 0
+        self.resyncs = 0
+        self.disconnects = 0
+        self.reaped = 0
+
+    def get(self) -> dict:
+        depths = [connection.outbound_queue.qsize() for connection in list(self.connections)]
+
+        return {
+            'connections': len(depths),
+            'queued_frames': sum(depths),
+            'max_queue_depth': max(depths, default=0),
+            'queue_size': settings.PMDRAGON_WEBSOCKET_OUTBOUND_QUEUE_SIZE,
+            'dropped_frames': self.dropped_frames,
+            'resyncs': self.resyncs,
+            'disconnects': self.disconnects,
+            'reaped': self.reaped
+        }
+
+
+outbound_metrics = OutboundMetrics()
@@ -1,8 +1,87 @@
+import atexit
+import os
+import threading
+import time
+from smtplib import SMTPServerDisconnected
+from typing import Iterable, List, Tuple
+
 from django.conf import settings
-from django.core.mail import send_mail
+from django.core.mail import EmailMultiAlternatives, get_connection
 from django.template.loader import render_to_string
 
 
+class ConnectionPool:
+    """
+    One mail connection per worker process, it's opened on the first email
+    and reused by next ones, so we don't make SMTP / TLS handshake for every email.
+    Connection that was idle too long is reopened, servers close them anyway.
+    After fork we open our own connection and never touch socket of parent process.
+    """
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.connection = None
+        self.pid = None
+        self.last_used = 0
+
+    def close(self):
+        if self.connection is not None and self.pid == os.getpid():
+            try:
+                self.connection.close()
+            except OSError:
+                pass
+
+        self.connection = None
+
+    def get_connection(self):
+        if self.pid != os.getpid():
+            self.connection = None
+            self.pid = os.getpid()
+
+        if self.connection is not None \
+                and time.monotonic() - self.last_used > settings.PMDRAGON_EMAIL_CONNECTION_MAX_IDLE:
+            self.close()
+
+        if self.connection is None:
+            self.connection = get_connection(fail_silently=False)
+
+        self.connection.open()
+
+        return self.connection
+
+    def send_messages(self, messages: List[EmailMultiAlternatives]) -> int:
+        """
+        Messages are sent one by one, so if server closes connection in the middle of the batch
+        we know what was delivered and send only the rest over new connection.
+        Every message gets one retry, so server that limits messages per connection doesn't break big batches.
+        """
+        with self.lock:
+            sent = 0
+            index = 0
+            retried_index = None
+
+            while index < len(messages):
+                try:
+                    sent += self.get_connection().send_messages(messages[index:index + 1])
+                except SMTPServerDisconnected:
+                    if retried_index == index:
+                        raise
+
+                    """
+                    Server closed connection while it was in the pool, we try again with new one """
+                    self.close()
+                    retried_index = index
+                    continue
+
+                index += 1
+                self.last_used = time.monotonic()
+
+            return sent
+
+
+connection_pool = ConnectionPool()
+atexit.register(connection_pool.close)
+
+
 class EmailComposer:
     def __init__(self):
         self.subject = ''
@@ -11,18 +90,46 @@ class EmailComposer:
         self.from_email = settings.EMAIL_FROM_BY_DEFAULT
         self.to_email = ''
 
+    def compose(self, subject: str, email: str, template: str, context: dict) -> EmailMultiAlternatives:
+        message = EmailMultiAlternatives(
+            subject=subject,
+            body=self.message,
+            from_email=self.from_email,
+            to=[email]
+        )
+        message.attach_alternative(render_to_string(template, context), 'text/html')
+
+        return message
+
     def _send(self):
-        send_mail(
+        message = EmailMultiAlternatives(
             subject=self.subject,
-            html_message=self.html_message,
-            message=self.message,
+            body=self.message,
             from_email=self.from_email,
-            recipient_list=[self.to_email],
-            fail_silently=False,
+            to=[self.to_email]
         )
+        message.attach_alternative(self.html_message, 'text/html')
+
+        connection_pool.send_messages([message])
 
     def process(self, subject: str, email: str, template: str, context: dict):
         self.subject = subject
         self.html_message = render_to_string(template, context)
         self.to_email = email
         self._send()
+
+    def process_many(self, subject: str, template: str, recipients: Iterable[Tuple[str, dict]]) -> int:
+        """
+        Render email for every (email, context) pair and send them all over one connection.
+        Returns amount of sent emails.
+        """
+        messages = [
+            self.compose(subject=subject, email=email, template=template, context=context)
+            for email, context
+            in recipients
+        ]
+
+        if not messages:
+            return 0
+
+        return connection_pool.send_messages(messages)
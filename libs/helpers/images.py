@@ -0,0 +1,33 @@
+from io import BytesIO
+from typing import Optional, Tuple
+
+from PIL import Image, UnidentifiedImageError
+from django.core.files.base import ContentFile
+
+
+def make_thumbnail(source, size: Tuple[int, int]) -> Optional[ContentFile]:
+    """
+    Make a small copy of image from given file-like object.
+    We return None if Pillow is not able to read the file (svg for example).
+    Images with transparency are kept as png, everything else goes to jpeg.
+    """
+    try:
+        image = Image.open(source)
+        # Let jpeg decoder skip resolution we don't need anyway
+        image.draft('RGB', size)
+        image.load()
+    except (UnidentifiedImageError, OSError):
+        return None
+
+    image.thumbnail(size)
+
+    if image.mode in ('RGBA', 'LA', 'P'):
+        image_format, extension = 'PNG', 'png'
+    else:
+        image = image.convert('RGB')
+        image_format, extension = 'JPEG', 'jpg'
+
+    buffer = BytesIO()
+    image.save(buffer, format=image_format, optimize=True)
+
+    return ContentFile(buffer.getvalue(), name=f'thumbnail.{extension}')
@@ -0,0 +1,114 @@
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Callable
+
+import bleach
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+
+
+class SanitizerBackend:
+    """
+    Bleach is default one.
+    nh3 (Rust ammonia bindings) is much faster, but it's optional dependency,
+    so it has to be installed and chosen with PMDRAGON_HTML_SANITIZER.
+    Both of them follow BLEACH_ALLOWED_* settings.
+    """
+    BLEACH = 'bleach'
+    NH3 = 'nh3'
+
+
+def get_content_hash(data: str) -> str:
+    return hashlib.blake2b(data.encode('utf-8'), digest_size=16).hexdigest()
+
+
+def clean_with_bleach(data: str) -> str:
+    return bleach \
+        .clean(data,
+               tags=settings.BLEACH_ALLOWED_TAGS,
+               attributes=settings.BLEACH_ALLOWED_ATTRIBUTES,
+               protocols=settings.BLEACH_ALLOWED_PROTOCOLS,
+               strip=settings.BLEACH_STRIPPING)
+
+
+def get_nh3_cleaner() -> Callable[[str], str]:
+    try:
+        import nh3
+    except ImportError as error:
+        raise ImproperlyConfigured('nh3 sanitizer is chosen, but nh3 is not installed') from error
+
+    if not settings.BLEACH_STRIPPING:
+        raise ImproperlyConfigured('nh3 sanitizer can only strip not allowed tags, set BLEACH_STRIPPING')
+
+    tags = set(settings.BLEACH_ALLOWED_TAGS)
+    attributes = {tag: set(tag_attributes) for tag, tag_attributes in settings.BLEACH_ALLOWED_ATTRIBUTES.items()}
+    url_schemes = set(settings.BLEACH_ALLOWED_PROTOCOLS)
+
+    def clean_with_nh3(data: str) -> str:
+        """
+        Bleach keeps content of stripped script and style as escaped text, so we do the same,
+        rel is left as it was given, bleach doesn't add noopener either.
+        """
+        return nh3.clean(data,
+                         tags=tags,
+                         attributes=attributes,
+                         url_schemes=url_schemes,
+                         link_rel=None,
+                         strip_comments=True,
+                         clean_content_tags=set())
+
+    return clean_with_nh3
+
+
+def get_cleaner(backend: str) -> Callable[[str], str]:
+    if backend == SanitizerBackend.BLEACH:
+        return clean_with_bleach
+
+    if backend == SanitizerBackend.NH3:
+        return get_nh3_cleaner()
+
+    raise ImproperlyConfigured(f'Unknown html sanitizer: {backend}')
+
+
+class SanitizedCache:
+    """
+    The same HTML is sanitized again and again (the same message is saved
+    on every edit, imports repeat descriptions), so we keep last
+    PMDRAGON_HTML_SANITIZER_CACHE_SIZE outputs by hash of input.
+    Hash is used as a key to not keep big inputs in memory.
+    """
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.outputs = OrderedDict()
+
+    def get_or_clean(self, data: str, backend: str) -> str:
+        key = (get_content_hash(data), backend)
+
+        with self.lock:
+            try:
+                self.outputs.move_to_end(key)
+                return self.outputs[key]
+            except KeyError:
+                pass
+
+        output = get_cleaner(backend)(data)
+
+        with self.lock:
+            self.outputs[key] = output
+
+            while len(self.outputs) > settings.PMDRAGON_HTML_SANITIZER_CACHE_SIZE:
+                self.outputs.popitem(last=False)
+
+        return output
+
+    def clear(self):
+        with self.lock:
+            self.outputs.clear()
+
+
+sanitized_cache = SanitizedCache()
+
+
+def clean_html(data: str) -> str:
+    return sanitized_cache.get_or_clean(data, settings.PMDRAGON_HTML_SANITIZER)
@@ -0,0 +1,50 @@
+import threading
+import weakref
+
+from django.db import transaction
+
+_local = threading.local()
+
+
+class CommitHook:
+    """
+    Commit callback of buffers of one transaction. Django drops callbacks of rolled back transaction or savepoint,
+    so while the hook is alive, flush of its buffers is still registered in the current transaction.
+    Buffers are flushed by their commit_order, lower first.
+    Hook that was called belongs to committed transaction, even if tests keep it registered.
+    """
+    def __init__(self):
+        self.buffers = {}
+        self.is_called = False
+
+    def __call__(self):
+        self.is_called = True
+
+        for buffer in sorted(self.buffers.values(), key=lambda buffer: buffer.commit_order):
+            buffer.flush()
+
+
+def get_transaction_buffer(buffer_class):
+    """
+    Buffer of given class is bound to the current transaction of connection by commit hook.
+    We keep only weak reference to the hook, so when the transaction is committed or rolled back
+    the hook is gone and the next transaction starts new buffers - rolled back changes are never flushed.
+    Buffer class has to be created without arguments and have flush method and commit_order.
+    """
+    connection = transaction.get_connection()
+
+    if not hasattr(_local, 'hooks'):
+        _local.hooks = {}
+
+    reference = _local.hooks.get(connection.alias)
+    hook = reference() if reference is not None else None
+
+    if hook is None or hook.is_called:
+        hook = CommitHook()
+        _local.hooks[connection.alias] = weakref.ref(hook)
+        transaction.on_commit(hook)
+
+    if buffer_class not in hook.buffers:
+        hook.buffers[buffer_class] = buffer_class()
+
+    return hook.buffers[buffer_class]
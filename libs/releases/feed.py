@@ -0,0 +1,105 @@
+import json
+import logging
+import os
+import threading
+import time
+import urllib.request
+from typing import Optional
+
+from django.conf import settings
+from django.core.cache import cache
+
+FALLBACK_PATH = os.path.join(os.path.dirname(__file__), 'releases.json')
+
+logger = logging.getLogger(__name__)
+
+
+class ReleaseFeed:
+    """
+    Release metadata for the landing page.
+    We fetch it in background thread and keep it in cache, so page rendering
+    never waits for third-party host.
+    There are two cache entries:
+    fresh - expires after PMDRAGON_RELEASES_TTL and triggers next fetch
+    last good - never expires, used for rendering
+    If we never got anything - bundled releases.json is used (offline installs).
+    """
+    FRESH_KEY = 'pmdragon:releases:fresh'
+    LAST_GOOD_KEY = 'pmdragon:releases:last-good'
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+    @staticmethod
+    def get_fallback() -> dict:
+        with open(FALLBACK_PATH) as fallback_file:
+            return json.load(fallback_file)
+
+    @staticmethod
+    def save_fallback(data: dict):
+        with open(FALLBACK_PATH, 'w') as fallback_file:
+            json.dump(data, fallback_file, indent=2)
+            fallback_file.write('\n')
+
+    @staticmethod
+    def fetch() -> dict:
+        with urllib.request.urlopen(settings.PMDRAGON_RELEASES_URL,
+                                    timeout=settings.PMDRAGON_RELEASES_TIMEOUT) as response:
+            data = json.loads(response.read().decode())
+
+        return {
+            'version': data['version'],
+            'releases': data['releases'],
+            'timestamp': data['timestamp']
+        }
+
+    def refresh(self) -> bool:
+        """
+        Fetch feed if cached copy is expired.
+        Return True if we have fresh copy after all.
+        """
+        if cache.get(self.FRESH_KEY) is not None:
+            return True
+
+        try:
+            data = self.fetch()
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            # Keep the last good copy, we'll try again later
+            logger.warning('Release feed %s is unavailable: %r', settings.PMDRAGON_RELEASES_URL, e)
+            return False
+
+        cache.set(self.FRESH_KEY, True, timeout=settings.PMDRAGON_RELEASES_TTL)
+        cache.set(self.LAST_GOOD_KEY, data, timeout=None)
+
+        return True
+
+    def start(self):
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+
+            self._thread = threading.Thread(target=self._run,
+                                            name='pmdragon-release-feed',
+                                            daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            try:
+                self.refresh()
+            except Exception:  # Refresher should survive any cache error
+                logger.exception('Release feed refresh failed')
+
+            time.sleep(settings.PMDRAGON_RELEASES_REFRESH_INTERVAL)
+
+    def get(self) -> dict:
+        data = cache.get(self.LAST_GOOD_KEY)
+
+        if data is None:
+            return self.get_fallback()
+
+        return data
+
+
+release_feed = ReleaseFeed()